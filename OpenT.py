@@ -1,44 +1,212 @@
-import mimetypes
+import codecs
 import os
+import re
 import sys
-from typing import Optional
+import time
+import zlib
+from itertools import repeat
+from typing import Callable, List, Optional
 
-import chardet
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon, QFont, QMouseEvent
+if __name__ == '__main__':
+    STARTUP_TIME = time.perf_counter()
+    if getattr(sys, 'frozen', False):
+        # 打包为可执行文件后，在文件中查找的进程池子进程需要在解析参数之前接管
+        import multiprocessing
+        multiprocessing.freeze_support()
+    else:
+        # spawn 启动的进程池子进程默认会以 __mp_main__ 重新执行主脚本，导入 PyQt5 与全部界面模块；
+        # 主模块的 __spec__ 名称为 __main__ 时子进程跳过这一步，只导入任务函数所在的模块
+        from importlib.machinery import ModuleSpec
+        __spec__ = ModuleSpec('__main__', None)
+    # 先解析参数；已有实例在运行时把参数交给它后立即退出，不再导入界面相关的模块
+    from cli import parse_arguments
+    ARGUMENTS = parse_arguments(sys.argv[1:])
+    if not (ARGUMENTS.new_instance or ARGUMENTS.measure_startup):
+        from single_instance import forward_to_running_instance
+        if forward_to_running_instance(sys.argv[1:]):
+            sys.exit(0)
+
+from PyQt5 import sip
+from PyQt5.QtCore import Qt, QEvent, QEventLoop, QObject, QPoint, QTimer, pyqtSignal
+from PyQt5.QtGui import QIcon, QFont, QKeySequence, QMouseEvent, QTextCursor, QColor
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QTextEdit, QFileDialog, QAction, QTabWidget, QWidget,
-    QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QCheckBox, QLabel, QMessageBox
+    QApplication, QMainWindow, QPlainTextEdit, QTextEdit, QFileDialog, QAction, QTabWidget, QWidget,
+    QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QCheckBox, QLabel, QMessageBox, QProgressBar, QMenu,
+    QInputDialog
 )
 
+from encoding_utils import (
+    ENCODING_CHOICES, NEWLINE_NAMES, NewlineNormalizer, encoding_label, normalize_newlines, stream_encoding
+)
+from file_loader import FileLoadWorker, BatchLoader
+from file_saver import wait_for_pending_saves
+from match_index import MatchIndex, PatternScanWorker, compile_pattern
+from large_file_view import LargeFileView, is_large_file, LARGE_FILE_THRESHOLD
+from session import load_session, save_session
+from perf_trace import record, trace
+from tab_registry import TabRegistry
+from file_watcher import FileWatcher
+from hibernation import TabHibernator
+from highlighting import HIGHLIGHT_SIZE_LIMIT, SyntaxHighlighter, rule_set_for
+from zoom import ZoomController
+from recovery_journal import (
+    RecoveryManager, find_recoverable_journals, discard_journals, replay_journal, file_state
+)
+from single_instance import InstanceServer
+from cli import parse_arguments
 from editor_functions import (
-    save_file, replace_text, find_text, close_tab, replace_all_text,
-    new_file_e, add_new_tab_e, show_hint, show_hint_e, update_tab_title, get_resource_path, get_resource_url
+    save_file, replace_text, find_text, close_tab, replace_all_text, apply_replacements,
+    new_file_e, add_new_tab_e, show_hint, show_hint_e, update_tab_title, get_resource_path, get_resource_url,
+    is_text_file
 )
 
 # 常量定义
 DEFAULT_FONT_SIZE = 11
 MIN_FONT_SIZE = 8
 MAX_FONT_SIZE = 24
+# 休眠时压缩未保存内容的级别：压缩速度优先，日志等文本通常仍可压缩到几分之一
+HIBERNATE_COMPRESS_LEVEL = 1
+# 超过该长度（字符数）的粘贴分块插入，每块的长度，以及每次事件循环中最多用于插入的时间（秒）
+PASTE_CHUNK_THRESHOLD = 1024 * 1024
+PASTE_CHUNK_SIZE = 256 * 1024
+PASTE_TICK_BUDGET = 0.05
+# 光标移动后状态栏最多每隔多久刷新一次（毫秒）
+STATUS_UPDATE_INTERVAL = 100
+# 查找框停止输入后多久刷新匹配计数与高亮（毫秒）
+MATCH_REFRESH_DELAY = 300
+MATCH_HIGHLIGHT_COLOR = QColor('#fff59d')
+CURRENT_MATCH_COLOR = QColor('#ffb74d')
+# 标签页的现代化简洁样式，%s 为关闭按钮图标的路径
+TAB_STYLE_SHEET = """
+    /* 标签页样式 */
+    QTabBar::tab {
+        background: #f0f0f0;
+        border: 1px solid #dcdcdc;
+        border-bottom: none;
+        padding: 2px 5px;
+        margin-right: 2px;
+        border-top-left-radius: 4px;
+        border-top-right-radius: 4px;
+        min-width: 100px;
+        max-width: 100px;
+        text-overflow: ellipsis;
+        overflow: hidden;
+    }
+    QTabBar::tab:selected {
+        background: #ffffff;
+        font-weight: bold;
+        border: 1px solid #b0b0b0;
+        border-bottom: 1px solid #ffffff;
+    }
+    QTabBar::close-button {
+        image: url(%s);
+        background: transparent;
+        width: 16px;
+        height: 16px;
+        margin-left: 4px;
+    }
+    QTabBar::close-button:hover {
+        background-color: #e0e0e0;
+        border-radius: 2px;
+    }
+    QTabBar::close-button:pressed {
+        background-color: #c0c0c0;
+    }
+"""
+
 
+class CustomTextEdit(QPlainTextEdit):
+    """基于 QPlainTextEdit 的纯文本编辑器，按文本块布局，适合编辑大文件"""
+    # 后台加载的进度、完成与失败
+    load_progress = pyqtSignal(int)
+    loaded = pyqtSignal()
+    load_failed = pyqtSignal(str)
+    # 保存状态变化、保存后文件路径（或文件本身）变化，供标签页注册表跟踪
+    saved_changed = pyqtSignal(bool)
+    file_path_changed = pyqtSignal(str)
+    # 编码、BOM 或换行符变化（加载完成或用户切换），供状态栏更新
+    format_changed = pyqtSignal()
 
-class CustomTextEdit(QTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.is_saved = True
         self.is_new_file = False
         # 新建文件的 file_path 为 None，从而显示“未命名”
         self.file_path: Optional[str] = None
+        # 加载时识别的编码、BOM 与主要换行符，保存时按原格式写回
+        self.encoding = 'utf-8'
+        self.bom = b''
+        self.newline = '\n'
+        # 后台加载文件期间为 True，此时的文本变化不算作修改
+        self.is_loading = False
+        self._load_worker: Optional[FileLoadWorker] = None
+        self._progress_bar = None
+        # 后台加载的开始时间与文本块插入文档的累计耗时（秒），用于性能跟踪
+        self._load_started = 0.0
+        self._insert_time = 0.0
+        # 加载失败时是否弹出错误对话框（批量打开时由调用方统一报告）
+        self._report_load_errors = True
+        # 与文档内容对应的磁盘文件状态 (修改时间, 大小)，以及已经读取的字节数（跟踪模式从这里继续读取）
+        self.disk_state = (None, None)
+        self.disk_offset = 0
+        # 正在进行的后台保存数量，保存期间收到的文件变化通知来自本程序
+        self.pending_saves = 0
+        # 跟踪模式（tail -f）：文件增长时只读取并追加新增的内容
+        self.follow_mode = False
+        self._follow_decoder = None
+        self._follow_newlines: Optional[NewlineNormalizer] = None
+        # 命令行指定的只读方式与编码（--readonly、--encoding）
+        self.forced_read_only = False
+        self.forced_encoding: Optional[str] = None
+        # 当前查询的匹配索引，用于高亮可见范围内的全部匹配项
+        self.match_index = None
+        # 加载完成后需要执行的操作（例如加载期间请求的跳转）
+        self._after_load: List[Callable[[], None]] = []
+        # 会话恢复或休眠的标签页在激活前不加载文件，这里记录视图状态
+        self.session_state: Optional[dict] = None
+        # 休眠时压缩保存的未保存内容（UTF-8 + zlib）
+        self.hibernated_text: Optional[bytes] = None
+        # 按扩展名选择的语法高亮，加载期间与文档超过 HIGHLIGHT_SIZE_LIMIT 时不高亮
+        self.highlighter: Optional[SyntaxHighlighter] = None
+        # 正在分块插入的粘贴内容、已插入的长度、插入用的光标与插入起点
+        self._paste_text: Optional[str] = None
+        self._paste_offset = 0
+        self._paste_cursor: Optional[QTextCursor] = None
+        self._paste_start = 0
+        self._paste_progress_bar = None
+        self._paste_timer = QTimer(self)
+        self._paste_timer.setInterval(0)
+        self._paste_timer.timeout.connect(self._insert_paste_chunks)
         self.font_size = DEFAULT_FONT_SIZE
         self.setFont(QFont("微软雅黑", self.font_size))
-        # 监听文本变化
-        self.textChanged.connect(self.on_text_changed)
+        # 保存状态由文档的修改标志决定：撤销回保存时的状态会自动恢复为未修改，
+        # 只在状态切换时收到通知，输入文字时不运行 Python 代码
+        self.document().modificationChanged.connect(self._on_modification_changed)
+        self.verticalScrollBar().valueChanged.connect(self.update_match_highlights)
+        self.cursorPositionChanged.connect(self.update_match_highlights)
+
+    @property
+    def is_saved(self) -> bool:
+        if self.hibernated_text is not None:
+            return False
+        # 加载过程中插入文本也会设置修改标志，此时不算作修改
+        return self.is_loading or not self.document().isModified()
 
-    def on_text_changed(self) -> None:
-        """文本变化时标记为未保存并更新标签标题"""
-        if self.is_saved:
-            self.is_saved = False
-            update_tab_title(self.window(), self)
+    @is_saved.setter
+    def is_saved(self, saved: bool) -> None:
+        # 设置为已保存时撤销栈记录当前位置，之后撤销或重做回到这里即视为未修改
+        self.document().setModified(not saved)
+
+    @property
+    def is_pasting(self) -> bool:
+        """是否正在分块插入粘贴的内容"""
+        return self._paste_text is not None
+
+    def _on_modification_changed(self, modified: bool) -> None:
+        """修改标志切换时通知标签页注册表并更新标签标题"""
+        if self.is_loading:
+            return
+        self.saved_changed.emit(not modified)
+        update_tab_title(self.window(), self)
 
     def dragEnterEvent(self, event) -> None:
         """拖拽进入时如果包含 URL 则接受"""
@@ -49,35 +217,431 @@ class CustomTextEdit(QTextEdit):
 
     def dropEvent(self, event) -> None:
         """处理拖放事件：添加新标签加载文件"""
-        for url in event.mimeData().urls():
-            file_path = url.toLocalFile()
-            if os.path.exists(file_path):
-                self.window().add_new_tab(file_path)
+        file_paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        self.window().open_files([path for path in file_paths if os.path.exists(path)])
         event.accept()
 
-    def load_file_content(self, file_path: str) -> None:
-        """加载指定文件内容到编辑器"""
-        try:
-            with open(file_path, 'rb') as file:
-                raw_data = file.read()
-                result = chardet.detect(raw_data)
-                encoding = result.get('encoding', 'utf-8')
+    def load_file_async(self, file_path: str, progress_bar=None, report_errors: bool = True) -> None:
+        """
+        在后台线程中加载文件，解码后的文本分块追加到文档，progress_bar 显示加载进度。
+        report_errors 为 False 时加载失败只发出 load_failed，不弹出对话框
+        """
+        self.cancel_loading()
+        # 分块插入的每个文本块都会触发一次高亮，加载完成后再重新附加
+        self.remove_highlighter()
+        self.file_path = file_path
+        self.hibernated_text = None
+        self._report_load_errors = report_errors
+        self.is_loading = True
+        self.clear()
+        self.setReadOnly(True)
+        self.setPlaceholderText("正在加载…")
+        self.document().setUndoRedoEnabled(False)
+        self._progress_bar = progress_bar
+        if progress_bar is not None:
+            progress_bar.setValue(0)
+            progress_bar.show()
+        self._load_started = time.perf_counter()
+        self._insert_time = 0.0
+
+        worker = FileLoadWorker(file_path, self.forced_encoding)
+        worker.progress.connect(self._on_load_progress)
+        worker.reset.connect(self.clear)
+        worker.chunk_ready.connect(self._on_chunk_loaded)
+        worker.loaded.connect(self._on_load_finished)
+        worker.failed.connect(self._on_load_failed)
+        self._load_worker = worker
+        worker.start()
+
+    def cancel_loading(self) -> None:
+        """取消正在进行的后台加载（例如加载中途关闭标签页）"""
+        worker = self._load_worker
+        if worker is None:
+            return
+        self._load_worker = None
+        for signal in (worker.progress, worker.reset, worker.chunk_ready, worker.loaded, worker.failed):
+            signal.disconnect()
+        worker.requestInterruption()
+        worker.wait()
+        self._end_loading()
+
+    def _on_load_progress(self, value: int) -> None:
+        if self._progress_bar is not None:
+            self._progress_bar.setValue(value)
+        self.load_progress.emit(value)
 
-            with open(file_path, 'r', encoding=encoding, errors='ignore') as file:
-                text = file.read()
+    def _on_chunk_loaded(self, text: str) -> None:
+        """把后台线程解码好的一块文本追加到文档末尾"""
+        start = time.perf_counter()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self._insert_time += time.perf_counter() - start
 
-            text = text.replace('\r\n', '\n').replace('\r', '\n')
-            self.setPlainText(text)
-            self.file_path = file_path
+    def _on_load_finished(self, encoding: str) -> None:
+        worker = self._load_worker
+        self._load_worker = None
+        self.encoding = encoding
+        self.bom = worker.bom
+        self.newline = worker.newlines.newline(self.document().blockCount() - 1)
+        self.disk_state = worker.disk_state
+        self.disk_offset = worker.bytes_read
+        self._follow_decoder = None
+        # 插入文本块在界面线程中进行，是加载时界面卡顿的主要来源
+        record('load.insert', self._insert_time, f"{self.document().characterCount()} 字符")
+        record('load.total', time.perf_counter() - self._load_started, self.file_path)
+        self._end_loading()
+        self.moveCursor(QTextCursor.Start)
+        self.update_highlighter()
+        update_tab_title(self.window(), self)
+        self.format_changed.emit()
+        after_load, self._after_load = self._after_load, []
+        for callback in after_load:
+            callback()
+        self.loaded.emit()
+
+    def _on_load_failed(self, message: str) -> None:
+        self._load_worker = None
+        self._after_load.clear()
+        self._end_loading()
+        self.load_failed.emit(message)
+        if self._report_load_errors:
+            QMessageBox.critical(self, "错误", f"加载文件时出错: {message}")
+
+    def _end_loading(self) -> None:
+        """恢复加载前的编辑状态，加载的内容（包括加载失败时已插入的部分）不算作修改"""
+        self.is_loading = False
+        self.setReadOnly(self.forced_read_only)
+        self.setPlaceholderText("")
+        # 跟踪模式下不记录撤销，否则持续增长的日志会在撤销栈中再保存一份
+        self.document().setUndoRedoEnabled(not self.follow_mode)
+        self.is_saved = True
+        if self._progress_bar is not None:
+            self._progress_bar.hide()
+            self._progress_bar = None
+
+    def goto_line(self, line: int) -> None:
+        """把光标移动到第 line 行（从 0 开始）的行首并滚动到视图中间，加载期间在加载完成后跳转"""
+        if self.is_loading:
+            self._after_load.append(lambda: self.goto_line(line))
+            return
+        block = self.document().findBlockByNumber(max(0, min(line, self.blockCount() - 1)))
+        self.setTextCursor(QTextCursor(block))
+        self.centerCursor()
+
+    def replay_journal(self, records: list) -> None:
+        """重放恢复日志中的修改，文件尚未加载完成时在加载完成后重放"""
+        if self.is_loading or self.session_state is not None:
+            self._after_load.append(lambda: self.replay_journal(records))
+            return
+        replay_journal(self.document(), records)
+
+    def view_state(self) -> dict:
+        """返回保存会话所需的状态：文件路径、光标位置、滚动位置与字体大小"""
+        if self.session_state is not None:
+            return dict(self.session_state)
+        return {
+            'path': self.file_path,
+            'cursor': self.textCursor().position(),
+            'scroll': self.verticalScrollBar().value(),
+            'font_size': self.font().pointSize(),
+        }
+
+    def restore_view_state(self, cursor: int, scroll: int) -> None:
+        """恢复光标与滚动位置，加载期间在加载完成后恢复"""
+        if self.is_loading:
+            self._after_load.append(lambda: self.restore_view_state(cursor, scroll))
+            return
+        text_cursor = self.textCursor()
+        text_cursor.setPosition(max(0, min(cursor, self.document().characterCount() - 1)))
+        self.setTextCursor(text_cursor)
+        self.verticalScrollBar().setValue(scroll)
+
+    def on_file_saved(self, file_path: str, revision: int) -> None:
+        """后台保存完成：保存期间没有新的修改时才标记为已保存"""
+        self.file_path = file_path
+        self.is_new_file = False
+        # 原子保存会替换文件，即使路径不变文件标识也已改变
+        self.file_path_changed.emit(file_path)
+        self.disk_state = file_state(file_path)
+        self.disk_offset = self.disk_state[1] or 0
+        self._follow_decoder = None
+        if self.document().revision() == revision:
             self.is_saved = True
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"加载文件时出错: {e}")
+        # 另存为可能改变扩展名
+        self.update_highlighter()
+        update_tab_title(self.window(), self)
+
+    def on_save_finished(self) -> None:
+        self.pending_saves -= 1
+
+    def hibernate(self) -> None:
+        """
+        释放文档以节省内存，记录光标与滚动位置。没有未保存修改时激活后重新加载文件；
+        有未保存修改时先把内容压缩保存在内存中（撤销记录不保留）
+        """
+        self.session_state = self.view_state()
+        if not self.is_saved:
+            self.hibernated_text = zlib.compress(self.document().toRawText().encode('utf-8'), HIBERNATE_COMPRESS_LEVEL)
+        self.remove_highlighter()
+        # 清空文档不改变保存状态，标签页注册表与恢复日志不需要知道
+        self.is_loading = True
+        try:
+            self.clear()
+        finally:
+            self.is_loading = False
+
+    def wake(self, progress_bar=None) -> None:
+        """激活会话恢复或休眠的标签页：解压未保存的内容或重新加载文件，并恢复光标与滚动位置"""
+        state = self.session_state
+        self.session_state = None
+        if self.hibernated_text is not None:
+            text = zlib.decompress(self.hibernated_text).decode('utf-8')
+            self.hibernated_text = None
+            self.is_loading = True
+            try:
+                self.setPlainText(text)
+                self.document().setModified(True)
+            finally:
+                self.is_loading = False
+            self.update_highlighter()
+        else:
+            self.load_file_async(self.file_path, progress_bar)
+        self.restore_view_state(int(state.get('cursor', 0)), int(state.get('scroll', 0)))
+
+    def update_highlighter(self) -> None:
+        """按扩展名附加或更换语法高亮；没有对应规则或文档超过 HIGHLIGHT_SIZE_LIMIT 时显示纯文本"""
+        rule_set = None
+        if self.document().characterCount() <= HIGHLIGHT_SIZE_LIMIT:
+            rule_set = rule_set_for(self.file_path)
+        if self.highlighter is not None and self.highlighter.rule_set is rule_set:
+            return
+        self.remove_highlighter()
+        if rule_set is not None:
+            self.highlighter = SyntaxHighlighter(self, rule_set)
+
+    def remove_highlighter(self) -> None:
+        if self.highlighter is not None:
+            self.highlighter.detach()
+            self.highlighter = None
+
+    def set_file_format(self, encoding: Optional[str] = None, bom: Optional[bytes] = None,
+                        newline: Optional[str] = None) -> None:
+        """转换保存时使用的编码、BOM 或换行符，文档内容不变，保存后才写入文件"""
+        if encoding is not None:
+            self.encoding = encoding
+        if bom is not None:
+            self.bom = bom
+        if newline is not None:
+            self.newline = newline
+        self.is_saved = False
+        self.format_changed.emit()
+
+    def reopen_with_encoding(self, encoding: str) -> None:
+        """用指定的编码重新解码文件（自动探测的编码不正确时使用），未保存的修改会丢失"""
+        self.forced_encoding = encoding
+        self.reload_from_disk()
+
+    def reload_from_disk(self) -> None:
+        """重新加载文件，保持光标与滚动位置（跟踪模式下滚动到末尾）"""
+        cursor = self.textCursor().position()
+        scroll = self.verticalScrollBar().value()
+        tab_widget = self.parent()
+        self.load_file_async(self.file_path, tab_widget.findChild(QProgressBar) if tab_widget else None,
+                             report_errors=False)
+        if self.follow_mode:
+            self._after_load.append(lambda: self.moveCursor(QTextCursor.End))
+        else:
+            self.restore_view_state(cursor, scroll)
+
+    def set_follow_mode(self, enabled: bool) -> None:
+        """开启或关闭跟踪模式，开启时滚动到末尾并读取已经追加的内容"""
+        if enabled == self.follow_mode:
+            return
+        self.follow_mode = enabled
+        if not self.is_loading:
+            self.document().setUndoRedoEnabled(not enabled)
+        if enabled and not self.is_loading:
+            if self.is_saved and file_state(self.file_path) != self.disk_state and not self.append_from_disk():
+                self.reload_from_disk()
+                return
+            self.moveCursor(QTextCursor.End)
+
+    def append_from_disk(self) -> bool:
+        """
+        跟踪模式：只读取上次读取位置之后追加的字节，按已知编码增量解码后追加到文档末尾，
+        已有内容不需要重新读取、探测编码或重新布局。文件变小（被截断或轮转）或追加的字节无法解码时
+        返回 False，需要重新加载
+        """
+        try:
+            with open(self.file_path, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                if stat.st_size < self.disk_offset:
+                    return False
+                file.seek(self.disk_offset)
+                data = file.read(stat.st_size - self.disk_offset)
+        except OSError:
+            return False
+        with trace('follow', f"{len(data)} 字节"):
+            try:
+                if self._follow_decoder is None:
+                    # 追加的字节不带 BOM，使用明确字节序的编码（UTF-16/32 的 BOM 探测解码器会报错）
+                    encoding = stream_encoding(self.encoding, self.bom)
+                    self._follow_decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+                    self._follow_newlines = NewlineNormalizer()
+                # 与后台加载一致：CRLF 可能被拆在两次写入之间，末尾的 CR 留到下次处理
+                text = self._follow_newlines.feed(self._follow_decoder.decode(data))
+            except (UnicodeError, LookupError):
+                self._follow_decoder = None
+                return False
+            self.disk_offset = stat.st_size
+            self.disk_state = (stat.st_mtime_ns, stat.st_size)
+            if text:
+                scroll_bar = self.verticalScrollBar()
+                at_end = scroll_bar.value() == scroll_bar.maximum()
+                # 追加的内容来自文件，与加载一样不算作修改
+                self.is_loading = True
+                try:
+                    cursor = QTextCursor(self.document())
+                    cursor.movePosition(QTextCursor.End)
+                    cursor.insertText(text)
+                    self.is_saved = True
+                finally:
+                    self.is_loading = False
+                if at_end:
+                    scroll_bar.setValue(scroll_bar.maximum())
+                # 持续增长的日志超过大小上限后改为纯文本
+                self.update_highlighter()
+        return True
+
+    def set_match_index(self, match_index) -> None:
+        """设置匹配索引并高亮可见范围内的匹配项，传入 None 时清除高亮"""
+        if self.match_index is not None:
+            self.match_index.changed.disconnect(self.update_match_highlights)
+            self.match_index.detach()
+        self.match_index = match_index
+        if match_index is not None:
+            match_index.changed.connect(self.update_match_highlights)
+        self.update_match_highlights()
+
+    def update_match_highlights(self) -> None:
+        """只为当前可见的文本块生成匹配项高亮（ExtraSelections）"""
+        if self.match_index is None:
+            if self.extraSelections():
+                self.setExtraSelections([])
+            return
+        first = self.firstVisibleBlock().position()
+        viewport = self.viewport()
+        last_block = self.cursorForPosition(QPoint(viewport.width(), viewport.height())).block()
+        last = last_block.position() + last_block.length()
+        cursor = self.textCursor()
+        current = (cursor.selectionStart(), cursor.selectionEnd())
+        selections = []
+        for index in self.match_index.matches_between(first, last):
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = QTextCursor(self.document())
+            start, end = self.match_index.starts[index], self.match_index.ends[index]
+            selection.cursor.setPosition(start)
+            selection.cursor.setPosition(end, QTextCursor.KeepAnchor)
+            color = CURRENT_MATCH_COLOR if (start, end) == current else MATCH_HIGHLIGHT_COLOR
+            selection.format.setBackground(color)
+            selections.append(selection)
+        self.setExtraSelections(selections)
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self.update_match_highlights()
 
     def insertFromMimeData(self, source) -> None:
-        """粘贴时只插入纯文本并统一换行符"""
-        if source.hasText():
-            text = source.text().replace('\r\n', '\n').replace('\r', '\n')
+        """
+        粘贴时只插入纯文本并统一换行符。超过 PASTE_CHUNK_THRESHOLD 的文本分块插入，
+        插入期间界面保持响应并显示进度，按 Esc 取消
+        """
+        if not source.hasText() or self.is_pasting:
+            return
+        text = normalize_newlines(source.text())
+        if len(text) < PASTE_CHUNK_THRESHOLD:
             self.insertPlainText(text)
+            return
+        # 与加载一样，插入期间不高亮，完成后按文档大小重新决定
+        self.remove_highlighter()
+        cursor = self.textCursor()
+        cursor.beginEditBlock()
+        cursor.removeSelectedText()
+        cursor.endEditBlock()
+        self._paste_text = text
+        self._paste_offset = 0
+        self._paste_cursor = cursor
+        self._paste_start = cursor.position()
+        # 插入期间只读，避免输入的文字混入粘贴内容
+        self.setReadOnly(True)
+        tab_widget = self.parent()
+        self._paste_progress_bar = tab_widget.findChild(QProgressBar) if tab_widget else None
+        if self._paste_progress_bar is not None:
+            self._paste_progress_bar.setValue(0)
+            self._paste_progress_bar.show()
+        self.window().statusBar().showMessage("正在粘贴…（按 Esc 取消）")
+        self._paste_timer.start()
+
+    def _insert_paste_chunks(self) -> None:
+        """
+        在 PASTE_TICK_BUDGET 内插入尽可能多的块后返回事件循环。
+        每块都并入粘贴开始时的编辑块，整个粘贴只需一次撤销；每块单独结束编辑块，
+        文档随插入逐步布局，而不是在最后一次性布局全部内容
+        """
+        text = self._paste_text
+        deadline = time.perf_counter() + PASTE_TICK_BUDGET
+        with trace('paste', f"{self._paste_offset} / {len(text)} 字符"):
+            while self._paste_offset < len(text) and time.perf_counter() < deadline:
+                self._paste_cursor.joinPreviousEditBlock()
+                self._paste_cursor.insertText(text[self._paste_offset:self._paste_offset + PASTE_CHUNK_SIZE])
+                self._paste_cursor.endEditBlock()
+                self._paste_offset += PASTE_CHUNK_SIZE
+        if self._paste_progress_bar is not None:
+            self._paste_progress_bar.setValue(min(100, self._paste_offset * 100 // len(text)))
+        if self._paste_offset >= len(text):
+            self.setTextCursor(self._paste_cursor)
+            self._end_paste()
+            self.update_highlighter()
+            self.ensureCursorVisible()
+            self.window().statusBar().showMessage(f"已粘贴 {len(text)} 个字符", 3000)
+
+    def cancel_paste(self) -> None:
+        """取消分块粘贴，删除已经插入的部分（替换的选中文字可通过撤销恢复）"""
+        if not self.is_pasting:
+            return
+        cursor = self._paste_cursor
+        cursor.joinPreviousEditBlock()
+        cursor.setPosition(self._paste_start, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        cursor.endEditBlock()
+        self.setTextCursor(cursor)
+        self._end_paste()
+        self.update_highlighter()
+        self.window().statusBar().showMessage("已取消粘贴", 3000)
+
+    def _end_paste(self) -> None:
+        self._paste_timer.stop()
+        self._paste_text = None
+        self._paste_cursor = None
+        self.setReadOnly(self.forced_read_only)
+        if self._paste_progress_bar is not None:
+            self._paste_progress_bar.hide()
+            self._paste_progress_bar = None
+
+    def wheelEvent(self, event) -> None:
+        """Ctrl+滚轮交给主窗口调节字体大小（否则可编辑时按页滚动，只读时由 Qt 直接缩放）"""
+        if event.modifiers() == Qt.ControlModifier:
+            event.ignore()
+            return
+        super().wheelEvent(event)
+
+    def keyPressEvent(self, event) -> None:
+        if event.key() == Qt.Key_Escape and self.is_pasting:
+            self.cancel_paste()
+            return
+        super().keyPressEvent(event)
+
 
 class TextEditor(QMainWindow):
     def __init__(self):
@@ -92,50 +656,121 @@ class TextEditor(QMainWindow):
                     }
                 """)
 
-        # 记录已打开文件路径（防止重复打开）
-        self.opened_files = set()
+        # 记录所有编辑器及其打开的文件（防止重复打开、查找标签页中的编辑器）
+        self.tab_registry = TabRegistry(self)
+        # 恢复日志：记录未保存的修改，异常退出后下次启动时可以恢复（由 recovery.start() 启用）
+        self.recovery = RecoveryManager(self)
+        self.tab_registry.editor_registered.connect(self.recovery.attach)
+        self.tab_registry.editor_unregistered.connect(self.recovery.detach)
+        # 监视打开的文件：未修改的标签页自动重新加载（跟踪模式下只追加新内容），已修改的询问
+        self.file_watcher = FileWatcher(self)
+        self.file_watcher.file_changed.connect(self.on_external_change)
+        self.tab_registry.editor_registered.connect(self.file_watcher.add)
+        self.tab_registry.editor_unregistered.connect(self.file_watcher.remove)
+        # 正在询问是否重新加载的编辑器，避免同一文件连续变化时重复弹出对话框
+        self.prompting_reload = set()
+        # 超过该大小的文件以只读的大文件视图打开
+        self.large_file_threshold = LARGE_FILE_THRESHOLD
+        # 恢复会话期间为 True，此时添加标签页不触发加载
+        self.restoring_session = False
 
-        # 创建标签页控件，并设置现代化简洁样式
+        # 批量打开：并行加载，加载完成的文件再添加标签页，错误在全部完成后统一报告
+        self.batch_loader = BatchLoader(parent=self)
+        self.batch_loader.file_loaded.connect(self.on_batch_file_loaded)
+        self.batch_loader.file_failed.connect(self.on_batch_file_failed)
+        self.batch_loader.progress.connect(self.update_open_progress)
+        self.batch_loader.all_done.connect(self.on_batch_open_finished)
+        self.open_errors: List[tuple] = []
+        # 当前批次中是否已经切换到第一个加载完成的文件
+        self.batch_tab_selected = False
+        self.open_progress_bar = QProgressBar(self)
+        self.open_progress_bar.setRange(0, 100)
+        self.open_progress_bar.setMaximumWidth(200)
+        self.open_progress_bar.setMaximumHeight(14)
+        self.statusBar().addPermanentWidget(self.open_progress_bar)
+        self.open_progress_bar.hide()
+        # 状态栏显示光标所在的行与列、总行数和选中的字符数，光标移动时按固定间隔刷新
+        self.position_label = QLabel(self)
+        self.statusBar().addPermanentWidget(self.position_label)
+        self.status_timer = QTimer(self)
+        self.status_timer.setSingleShot(True)
+        self.status_timer.setInterval(STATUS_UPDATE_INTERVAL)
+        self.status_timer.timeout.connect(self.update_position_status)
+        # 状态栏显示当前标签页的编码与换行符，点击后切换
+        self.encoding_button = QPushButton(self)
+        self.encoding_button.setFlat(True)
+        self.encoding_button.setMenu(self.build_encoding_menu())
+        self.statusBar().addPermanentWidget(self.encoding_button)
+        self.newline_button = QPushButton(self)
+        self.newline_button.setFlat(True)
+        self.newline_button.setMenu(self.build_newline_menu())
+        self.statusBar().addPermanentWidget(self.newline_button)
+
+        # 创建标签页控件
         self.tabs = QTabWidget(self)
         self.tabs.setTabsClosable(True)
         self.tabs.tabCloseRequested.connect(self.close_current_tab)
-        self.tabs.setStyleSheet("""
-            /* 标签页样式 */
-            QTabBar::tab {
-                background: #f0f0f0;
-                border: 1px solid #dcdcdc;
-                border-bottom: none;
-                padding: 2px 5px;
-                margin-right: 2px;
-                border-top-left-radius: 4px;
-                border-top-right-radius: 4px;
-                min-width: 100px;
-                max-width: 100px;
-                text-overflow: ellipsis;
-                overflow: hidden;
-            }
-            QTabBar::tab:selected {
-                background: #ffffff;
-                font-weight: bold;
-                border: 1px solid #b0b0b0;
-                border-bottom: 1px solid #ffffff;
-            }
-            QTabBar::close-button {
-                image: url(%s);
-                background: transparent;
-                width: 16px;
-                height: 16px;
-                margin-left: 4px;
-            }
-            QTabBar::close-button:hover {
-                background-color: #e0e0e0;
-                border-radius: 2px;
-            }
-            QTabBar::close-button:pressed {
-                background-color: #c0c0c0;
-            }
-        """ % get_resource_url("close_icon.png"))
+        # 标签栏样式在添加第一个标签页时才设置
+        self.tabs.currentChanged.connect(self.apply_tab_style)
+
+        # 查找框内容变化后延迟刷新匹配索引，避免每次按键都扫描文档
+        self.match_refresh_timer = QTimer(self)
+        self.match_refresh_timer.setSingleShot(True)
+        self.match_refresh_timer.setInterval(MATCH_REFRESH_DELAY)
+        self.match_refresh_timer.timeout.connect(self.refresh_match_index)
+        # 当前建立了匹配索引的编辑器，以及匹配计数正在跟随的索引
+        self.indexed_text_edit = None
+        self.counted_match_index = None
+        # 正在后台扫描的线程（同一时间只保留一个）及其扫描的编辑器
+        self.scan_worker: Optional[PatternScanWorker] = None
+        self.scan_text_edit: Optional[CustomTextEdit] = None
+
+        # 查找栏、替换栏与在文件中查找面板在第一次使用时才创建
+        self.find_bar: Optional[QWidget] = None
+        self.replace_bar: Optional[QWidget] = None
+        self.find_replace_enabled = False
+        self.find_in_files_panel = None
+        self.diagnostics_panel = None
+
+        # 主布局（查找栏、替换栏、标签页）
+        self.main_layout = QVBoxLayout()
+        self.main_layout.setSpacing(0)
+        self.main_layout.setContentsMargins(0, 0, 0, 0)
+        self.main_layout.addWidget(self.tabs)
+
+        central_widget = QWidget(self)
+        central_widget.setLayout(self.main_layout)
+        self.setCentralWidget(central_widget)
+
+        # 连续的缩放操作合并为一次字体变化，切换标签页时立即应用上一个标签页等待中的缩放
+        self.zoom = ZoomController(MIN_FONT_SIZE, MAX_FONT_SIZE, self)
+        self.tab_registry.editor_unregistered.connect(self.zoom.remove)
+
+        # 创建菜单动作和菜单栏
+        self.create_actions()
+        self.create_menubar()
+
+        self.tabs.currentChanged.connect(self.apply_pending_zoom)
+        self.tabs.currentChanged.connect(self.materialize_tab)
+        self.tabs.currentChanged.connect(self.refresh_match_index)
+        self.tabs.currentChanged.connect(self.update_follow_action)
+        self.tab_registry.editor_registered.connect(self.update_follow_action)
+        self.tabs.currentChanged.connect(self.update_format_status)
+        self.tabs.currentChanged.connect(self.schedule_status_update)
+        self.tab_registry.editor_registered.connect(self.watch_editor)
+        self.update_format_status()
+        # 超出内存预算时让最久未使用的标签页休眠（在 materialize_tab 之后处理标签页切换）
+        self.hibernator = TabHibernator(self.tabs, self.tab_registry, parent=self)
+        self.tab_registry.editor_registered.connect(self.hibernator.add)
+        self.tab_registry.editor_unregistered.connect(self.hibernator.remove)
 
+        # 支持拖放文件
+        self.setAcceptDrops(True)
+
+    def build_find_bars(self) -> None:
+        """第一次显示查找栏或替换栏时创建两者，启动时不构建"""
+        if self.find_bar is not None:
+            return
         # 构建查找栏
         self.find_bar = QWidget(self)
         self.find_layout = QHBoxLayout(self.find_bar)
@@ -143,12 +778,21 @@ class TextEditor(QMainWindow):
         self.find_label = QLabel('查找:', self)
         self.find_input = QLineEdit(self)
         self.find_button = QPushButton('查找', self)
+        self.find_prev_button = QPushButton('上一个', self)
         self.match_case_find_checkbox = QCheckBox("匹配大小写", self)
+        self.whole_word_find_checkbox = QCheckBox("全字匹配", self)
+        self.regex_find_checkbox = QCheckBox("正则表达式", self)
+        self.match_count_label = QLabel(self)
         self.find_layout.addWidget(self.find_label)
         self.find_layout.addWidget(self.find_input)
         self.find_layout.addWidget(self.find_button)
+        self.find_layout.addWidget(self.find_prev_button)
         self.find_layout.addWidget(self.match_case_find_checkbox)
+        self.find_layout.addWidget(self.whole_word_find_checkbox)
+        self.find_layout.addWidget(self.regex_find_checkbox)
+        self.find_layout.addWidget(self.match_count_label)
         self.find_button.setEnabled(False)
+        self.find_prev_button.setEnabled(False)
 
         # 构建替换栏
         self.replace_bar = QWidget(self)
@@ -161,6 +805,8 @@ class TextEditor(QMainWindow):
         self.replace_button = QPushButton('替换', self)
         self.replace_all_button = QPushButton('全部替换', self)
         self.match_case_replace_checkbox = QCheckBox("匹配大小写", self)
+        self.whole_word_replace_checkbox = QCheckBox("全字匹配", self)
+        self.regex_replace_checkbox = QCheckBox("正则表达式", self)
         self.replace_layout.addWidget(self.find_replace_label)
         self.replace_layout.addWidget(self.find_replace_input)
         self.replace_layout.addWidget(self.replace_label)
@@ -168,36 +814,31 @@ class TextEditor(QMainWindow):
         self.replace_layout.addWidget(self.replace_button)
         self.replace_layout.addWidget(self.replace_all_button)
         self.replace_layout.addWidget(self.match_case_replace_checkbox)
+        self.replace_layout.addWidget(self.whole_word_replace_checkbox)
+        self.replace_layout.addWidget(self.regex_replace_checkbox)
         self.replace_button.setEnabled(False)
         self.replace_all_button.setEnabled(False)
 
-        # 主布局（查找栏、替换栏、标签页）
-        main_layout = QVBoxLayout()
-        main_layout.setSpacing(0)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        main_layout.addWidget(self.find_bar)
-        main_layout.addWidget(self.replace_bar)
-        main_layout.addWidget(self.tabs)
-
-        central_widget = QWidget(self)
-        central_widget.setLayout(main_layout)
-        self.setCentralWidget(central_widget)
-
-        # 创建菜单动作和菜单栏
-        self.create_actions()
-        self.create_menubar()
-
-        # 初始时隐藏查找和替换栏
+        self.main_layout.insertWidget(0, self.find_bar)
+        self.main_layout.insertWidget(1, self.replace_bar)
         self.find_bar.setVisible(False)
         self.replace_bar.setVisible(False)
+        self.enable_find_replace(self.find_replace_enabled)
 
         # 连接查找、替换按钮
         self.find_button.clicked.connect(self.find_text)
+        self.find_prev_button.clicked.connect(self.find_previous_text)
+        self.find_input.textChanged.connect(self.match_refresh_timer.start)
+        self.match_case_find_checkbox.toggled.connect(self.match_refresh_timer.start)
+        self.whole_word_find_checkbox.toggled.connect(self.match_refresh_timer.start)
+        self.regex_find_checkbox.toggled.connect(self.match_refresh_timer.start)
         self.replace_button.clicked.connect(self.replace_text)
         self.replace_all_button.clicked.connect(self.replace_all_text)
 
-        # 支持拖放文件
-        self.setAcceptDrops(True)
+    def apply_tab_style(self) -> None:
+        """添加第一个标签页时设置标签栏样式，启动时没有标签页则不解析样式表"""
+        self.tabs.currentChanged.disconnect(self.apply_tab_style)
+        self.tabs.setStyleSheet(TAB_STYLE_SHEET % get_resource_url("close_icon.png"))
 
     def create_actions(self) -> None:
         """创建菜单动作"""
@@ -221,6 +862,10 @@ class TextEditor(QMainWindow):
         self.close_tab_action.setShortcut('Ctrl+W')
         self.close_tab_action.triggered.connect(self.close_current_tab)
 
+        self.goto_line_action = QAction('转到行(&G)...', self)
+        self.goto_line_action.setShortcut('Ctrl+G')
+        self.goto_line_action.triggered.connect(self.goto_line_dialog)
+
         self.toggle_find_action = QAction('显示/隐藏查找栏(&F)', self)
         self.toggle_find_action.setShortcut('Ctrl+F')
         self.toggle_find_action.triggered.connect(self.toggle_find_bar)
@@ -229,13 +874,28 @@ class TextEditor(QMainWindow):
         self.toggle_replace_action.setShortcut('Ctrl+H')
         self.toggle_replace_action.triggered.connect(self.toggle_replace_bar)
 
+        self.find_in_files_action = QAction('在文件中查找(&I)', self)
+        self.find_in_files_action.setShortcut('Ctrl+Shift+F')
+        self.find_in_files_action.triggered.connect(self.show_find_in_files)
+
+        self.follow_action = QAction('跟踪文件末尾(&L)', self)
+        self.follow_action.setCheckable(True)
+        self.follow_action.setEnabled(False)
+        self.follow_action.toggled.connect(self.toggle_follow_mode)
+
+        self.diagnostics_action = QAction('性能诊断(&D)', self)
+        self.diagnostics_action.triggered.connect(self.show_diagnostics)
+
         self.increase_font_size_action = QAction('增大字体', self)
+        self.increase_font_size_action.setShortcuts([QKeySequence(QKeySequence.ZoomIn), QKeySequence('Ctrl+=')])
         self.increase_font_size_action.triggered.connect(self.increase_font_size)
 
         self.decrease_font_size_action = QAction('减小字体', self)
+        self.decrease_font_size_action.setShortcut(QKeySequence.ZoomOut)
         self.decrease_font_size_action.triggered.connect(self.decrease_font_size)
 
         self.reset_font_size_action = QAction('恢复默认字体', self)
+        self.reset_font_size_action.setShortcut('Ctrl+0')
         self.reset_font_size_action.triggered.connect(self.reset_font_size)
 
     def create_menubar(self) -> None:
@@ -249,90 +909,116 @@ class TextEditor(QMainWindow):
         file_menu.addAction(self.close_tab_action)
 
         edit_menu = menubar.addMenu('编辑(&E)')
+        edit_menu.addAction(self.goto_line_action)
         edit_menu.addAction(self.toggle_find_action)
         edit_menu.addAction(self.toggle_replace_action)
+        edit_menu.addAction(self.find_in_files_action)
         edit_menu.addAction(self.increase_font_size_action)
         edit_menu.addAction(self.decrease_font_size_action)
         edit_menu.addAction(self.reset_font_size_action)
 
-    def save_file_ot(self) -> bool:
+        tools_menu = menubar.addMenu('工具(&T)')
+        tools_menu.addAction(self.follow_action)
+        tools_menu.addAction(self.diagnostics_action)
+
+    def save_file_ot(self, wait: bool = False) -> bool:
         """
-        保存当前文件；如果是新文件且未保存则调用“另存为”，否则直接保存
+        保存当前文件；如果是新文件且未保存则调用“另存为”，否则直接保存。
+        保存在后台进行，wait 为 True 时等待保存完成并返回是否成功
         """
-        current_text_edit = self.get_current_text_edit()
-        if current_text_edit:
-            if current_text_edit.is_new_file and not current_text_edit.file_path:
-                self.save_as_file_ot()
-                return True
+        return self.save_editor(self.get_current_text_edit(), wait)
+
+    def save_editor(self, text_edit, wait: bool = False) -> bool:
+        """保存指定的编辑器（不一定是当前标签页），未命名的新文件调用“另存为”"""
+        if isinstance(text_edit, LargeFileView):
+            return True
+        if text_edit:
+            if not text_edit.file_path:
+                return self.save_as_file_ot(wait, text_edit)
             else:
-                try:
-                    save_file(current_text_edit, current_text_edit.file_path)
-                    current_text_edit.is_saved = True
-                    current_text_edit.is_new_file = False
-                    update_tab_title(self, current_text_edit)
-                    return True
-                except Exception as e:
-                    QMessageBox.critical(self, "错误", f"保存失败: {e}")
-                    return False
+                return self.start_save(text_edit, text_edit.file_path, wait)
         return False
 
-    def save_as_file_ot(self) -> None:
-        """另存为当前文件，同时默认文件名自动填入当前文件名（或新文件“未命名”）"""
-        current_text_edit = self.get_current_text_edit()
-        if current_text_edit:
+    def save_as_file_ot(self, wait: bool = False, text_edit=None) -> bool:
+        """
+        另存为当前文件（或指定的编辑器），同时默认文件名自动填入当前文件名（或新文件“未命名”）。
+        取消选择文件时返回 False
+        """
+        current_text_edit = text_edit or self.get_current_text_edit()
+        if current_text_edit and not isinstance(current_text_edit, LargeFileView):
             # 如果当前文件已有路径，则取其文件名，否则使用"未命名"
             default_name = os.path.basename(current_text_edit.file_path) if current_text_edit.file_path else "未命名"
             file_path, _ = QFileDialog.getSaveFileName(
                 self, "另存为", default_name, "文本文件 (*.txt);;所有文件 (*)"
             )
             if file_path:
-                save_file(current_text_edit, file_path)
-                current_text_edit.file_path = file_path
-                current_text_edit.is_saved = True
-                current_text_edit.is_new_file = False
-                update_tab_title(self, current_text_edit)
+                return self.start_save(current_text_edit, file_path, wait)
+        return False
+
+    def start_save(self, text_edit: CustomTextEdit, file_path: str, wait: bool = False) -> bool:
+        """
+        开始后台保存，完成后由 CustomTextEdit.on_file_saved 更新标签标题；
+        wait 为 True 时在局部事件循环中等待保存结束并返回是否成功
+        """
+        if text_edit.is_loading:
+            QMessageBox.information(self, "提示", "文件仍在加载，请稍后再保存。")
+            return False
+        if text_edit.is_pasting:
+            QMessageBox.information(self, "提示", "正在粘贴，请稍后再保存。")
+            return False
+        worker = save_file(text_edit, file_path)
+        if worker is None:
+            return False
+        text_edit.pending_saves += 1
+        worker.finished.connect(text_edit.on_save_finished)
+        if wait:
+            loop = QEventLoop()
+            worker.finished.connect(loop.quit)
+            if not worker.isFinished():
+                loop.exec()
+            return worker.succeeded
+        return True
 
     def increase_font_size(self) -> None:
-        """增大当前编辑器字体"""
+        """增大当前编辑器字体（由 ZoomController 合并连续的操作后应用）"""
         current_text_edit = self.get_current_text_edit()
         if current_text_edit:
-            font = current_text_edit.font()
-            new_size = min(font.pointSize() + 1, MAX_FONT_SIZE)
-            font.setPointSize(new_size)
-            current_text_edit.setFont(font)
+            self.zoom.zoom_by(current_text_edit, 1)
             self.update_font_size_buttons()
 
     def decrease_font_size(self) -> None:
         """减小当前编辑器字体"""
         current_text_edit = self.get_current_text_edit()
         if current_text_edit:
-            font = current_text_edit.font()
-            new_size = max(font.pointSize() - 1, MIN_FONT_SIZE)
-            font.setPointSize(new_size)
-            current_text_edit.setFont(font)
+            self.zoom.zoom_by(current_text_edit, -1)
             self.update_font_size_buttons()
 
     def reset_font_size(self) -> None:
         """恢复默认字体大小"""
         current_text_edit = self.get_current_text_edit()
         if current_text_edit:
-            font = current_text_edit.font()
-            font.setPointSize(DEFAULT_FONT_SIZE)
-            current_text_edit.setFont(font)
+            self.zoom.zoom_to(current_text_edit, DEFAULT_FONT_SIZE)
             self.update_font_size_buttons()
 
-    def get_current_text_edit(self) -> Optional[CustomTextEdit]:
-        """获取当前活动标签页中的 CustomTextEdit"""
+    def apply_pending_zoom(self) -> None:
+        """切换标签页时应用上一个标签页等待中的缩放（标签页正在关闭时直接放弃）"""
+        text_edit = self.zoom.text_edit
+        if text_edit is not None and self.tabs.indexOf(text_edit.parent()) == -1:
+            self.zoom.remove(text_edit)
+        self.zoom.apply()
+
+    def get_current_text_edit(self):
+        """获取当前活动标签页中的编辑器（CustomTextEdit 或 LargeFileView）"""
         current_widget = self.tabs.currentWidget()
         if current_widget:
-            return current_widget.findChild(CustomTextEdit)
+            return self.tab_registry.editor_for(current_widget)
         return None
 
     def update_font_size_buttons(self) -> None:
         """根据当前字体大小更新按钮状态"""
         current_text_edit = self.get_current_text_edit()
         if current_text_edit:
-            font_size = current_text_edit.font().pointSize()
+            font_size = self.zoom.font_size(current_text_edit)
             self.increase_font_size_action.setEnabled(font_size < MAX_FONT_SIZE)
             self.decrease_font_size_action.setEnabled(font_size > MIN_FONT_SIZE)
         else:
@@ -340,12 +1026,101 @@ class TextEditor(QMainWindow):
             self.decrease_font_size_action.setEnabled(False)
 
     def open_file(self) -> None:
-        """打开文件并添加到新标签页"""
+        """打开一个或多个文件，每个文件一个标签页"""
         options = QFileDialog.Options()
-        file_name, _ = QFileDialog.getOpenFileName(
+        file_names, _ = QFileDialog.getOpenFileNames(
             self, '打开文件', '', '文本文件 (*.txt);;所有文件 (*)', options=options)
-        if file_name:
-            self.add_new_tab(file_name)
+        if file_names:
+            self.open_files(file_names)
+
+    def open_files(self, file_paths: List[str], read_only: bool = False,
+                   encoding: Optional[str] = None) -> None:
+        """
+        打开多个文件：在后台并行读取与解码，每个文件加载完成后添加标签页，
+        状态栏显示总进度，无法打开的文件在全部完成后统一报告。
+        只有一个文件时直接打开并立即显示标签页
+        """
+        if len(file_paths) == 1 and not self.batch_loader.is_busy():
+            self.add_new_tab(file_paths[0], read_only=read_only, encoding=encoding)
+            return
+        for file_path in file_paths:
+            if self.tab_registry.find(file_path) is not None:
+                continue
+            if not is_text_file(file_path):
+                self.open_errors.append((file_path, "不是有效的文本文件"))
+                continue
+            try:
+                large = is_large_file(file_path, self.large_file_threshold)
+            except OSError as e:
+                self.open_errors.append((file_path, str(e)))
+                continue
+            if large:
+                # 大文件视图只映射文件，不需要排队加载
+                self.add_new_tab(file_path, encoding=encoding)
+                continue
+            text_edit = CustomTextEdit()
+            text_edit.file_path = file_path
+            text_edit.forced_read_only = read_only
+            text_edit.forced_encoding = encoding
+            self.tab_registry.register(text_edit)
+            self.batch_loader.add(text_edit)
+        if not self.batch_loader.is_busy():
+            self.on_batch_open_finished()
+
+    def open_arguments(self, args: List[str], cwd: str) -> None:
+        """
+        按命令行参数打开文件（包括其他实例转发来的参数），相对路径相对于 cwd。
+        带 +行号 的文件逐个打开并跳转，其余文件批量打开
+        """
+        try:
+            arguments = parse_arguments(args)
+        except SystemExit:
+            return
+        files = [file._replace(path=os.path.normpath(os.path.join(cwd, file.path))) for file in arguments.files]
+        files = [file for file in files if os.path.isfile(file.path)]
+        for file in files:
+            if file.line is not None:
+                self.add_new_tab(file.path, file.line, arguments.readonly, arguments.encoding)
+        file_paths = [file.path for file in files if file.line is None]
+        if file_paths:
+            self.open_files(file_paths, arguments.readonly, arguments.encoding)
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    def on_batch_file_loaded(self, text_edit: CustomTextEdit) -> None:
+        """批量打开的文件加载完成：添加标签页，并切换到本批次第一个完成的文件"""
+        file_path = text_edit.file_path
+        add_new_tab_e(self, text_edit, file_path, os.path.basename(file_path), load=False)
+        self.tab_registry.register(text_edit)
+        if not self.batch_tab_selected:
+            self.batch_tab_selected = True
+            self.tabs.setCurrentIndex(self.tabs.count() - 1)
+        self.enable_find_replace(True)
+        self.update_font_size_buttons()
+
+    def on_batch_file_failed(self, text_edit: CustomTextEdit, message: str) -> None:
+        self.tab_registry.unregister(text_edit)
+        self.open_errors.append((text_edit.file_path, message))
+        text_edit.deleteLater()
+
+    def update_open_progress(self, completed: int, total: int, percent: int) -> None:
+        self.open_progress_bar.setValue(percent)
+        self.open_progress_bar.setFormat(f"正在打开 {completed}/{total}")
+        self.open_progress_bar.show()
+
+    def on_batch_open_finished(self) -> None:
+        """批量打开全部完成：隐藏进度条，有文件无法打开时显示一次汇总"""
+        self.open_progress_bar.hide()
+        self.batch_tab_selected = False
+        if not self.open_errors:
+            return
+        errors, self.open_errors = self.open_errors, []
+        box = QMessageBox(QMessageBox.Warning, "提示", f"有 {len(errors)} 个文件无法打开", QMessageBox.Ok, self)
+        box.setDetailedText("\n".join(f"{file_path}: {message}" for file_path, message in errors))
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.show()
 
     def new_file(self) -> None:
         """
@@ -357,34 +1132,155 @@ class TextEditor(QMainWindow):
         text_edit.file_path = None
         try:
             new_file_e(self, text_edit)
+            self.tab_registry.register(text_edit)
         except Exception as e:
             QMessageBox.critical(self, "错误", f"新建文件时发生错误：{e}")
         self.enable_find_replace(True)
 
-    def add_new_tab(self, file_path: str) -> None:
-        """添加新标签页并加载指定文件"""
+    def add_new_tab(self, file_path: str, line: Optional[int] = None, read_only: bool = False,
+                    encoding: Optional[str] = None) -> None:
+        """
+        添加新标签页并加载指定文件，指定 line（从 0 开始）时跳转到该行；
+        read_only 与 encoding 对应命令行的 --readonly 与 --encoding
+        """
         file_name = os.path.basename(file_path)
-        mime_type, _ = mimetypes.guess_type(file_path)
-        if mime_type and not mime_type.startswith('text'):
+        if not is_text_file(file_path):
             QMessageBox.critical(self, "错误", "请选择一个有效的TXT文件")
             return
 
-        if file_path in self.opened_files:
-            for index in range(self.tabs.count()):
-                tab_widget = self.tabs.widget(index)
-                text_edit = tab_widget.findChild(CustomTextEdit)
-                if text_edit and text_edit.file_path == file_path:
-                    self.tabs.setCurrentIndex(index)
-                    return
+        text_edit = self.tab_registry.find(file_path)
+        if text_edit is not None:
+            # 批量打开中尚未加载完成的文件还没有标签页
+            index = self.tabs.indexOf(text_edit.parent())
+            if index != -1:
+                self.tabs.setCurrentIndex(index)
+                if line is not None:
+                    text_edit.goto_line(line)
+            return
         else:
-            self.opened_files.add(file_path)
-            text_edit = CustomTextEdit()
+            if is_large_file(file_path, self.large_file_threshold):
+                text_edit = LargeFileView()
+                text_edit.setFont(QFont("微软雅黑", DEFAULT_FONT_SIZE))
+            else:
+                text_edit = CustomTextEdit()
+                text_edit.forced_read_only = read_only
+            text_edit.forced_encoding = encoding
             text_edit.file_path = file_path
             add_new_tab_e(self, text_edit, file_path, file_name)
+            self.tab_registry.register(text_edit)
+            if line is not None:
+                text_edit.goto_line(line)
 
         self.enable_find_replace(True)
         self.update_font_size_buttons()
 
+    def restore_session(self) -> None:
+        """
+        恢复上次关闭时打开的标签页。恢复的标签页只记录状态，
+        切换到该标签页时才读取并解码文件，启动耗时与标签页数量无关
+        """
+        session = load_session()
+        current = 0
+        self.restoring_session = True
+        try:
+            for position, state in enumerate(session['tabs']):
+                file_path = state['path']
+                if not os.path.isfile(file_path) or self.tab_registry.find(file_path) is not None:
+                    continue
+                if is_large_file(file_path, self.large_file_threshold):
+                    text_edit = LargeFileView()
+                else:
+                    text_edit = CustomTextEdit()
+                font_size = max(MIN_FONT_SIZE, min(MAX_FONT_SIZE, int(state.get('font_size', DEFAULT_FONT_SIZE))))
+                text_edit.setFont(QFont("微软雅黑", font_size))
+                text_edit.file_path = file_path
+                text_edit.session_state = state
+                add_new_tab_e(self, text_edit, file_path, os.path.basename(file_path), load=False)
+                self.tab_registry.register(text_edit)
+                if position == session['current']:
+                    current = self.tabs.count() - 1
+        finally:
+            self.restoring_session = False
+        if self.tabs.count():
+            self.tabs.setCurrentIndex(current)
+            self.materialize_tab(current)
+            self.enable_find_replace(True)
+            self.update_font_size_buttons()
+
+    def recover_unsaved_changes(self) -> None:
+        """
+        上次异常退出时留下了恢复日志：询问是否恢复，恢复时打开对应的文件，
+        加载完成后在磁盘内容上重放修改。处理后删除旧日志，只保留无法恢复的文件的日志
+        """
+        locks, journals = find_recoverable_journals(self.recovery.directory)
+        failed = []
+        if journals:
+            details = []
+            for _, header, records in journals:
+                file_path = header.get('path')
+                line = file_path or "未命名"
+                if file_path and (header.get('mtime'), header.get('size')) != file_state(file_path):
+                    line += "（文件在此期间已被修改，恢复结果可能不正确）"
+                details.append(line)
+            box = QMessageBox(QMessageBox.Question, "恢复",
+                              f"OpenT 上次没有正常退出，发现 {len(journals)} 个文件的未保存修改，是否恢复？",
+                              QMessageBox.Yes | QMessageBox.No, self)
+            box.button(QMessageBox.Yes).setText("恢复")
+            box.button(QMessageBox.No).setText("放弃")
+            box.setDetailedText("\n".join(details))
+            if box.exec() == QMessageBox.Yes:
+                failed = [(journal_path, header.get('path')) for journal_path, header, records in journals
+                          if not self.replay_recovered(header, records)]
+                if failed:
+                    QMessageBox.warning(self, "提示", "以下文件无法恢复，修改已保留，下次启动时可以再次恢复：\n"
+                                        + "\n".join(file_path for _, file_path in failed))
+        discard_journals(locks, [journal_path for journal_path, _ in failed])
+
+    def replay_recovered(self, header: dict, records: list) -> bool:
+        """打开日志对应的文件（未命名文件新建标签页）并重放修改，文件无法打开时返回 False"""
+        file_path = header.get('path')
+        if file_path is None:
+            self.new_file()
+            text_edit = self.get_current_text_edit()
+        else:
+            if not os.path.isfile(file_path) or is_large_file(file_path, self.large_file_threshold):
+                return False
+            self.add_new_tab(file_path, encoding=header.get('encoding'))
+            text_edit = self.tab_registry.find(file_path)
+        if not isinstance(text_edit, CustomTextEdit):
+            return False
+        text_edit.replay_journal(records)
+        return True
+
+    def materialize_tab(self, index: int) -> None:
+        """会话恢复的标签页首次激活时加载文件并恢复光标与滚动位置"""
+        tab_widget = self.tabs.widget(index)
+        if self.restoring_session or tab_widget is None:
+            return
+        text_edit = self.tab_registry.editor_for(tab_widget)
+        if text_edit is None or text_edit.session_state is None:
+            return
+        if isinstance(text_edit, CustomTextEdit):
+            text_edit.wake(tab_widget.findChild(QProgressBar))
+            return
+        state = text_edit.session_state
+        text_edit.session_state = None
+        text_edit.load_file_async(text_edit.file_path, tab_widget.findChild(QProgressBar))
+        text_edit.restore_view_state(int(state.get('cursor', 0)), int(state.get('scroll', 0)))
+
+    def save_open_tabs(self) -> None:
+        """保存已打开文件的标签页状态（未命名的新文件不保存）"""
+        tabs = []
+        current = 0
+        for index in range(self.tabs.count()):
+            text_edit = self.tab_registry.editor_for(self.tabs.widget(index))
+            if text_edit is None or not text_edit.file_path:
+                continue
+            if index == self.tabs.currentIndex():
+                current = len(tabs)
+            tabs.append(text_edit.view_state())
+        save_session(tabs, current)
+
     def close_current_tab(self, index: Optional[int] = None) -> None:
         """
         关闭当前标签页；若有未保存内容则提示
@@ -393,70 +1289,442 @@ class TextEditor(QMainWindow):
             index = self.tabs.currentIndex()
         current_widget = self.tabs.widget(index)
         if current_widget:
-            text_edit = current_widget.findChild(CustomTextEdit)
-            if text_edit.file_path and not text_edit.is_saved:
+            text_edit = self.tab_registry.editor_for(current_widget)
+            if isinstance(text_edit, LargeFileView):
+                text_edit.release_file()
+            else:
+                text_edit.cancel_loading()
+            if not text_edit.is_saved:
                 icon_path = get_resource_path("icon.ico")
                 result = show_hint("文件未保存，是否保存？", "提示", icon_path)
                 if result == QMessageBox.Save:
-                    if self.save_file_ot():
-                        close_tab(current_widget, self.tabs)
-                        self.opened_files.discard(text_edit.file_path)
+                    # 关闭的不一定是当前标签页；休眠的标签页先恢复内容再保存
+                    if isinstance(text_edit, CustomTextEdit) and text_edit.session_state is not None:
+                        text_edit.wake(current_widget.findChild(QProgressBar))
+                    if self.save_editor(text_edit, wait=True):
+                        self.remove_tab(current_widget, text_edit)
                 elif result == QMessageBox.Discard:
-                    close_tab(current_widget, self.tabs)
-                    self.opened_files.discard(text_edit.file_path)
+                    self.remove_tab(current_widget, text_edit)
             else:
-                close_tab(current_widget, self.tabs)
-                if text_edit and text_edit.file_path:
-                    self.opened_files.discard(text_edit.file_path)
+                self.remove_tab(current_widget, text_edit)
 
-        if not self.opened_files:
+        if not len(self.tab_registry):
             self.enable_find_replace(False)
 
+    def remove_tab(self, tab_widget, text_edit) -> None:
+        """
+        关闭标签页并注销编辑器。编辑器持有的匹配索引先解除、正在为它进行的后台扫描先取消，
+        避免之后访问已删除的对象
+        """
+        if text_edit is self.indexed_text_edit:
+            self.attach_match_index(None)
+        if self.scan_worker is not None and self.scan_text_edit is text_edit:
+            self.cancel_pattern_scan()
+        close_tab(tab_widget, self.tabs)
+        self.tab_registry.unregister(text_edit)
+
     def enable_find_replace(self, enable: bool) -> None:
         """启用或禁用查找与替换功能"""
+        self.find_replace_enabled = enable
+        if self.find_bar is None:
+            return
         self.find_button.setEnabled(enable)
+        self.find_prev_button.setEnabled(enable)
         self.replace_button.setEnabled(enable)
         self.replace_all_button.setEnabled(enable)
 
-    def find_text(self) -> None:
-        """触发查找操作"""
+    def find_options(self) -> tuple:
+        """查找栏的选项：(匹配大小写, 正则表达式, 全字匹配)"""
+        return (self.match_case_find_checkbox.isChecked(), self.regex_find_checkbox.isChecked(),
+                self.whole_word_find_checkbox.isChecked())
+
+    def replace_options(self) -> tuple:
+        """替换栏的选项：(匹配大小写, 正则表达式, 全字匹配)"""
+        return (self.match_case_replace_checkbox.isChecked(), self.regex_replace_checkbox.isChecked(),
+                self.whole_word_replace_checkbox.isChecked())
+
+    def find_text(self, backward: bool = False) -> None:
+        """触发查找操作；匹配索引不是当前查询的时先在后台扫描，完成后再定位"""
         query = self.find_input.text()
-        match_case = self.match_case_find_checkbox.isChecked()
+        match_case, use_regex, whole_word = self.find_options()
         current_text_edit = self.get_current_text_edit()
-        if current_text_edit:
-            find_text(query, current_text_edit, match_case)
+        if isinstance(current_text_edit, LargeFileView):
+            current_text_edit.find_text(query, match_case, use_regex, whole_word)
+        elif current_text_edit:
+            self.match_refresh_timer.stop()
+
+            def find() -> None:
+                find_text(query, current_text_edit, match_case, backward, use_regex, whole_word)
+                self.attach_match_index(current_text_edit)
+
+            if query:
+                self.scan_match_index(current_text_edit, query, (match_case, use_regex, whole_word), find)
+            else:
+                find()
+
+    def find_previous_text(self) -> None:
+        """查找上一个匹配项"""
+        self.find_text(backward=True)
+
+    def refresh_match_index(self) -> None:
+        """根据查找栏内容为当前标签页建立匹配索引，用于高亮与匹配计数"""
+        if self.find_bar is None:
+            return
+        current_text_edit = self.get_current_text_edit()
+        query = self.find_input.text()
+        if (self.find_bar.isVisible() and query and isinstance(current_text_edit, CustomTextEdit)
+                and not current_text_edit.is_loading):
+            self.scan_match_index(current_text_edit, query, self.find_options(),
+                                  lambda: self.attach_match_index(current_text_edit))
+        else:
+            self.cancel_pattern_scan()
+            self.attach_match_index(None)
+
+    def scan_match_index(self, text_edit: CustomTextEdit, query: str, options: tuple,
+                         on_ready: Callable[[], None]) -> None:
+        """
+        确保 text_edit 拥有当前查询的匹配索引后调用 on_ready：
+        索引已存在时立即调用，否则在后台扫描文档快照，完成后建立索引再调用
+        """
+        key = (query,) + tuple(options)
+        if text_edit.match_index is not None and text_edit.match_index.key == key:
+            on_ready()
+            return
+        try:
+            pattern = compile_pattern(query, *options)
+        except re.error as e:
+            self.match_count_label.setText("正则表达式无效")
+            QMessageBox.warning(self, "警告", f"正则表达式无效: {e}")
+            return
+
+        def on_scanned(starts, ends, _) -> None:
+            text_edit.set_match_index(MatchIndex(text_edit.document(), key, pattern, starts, ends))
+            on_ready()
+
+        self.start_pattern_scan(text_edit, pattern, None, on_scanned)
+
+    def start_pattern_scan(self, text_edit: CustomTextEdit, pattern, replacement: Optional[str],
+                           on_scanned: Callable) -> None:
+        """
+        在后台线程中扫描 text_edit 的文本快照，完成后在界面线程调用
+        on_scanned(起点列表, 终点列表, 替换文本列表)。
+        扫描期间文档被修改时丢弃结果并重新扫描
+        """
+        self.cancel_pattern_scan()
+        document = text_edit.document()
+        revision = document.revision()
+        worker = PatternScanWorker(document.toPlainText(), pattern, replacement)
+
+        def on_finished(starts, ends, replacements) -> None:
+            if self.scan_worker is not worker:
+                return
+            self.scan_worker = None
+            if document.revision() != revision:
+                self.start_pattern_scan(text_edit, pattern, replacement, on_scanned)
+            else:
+                on_scanned(starts, ends, replacements)
+
+        def on_timed_out() -> None:
+            if self.scan_worker is worker:
+                self.scan_worker = None
+                QMessageBox.warning(self, "警告", "查找超时，请尝试更简单的表达式。")
+
+        def on_failed(message: str) -> None:
+            if self.scan_worker is worker:
+                self.scan_worker = None
+                QMessageBox.critical(self, "错误", f"发生错误: {message}")
+
+        worker.scanned.connect(on_finished)
+        worker.timed_out.connect(on_timed_out)
+        worker.failed.connect(on_failed)
+        self.scan_worker = worker
+        self.scan_text_edit = text_edit
+        worker.start()
+
+    def cancel_pattern_scan(self) -> None:
+        """取消正在进行的后台扫描"""
+        if self.scan_worker is not None:
+            self.scan_worker.requestInterruption()
+            self.scan_worker = None
+            self.scan_text_edit = None
+
+    def attach_match_index(self, text_edit: Optional[CustomTextEdit]) -> None:
+        """
+        只保留一个编辑器的匹配索引：切换到其他编辑器时清除旧编辑器的索引与高亮，
+        并让匹配计数跟随新编辑器的光标与内容变化
+        """
+        previous = self.indexed_text_edit
+        if previous is not None and sip.isdeleted(previous):
+            previous = None
+        if previous is not text_edit and previous is not None:
+            previous.cursorPositionChanged.disconnect(self.update_match_count)
+            previous.set_match_index(None)
+        if text_edit is not None and previous is not text_edit:
+            text_edit.cursorPositionChanged.connect(self.update_match_count)
+        self.indexed_text_edit = text_edit
+        match_index = text_edit.match_index if text_edit is not None else None
+        if match_index is not None and match_index is not self.counted_match_index:
+            match_index.changed.connect(self.update_match_count)
+        self.counted_match_index = match_index
+        self.update_match_count()
+
+    def update_match_count(self) -> None:
+        """显示“第 n 项，共 N 项”"""
+        text_edit = self.indexed_text_edit
+        if text_edit is None or text_edit.match_index is None:
+            self.match_count_label.clear()
+            return
+        match_index = text_edit.match_index
+        cursor = text_edit.textCursor()
+        index = match_index.match_at(cursor.selectionStart(), cursor.selectionEnd())
+        if index is None:
+            self.match_count_label.setText(f"共 {len(match_index)} 项")
+        else:
+            self.match_count_label.setText(f"第 {index + 1} 项，共 {len(match_index)} 项")
 
     def replace_text(self) -> None:
         """替换当前匹配项"""
         find_query = self.find_replace_input.text()
         replace_query = self.replace_input.text()
-        match_case = self.match_case_replace_checkbox.isChecked()
+        match_case, use_regex, whole_word = self.replace_options()
         current_text_edit = self.get_current_text_edit()
-        if current_text_edit:
-            replace_text(find_query, replace_query, current_text_edit, match_case)
+        if isinstance(current_text_edit, LargeFileView):
+            QMessageBox.information(self, "提示", "大文件以只读模式打开，无法替换。")
+        elif current_text_edit:
+            replace_text(find_query, replace_query, current_text_edit, match_case, use_regex, whole_word)
 
     def replace_all_text(self) -> None:
-        """替换所有匹配项"""
+        """替换所有匹配项：在后台扫描文档快照，完成后一次性应用所有替换"""
         find_query = self.find_replace_input.text()
         replace_query = self.replace_input.text()
-        match_case = self.match_case_replace_checkbox.isChecked()
+        options = self.replace_options()
+        match_case, use_regex, whole_word = options
         current_text_edit = self.get_current_text_edit()
-        if current_text_edit:
-            replace_all_text(find_query, replace_query, current_text_edit, match_case)
+        if isinstance(current_text_edit, LargeFileView):
+            QMessageBox.information(self, "提示", "大文件以只读模式打开，无法替换。")
+            return
+        if not current_text_edit:
+            return
+        match_index = current_text_edit.match_index
+        if not find_query.strip() or (
+                not use_regex and match_index is not None and match_index.key == (find_query,) + options):
+            # 空查询由 replace_all_text 提示；已有同一查询的索引时直接使用
+            self.show_replace_count(replace_all_text(find_query, replace_query, current_text_edit, *options))
+            return
+        try:
+            pattern = compile_pattern(find_query, *options)
+        except re.error as e:
+            QMessageBox.warning(self, "警告", f"正则表达式无效: {e}")
+            return
+
+        def on_scanned(starts, ends, replacements) -> None:
+            spans = zip(starts, ends, replacements if replacements is not None else repeat(replace_query))
+            self.show_replace_count(apply_replacements(current_text_edit, list(spans)))
+
+        self.start_pattern_scan(current_text_edit, pattern, replace_query if use_regex else None, on_scanned)
+
+    def show_replace_count(self, count: int) -> None:
+        """在状态栏显示替换数量"""
+        if count:
+            self.statusBar().showMessage(f"已替换 {count} 处", 3000)
+
+    def show_find_in_files(self) -> None:
+        """显示在文件中查找面板（第一次使用时创建），默认搜索当前文件所在的目录"""
+        if self.find_in_files_panel is None:
+            from find_in_files import FindInFilesPanel
+            self.find_in_files_panel = FindInFilesPanel(self)
+            self.find_in_files_panel.open_location.connect(self.add_new_tab)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.find_in_files_panel)
+        panel = self.find_in_files_panel
+        current_text_edit = self.get_current_text_edit()
+        if not panel.directory_input.text() and current_text_edit and current_text_edit.file_path:
+            panel.directory_input.setText(os.path.dirname(current_text_edit.file_path))
+        if isinstance(current_text_edit, CustomTextEdit):
+            selected = current_text_edit.textCursor().selectedText()
+            # 多行选中（U+2029 为段落分隔）不适合作为查询
+            if selected and '\u2029' not in selected:
+                panel.query_input.setText(selected)
+        panel.setVisible(True)
+        panel.query_input.setFocus()
+        panel.query_input.selectAll()
+
+    def on_external_change(self, text_edit: CustomTextEdit) -> None:
+        """
+        文件被其他程序修改：未修改的标签页直接重新加载（跟踪模式下只读取追加的内容），
+        有未保存修改的标签页询问是否重新加载。文件状态与上次读取或保存时相同时
+        （例如本程序自己的保存）不做处理
+        """
+        if (text_edit.is_loading or text_edit.is_pasting or text_edit.session_state is not None
+                or text_edit.pending_saves or text_edit in self.prompting_reload):
+            return
+        state = file_state(text_edit.file_path)
+        if state == text_edit.disk_state or state == (None, None):
+            return
+        if text_edit.is_saved:
+            if not (text_edit.follow_mode and text_edit.append_from_disk()):
+                text_edit.reload_from_disk()
+            return
+        self.prompting_reload.add(text_edit)
+        try:
+            result = QMessageBox.question(
+                self, "提示", f"{os.path.basename(text_edit.file_path)} 已被其他程序修改，是否重新加载？\n"
+                            "重新加载将丢失未保存的修改。")
+        finally:
+            self.prompting_reload.discard(text_edit)
+        if result == QMessageBox.Yes:
+            text_edit.reload_from_disk()
+        else:
+            # 保留当前内容，之后的保存将覆盖磁盘上的版本，同一版本不再询问
+            text_edit.disk_state = file_state(text_edit.file_path)
+
+    def toggle_follow_mode(self, enabled: bool) -> None:
+        current_text_edit = self.get_current_text_edit()
+        if isinstance(current_text_edit, CustomTextEdit) and current_text_edit.file_path:
+            current_text_edit.set_follow_mode(enabled)
+
+    def update_follow_action(self) -> None:
+        """切换标签页时更新“跟踪文件末尾”的选中状态（大文件视图与未命名文件不支持）"""
+        current_text_edit = self.get_current_text_edit()
+        supported = isinstance(current_text_edit, CustomTextEdit) and bool(current_text_edit.file_path)
+        self.follow_action.blockSignals(True)
+        self.follow_action.setChecked(supported and current_text_edit.follow_mode)
+        self.follow_action.blockSignals(False)
+        self.follow_action.setEnabled(supported)
+
+    def build_encoding_menu(self) -> QMenu:
+        """编码菜单：用其他编码重新打开（探测错误时），或转换编码后保存"""
+        menu = QMenu(self)
+        self.reopen_encoding_menu = menu.addMenu('通过编码重新打开')
+        save_menu = menu.addMenu('通过编码保存')
+        for label, encoding, bom in ENCODING_CHOICES:
+            self.reopen_encoding_menu.addAction(
+                label, lambda checked=False, encoding=encoding: self.reopen_with_encoding(encoding))
+            save_menu.addAction(
+                label, lambda checked=False, encoding=encoding, bom=bom: self.convert_encoding(encoding, bom))
+        return menu
+
+    def build_newline_menu(self) -> QMenu:
+        menu = QMenu(self)
+        for newline, name in NEWLINE_NAMES.items():
+            menu.addAction(name, lambda checked=False, newline=newline: self.convert_newline(newline))
+        return menu
+
+    def watch_editor(self, text_edit) -> None:
+        """编辑器的光标、行数或格式变化时刷新状态栏（只显示当前标签页，其他编辑器的通知没有影响）"""
+        if isinstance(text_edit, CustomTextEdit):
+            text_edit.format_changed.connect(self.update_format_status)
+            text_edit.cursorPositionChanged.connect(self.schedule_status_update)
+            text_edit.selectionChanged.connect(self.schedule_status_update)
+            text_edit.blockCountChanged.connect(self.schedule_status_update)
+        elif isinstance(text_edit, LargeFileView):
+            text_edit.verticalScrollBar().valueChanged.connect(self.schedule_status_update)
+            text_edit.verticalScrollBar().rangeChanged.connect(self.schedule_status_update)
+
+    def schedule_status_update(self) -> None:
+        """节流：计时器运行期间的通知合并为一次刷新"""
+        if not self.status_timer.isActive():
+            self.status_timer.start()
+
+    def update_position_status(self) -> None:
+        """
+        显示光标所在的行与列、总行数和选中的字符数。
+        行号由 QTextDocument 的文本块树查找（O(log n)），总行数直接取块数，不扫描文档
+        """
+        current_text_edit = self.get_current_text_edit()
+        if isinstance(current_text_edit, CustomTextEdit):
+            cursor = current_text_edit.textCursor()
+            text = (f"第 {cursor.blockNumber() + 1} 行，第 {cursor.positionInBlock() + 1} 列"
+                    f"  共 {current_text_edit.blockCount()} 行")
+            selected = cursor.selectionEnd() - cursor.selectionStart()
+            if selected:
+                text += f"  已选择 {selected} 个字符"
+        elif isinstance(current_text_edit, LargeFileView):
+            line_count, complete = current_text_edit.line_count()
+            text = (f"第 {current_text_edit.verticalScrollBar().value() + 1} 行"
+                    f"  共 {line_count}{'' if complete else '+'} 行")
+        else:
+            text = ""
+        self.position_label.setText(text)
+
+    def goto_line_dialog(self) -> None:
+        """输入行号并跳转（大文件视图在后台建立索引期间可以输入超出已索引范围的行号）"""
+        current_text_edit = self.get_current_text_edit()
+        if isinstance(current_text_edit, CustomTextEdit):
+            current = current_text_edit.textCursor().blockNumber() + 1
+            line_count, complete = current_text_edit.blockCount(), not current_text_edit.is_loading
+        elif isinstance(current_text_edit, LargeFileView):
+            current = current_text_edit.verticalScrollBar().value() + 1
+            line_count, complete = current_text_edit.line_count()
+        else:
+            return
+        maximum = line_count if complete else 2 ** 31 - 1
+        line, ok = QInputDialog.getInt(self, "转到行", f"行号（1 - {line_count}{'' if complete else '+'}）:",
+                                       current, 1, max(1, maximum))
+        if ok:
+            current_text_edit.goto_line(line - 1)
+            current_text_edit.setFocus()
+
+    def update_format_status(self) -> None:
+        """在状态栏显示当前标签页的编码与换行符（大文件视图只读，只显示编码）"""
+        current_text_edit = self.get_current_text_edit()
+        if isinstance(current_text_edit, CustomTextEdit):
+            self.encoding_button.setText(encoding_label(current_text_edit.encoding, current_text_edit.bom))
+            self.newline_button.setText(NEWLINE_NAMES[current_text_edit.newline])
+            self.reopen_encoding_menu.setEnabled(bool(current_text_edit.file_path))
+        elif isinstance(current_text_edit, LargeFileView):
+            self.encoding_button.setText(encoding_label(current_text_edit.encoding))
+        self.encoding_button.setVisible(current_text_edit is not None)
+        self.encoding_button.setEnabled(isinstance(current_text_edit, CustomTextEdit))
+        self.newline_button.setVisible(isinstance(current_text_edit, CustomTextEdit))
+
+    def reopen_with_encoding(self, encoding: str) -> None:
+        current_text_edit = self.get_current_text_edit()
+        if not isinstance(current_text_edit, CustomTextEdit) or not current_text_edit.file_path:
+            return
+        if not current_text_edit.is_saved:
+            result = QMessageBox.question(
+                self, "提示", f"用 {encoding} 重新打开 {os.path.basename(current_text_edit.file_path)}？\n"
+                            "重新打开将丢失未保存的修改。")
+            if result != QMessageBox.Yes:
+                return
+        current_text_edit.reopen_with_encoding(encoding)
+
+    def convert_encoding(self, encoding: str, bom: bytes) -> None:
+        current_text_edit = self.get_current_text_edit()
+        if isinstance(current_text_edit, CustomTextEdit):
+            current_text_edit.set_file_format(encoding=encoding, bom=bom)
+
+    def convert_newline(self, newline: str) -> None:
+        current_text_edit = self.get_current_text_edit()
+        if isinstance(current_text_edit, CustomTextEdit) and current_text_edit.newline != newline:
+            current_text_edit.set_file_format(newline=newline)
+
+    def show_diagnostics(self) -> None:
+        """显示性能诊断面板（第一次使用时创建）"""
+        if self.diagnostics_panel is None:
+            from diagnostics_panel import DiagnosticsPanel
+            self.diagnostics_panel = DiagnosticsPanel(self)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.diagnostics_panel)
+        self.diagnostics_panel.setVisible(True)
+        self.diagnostics_panel.raise_()
 
     def toggle_find_bar(self) -> None:
         """显示或隐藏查找栏；若替换栏显示则先隐藏"""
+        self.build_find_bars()
         if self.replace_bar.isVisible():
             self.replace_bar.setVisible(False)
         visible = not self.find_bar.isVisible()
         self.find_bar.setVisible(visible)
         if visible:
             self.find_input.setFocus()
+        self.refresh_match_index()
 
     def toggle_replace_bar(self) -> None:
         """显示或隐藏替换栏；若查找栏显示则先隐藏"""
+        self.build_find_bars()
         if self.find_bar.isVisible():
             self.find_bar.setVisible(False)
+            self.refresh_match_index()
         visible = not self.replace_bar.isVisible()
         self.replace_bar.setVisible(visible)
         if visible:
@@ -464,16 +1732,11 @@ class TextEditor(QMainWindow):
 
     def closeEvent(self, event) -> None:
         """关闭程序前检查未保存文件"""
-        unsaved_files = [
-            self.tabs.widget(i).findChild(CustomTextEdit)
-            for i in range(self.tabs.count())
-            if not self.tabs.widget(i).findChild(CustomTextEdit).is_saved
-        ]
-        if unsaved_files:
+        if self.tab_registry.has_unsaved():
             icon_path = get_resource_path("icon.ico")
             result = show_hint_e("有未保存的文件，是否保存？", "提示", icon_path)
             if result == QMessageBox.Save:
-                if not self.save_file_ot():
+                if not self.save_file_ot(wait=True):
                     event.ignore()
                     return
             elif result == QMessageBox.Discard:
@@ -481,6 +1744,21 @@ class TextEditor(QMainWindow):
             else:
                 event.ignore()
                 return
+        # 会话中记录的是实际应用的字号
+        self.zoom.apply()
+        self.save_open_tabs()
+        self.batch_loader.cancel()
+        for text_edit in self.tab_registry.editors():
+            if isinstance(text_edit, CustomTextEdit):
+                text_edit.cancel_loading()
+            elif isinstance(text_edit, LargeFileView):
+                text_edit.cancel_search()
+        self.cancel_pattern_scan()
+        if self.find_in_files_panel is not None:
+            self.find_in_files_panel.stop_search()
+        wait_for_pending_saves()
+        # 正常退出（修改已保存或用户选择放弃），不再需要恢复日志
+        self.recovery.close()
         event.accept()
 
     def dragEnterEvent(self, event) -> None:
@@ -492,10 +1770,8 @@ class TextEditor(QMainWindow):
 
     def dropEvent(self, event) -> None:
         """处理拖放文件事件，添加新标签页"""
-        for url in event.mimeData().urls():
-            file_path = url.toLocalFile()
-            if os.path.exists(file_path):
-                self.add_new_tab(file_path)
+        file_paths = [url.toLocalFile() for url in event.mimeData().urls()]
+        self.open_files([path for path in file_paths if os.path.exists(path)])
         event.accept()
 
     def wheelEvent(self, event) -> None:
@@ -515,8 +1791,48 @@ class TextEditor(QMainWindow):
         super().mousePressEvent(event)
 
 
+class StartupTimer(QObject):
+    """
+    --measure-startup：主窗口第一次绘制完成后输出启动耗时并退出，
+    耗时超出预算时退出状态码为 1，便于在脚本中跟踪启动性能
+    """
+
+    def __init__(self, window: QMainWindow, start_time: float, budget_ms: float):
+        super().__init__(window)
+        self.start_time = start_time
+        self.budget_ms = budget_ms
+        window.installEventFilter(self)
+
+    def eventFilter(self, watched, event) -> bool:
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            # 等这次绘制结束后再计时
+            QTimer.singleShot(0, self.report)
+        return False
+
+    def report(self) -> None:
+        elapsed_ms = (time.perf_counter() - self.start_time) * 1000
+        print(f"启动耗时（到窗口首次绘制）: {elapsed_ms:.1f} ms，预算 {self.budget_ms:.0f} ms", flush=True)
+        QApplication.exit(0 if elapsed_ms <= self.budget_ms else 1)
+
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    app.setApplicationName('OpenT')
     window = TextEditor()
+    window.hibernator.budget = ARGUMENTS.memory_budget * 1024 * 1024
+    if ARGUMENTS.measure_startup:
+        startup_timer = StartupTimer(window, STARTUP_TIME, ARGUMENTS.startup_budget)
+    elif not ARGUMENTS.new_instance:
+        # 作为主实例监听本地套接字，接收之后启动的实例转发的文件
+        instance_server = InstanceServer(window)
+        instance_server.arguments_received.connect(window.open_arguments)
+        instance_server.listen()
+    if not ARGUMENTS.measure_startup:
+        window.recovery.start()
     window.show()
+    window.restore_session()
+    if not ARGUMENTS.measure_startup:
+        window.recover_unsaved_changes()
+    window.open_arguments(sys.argv[1:], os.getcwd())
     sys.exit(app.exec())
@@ -0,0 +1,120 @@
+"""
+对比 CustomTextEdit 旧的 QTextEdit 后端与现在的 QPlainTextEdit 后端：
+加载耗时、滚动耗时与内存占用。每个后端在单独的子进程中运行，避免内存统计互相影响。
+
+用法：
+    python benchmarks/bench_editor_backend.py --sizes 10 100 500 --output result.json
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKENDS = ('QTextEdit', 'QPlainTextEdit')
+SAMPLE_LINE = '2024-01-01 12:00:00 INFO 这是一行用于测试的日志内容 value=12345\n'
+
+
+def current_rss() -> int:
+    """返回当前进程的常驻内存（字节），不支持 /proc 的平台返回峰值内存"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_child(backend: str, size_mb: int, scroll_steps: int) -> dict:
+    """在子进程中创建编辑器并测量，结果以 JSON 输出到标准输出"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtGui import QFont
+    from PyQt5.QtWidgets import QApplication, QTextEdit, QPlainTextEdit
+
+    app = QApplication([])
+    editor = QTextEdit() if backend == 'QTextEdit' else QPlainTextEdit()
+    editor.setFont(QFont("微软雅黑", 11))
+    editor.resize(800, 600)
+    editor.show()
+    app.processEvents()
+
+    line_count = size_mb * 1024 * 1024 // len(SAMPLE_LINE.encode('utf-8')) + 1
+    text = SAMPLE_LINE * line_count
+    gc.collect()
+    base_rss = current_rss()
+
+    start = time.perf_counter()
+    editor.setPlainText(text)
+    # QTextEdit 在定时器中分批布局，这里强制完成布局后再计时
+    editor.document().documentLayout().documentSize()
+    app.processEvents()
+    load_time = time.perf_counter() - start
+
+    del text
+    gc.collect()
+    memory = current_rss() - base_rss
+
+    scrollbar = editor.verticalScrollBar()
+    start = time.perf_counter()
+    for step in range(scroll_steps):
+        scrollbar.setValue(scrollbar.maximum() * step // max(scroll_steps - 1, 1))
+        editor.viewport().repaint()
+    scroll_time = (time.perf_counter() - start) / max(scroll_steps, 1)
+
+    return {
+        'backend': backend,
+        'size_mb': size_mb,
+        'load_s': round(load_time, 3),
+        'scroll_ms': round(scroll_time * 1000, 3),
+        'memory_mb': round(memory / 1024 / 1024, 1),
+    }
+
+
+def run_backend(backend: str, size_mb: int, scroll_steps: int, timeout: int) -> dict:
+    """启动子进程测量一个后端，超时或出错时记录原因"""
+    command = [sys.executable, os.path.abspath(__file__), '--child', backend,
+               '--sizes', str(size_mb), '--scroll-steps', str(scroll_steps)]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'backend': backend, 'size_mb': size_mb, 'error': f'超过 {timeout} 秒'}
+    if completed.returncode != 0:
+        return {'backend': backend, 'size_mb': size_mb, 'error': completed.stderr.strip()[-200:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='对比 QTextEdit 与 QPlainTextEdit 编辑器后端')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500], help='测试文本大小（MB）')
+    parser.add_argument('--scroll-steps', type=int, default=50, help='滚动测量的次数')
+    parser.add_argument('--timeout', type=int, default=600, help='单次测量的超时时间（秒）')
+    parser.add_argument('--output', help='将结果保存为 JSON 文件')
+    parser.add_argument('--child', choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.sizes[0], args.scroll_steps)))
+        return
+
+    results = []
+    print(f"{'后端':<16}{'大小(MB)':>10}{'加载(s)':>10}{'滚动(ms)':>10}{'内存(MB)':>10}")
+    for size_mb in args.sizes:
+        for backend in BACKENDS:
+            result = run_backend(backend, size_mb, args.scroll_steps, args.timeout)
+            results.append(result)
+            if 'error' in result:
+                print(f"{backend:<16}{size_mb:>10}  失败: {result['error']}")
+            else:
+                print(f"{backend:<16}{size_mb:>10}{result['load_s']:>10}"
+                      f"{result['scroll_ms']:>10}{result['memory_mb']:>10}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
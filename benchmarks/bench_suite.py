@@ -0,0 +1,329 @@
+"""
+无界面（QT_QPA_PLATFORM=offscreen）运行的基准测试：在合成语料上测量加载、保存、查找、
+替换与全部替换的耗时与峰值内存，结果保存为 JSON，并可以对比两次结果、标出性能退化。
+每个（语料, 操作）在单独的子进程中运行；峰值内存是操作期间采样得到的最大常驻内存，
+不包括生成语料或准备阶段的内存。
+
+用法：
+    python benchmarks/bench_suite.py run --sizes 1KB 1MB 16MB --output result.json
+    python benchmarks/bench_suite.py run --kinds gbk utf16 --ops load save --sizes 100MB 1GB
+    python benchmarks/bench_suite.py compare baseline.json result.json --threshold 0.1
+"""
+import argparse
+import codecs
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_editor_backend import current_rss
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 语料类型 -> (编码, 换行符, 示例行)；每 10 行有一行包含 QUERY
+CORPUS_KINDS = {
+    'ascii': ('utf-8', '\n', '2024-01-01 12:00:00 INFO request id={0:08d} status=ok path=/api/v1/items'),
+    'utf8-cjk': ('utf-8', '\n', '第{0:08d}行 这是一段用于测试的中文文本，包含标点符号与数字'),
+    'gbk': ('gbk', '\n', '第{0:08d}行 这是一段用于测试的中文文本，包含标点符号与数字'),
+    'utf16': ('utf-16', '\n', '2024-01-01 12:00:00 INFO 第{0:08d}行 混合 ASCII 与中文的日志'),
+    'crlf': ('utf-8', '\r\n', '2024-01-01 12:00:00 WARN request id={0:08d} status=retry path=/api/v1/orders'),
+}
+QUERY = 'needle'
+REPLACEMENT = 'pin'
+OPERATIONS = ('load', 'save', 'find', 'replace', 'replace_all')
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+# 耗时或内存超过基准的比例（默认 10%）时视为退化
+DEFAULT_THRESHOLD = 0.1
+# 耗时低于该值（秒）的测量波动太大，不参与耗时退化判断
+MIN_COMPARABLE_SECONDS = 0.005
+# 测量期间采样常驻内存的间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.005
+
+
+def parse_size(text: str) -> int:
+    """把 1KB、16MB、1GB 这样的写法转换为字节数"""
+    text = text.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+class PeakRssSampler(threading.Thread):
+    """
+    在后台线程中按 RSS_SAMPLE_INTERVAL 采样当前进程的常驻内存，记录测量期间的峰值。
+    进程生命周期内的峰值（ru_maxrss）会包含准备阶段（例如为查找与替换预先加载文件）的内存
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> int:
+        """停止采样并返回峰值（字节）"""
+        self._stopped.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+def corpus_path(corpus_dir: str, kind: str, size_label: str) -> str:
+    return os.path.join(corpus_dir, f"{kind}-{size_label}.txt")
+
+
+def generate_corpus(path: str, kind: str, size: int) -> None:
+    """按块写入合成语料直到达到 size 字节，不在内存中构建整个文件"""
+    encoding, newline, template = CORPUS_KINDS[kind]
+    encoder = codecs.getincrementalencoder(encoding)()
+    temp_path = path + '.tmp'
+    written = 0
+    line = 0
+    with open(temp_path, 'wb') as file:
+        while written < size:
+            lines = []
+            block_size = 0
+            # 每块约 64KB，小文件逐行写入以便接近目标大小
+            while block_size < min(64 * 1024, size - written):
+                text = template.format(line)
+                if line % 10 == 0:
+                    text += f' {QUERY}'
+                lines.append(text + newline)
+                block_size += len(text) + 1
+                line += 1
+            data = encoder.encode(''.join(lines))
+            file.write(data)
+            written += len(data)
+    os.replace(temp_path, path)
+
+
+def ensure_corpora(corpus_dir: str, kinds: list, sizes: list) -> list:
+    """生成缺少的语料文件，返回 [(类型, 大小标签, 路径)]"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    corpora = []
+    for size_label in sizes:
+        for kind in kinds:
+            path = corpus_path(corpus_dir, kind, size_label)
+            if not os.path.exists(path):
+                print(f"生成语料 {os.path.basename(path)}", flush=True)
+                generate_corpus(path, kind, parse_size(size_label))
+            corpora.append((kind, size_label, path))
+    return corpora
+
+
+def run_child(path: str, operation: str) -> dict:
+    """在子进程中加载文件并测量一个操作"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, REPO_ROOT)
+    from PyQt5.QtCore import QEventLoop
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+
+    app = QApplication([])
+
+    # 无界面运行时模态对话框会一直阻塞，出现对话框即视为操作失败
+    def fail_on_dialog(parent, title, text, *args, **kwargs):
+        raise RuntimeError(f"{title}: {text}")
+    QMessageBox.information = QMessageBox.warning = QMessageBox.critical = staticmethod(fail_on_dialog)
+
+    from OpenT import CustomTextEdit
+    from editor_functions import save_file, find_text, replace_text, replace_all_text
+    from large_file_view import LargeFileView, is_large_file
+
+    result = {}
+    if is_large_file(path):
+        # 与编辑器一致：大文件以只读的大文件视图打开，不支持保存与替换
+        if operation not in ('load', 'find'):
+            return {'skipped': '大文件视图为只读'}
+        view = LargeFileView()
+        view.resize(800, 600)
+
+        def load() -> None:
+            view.load_file_content(path)
+            # 与编辑器一致：行索引在界面线程的空闲时间分段建立，等待索引完整后跳转到最后一行
+            view.goto_line(sys.maxsize)
+            while not view.line_count()[1]:
+                app.processEvents()
+
+        def find() -> None:
+            # 查找在后台线程中进行，等待 search_finished
+            loop = QEventLoop()
+            view.search_finished.connect(loop.quit)
+            if view.find_text(QUERY):
+                loop.exec()
+
+        if operation == 'load':
+            return measure(load)
+        load()
+        return measure(find)
+
+    text_edit = CustomTextEdit()
+    text_edit.resize(800, 600)
+
+    def load_async() -> None:
+        # 与编辑器一致：在后台线程中加载并分块插入文档，直到发出 loaded
+        errors = []
+        loop = QEventLoop()
+        text_edit.loaded.connect(loop.quit)
+        text_edit.load_failed.connect(errors.append)
+        text_edit.load_failed.connect(loop.quit)
+        text_edit.load_file_async(path, report_errors=False)
+        loop.exec()
+        text_edit.loaded.disconnect(loop.quit)
+        text_edit.load_failed.disconnect()
+        if errors:
+            raise RuntimeError(f"加载文件时出错: {errors[0]}")
+
+    if operation == 'load':
+        return measure(load_async)
+    load_async()
+    app.processEvents()
+    if operation == 'save':
+        output_path = path + '.bench-save'
+        try:
+            result = measure(lambda: save_file(text_edit, output_path).wait())
+        finally:
+            if os.path.exists(output_path):
+                os.unlink(output_path)
+    elif operation == 'find':
+        result = measure(lambda: find_text(QUERY, text_edit))
+    elif operation == 'replace':
+        result = measure(lambda: replace_text(QUERY, REPLACEMENT, text_edit))
+    elif operation == 'replace_all':
+        result = measure(lambda: replace_all_text(QUERY, REPLACEMENT, text_edit))
+    return result
+
+
+def measure(operation) -> dict:
+    rss_before = current_rss()
+    sampler = PeakRssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        operation()
+    finally:
+        wall_time = time.perf_counter() - start
+        peak = sampler.stop()
+    return {
+        'wall_s': round(wall_time, 4),
+        'peak_rss_mb': round(peak / 1024 / 1024, 1),
+        'rss_before_mb': round(rss_before / 1024 / 1024, 1),
+    }
+
+
+def run_suite(args) -> list:
+    corpora = ensure_corpora(args.corpus_dir, args.kinds, args.sizes)
+    results = []
+    print(f"{'语料':<24}{'操作':<14}{'耗时(s)':>10}{'峰值内存(MB)':>14}")
+    for kind, size_label, path in corpora:
+        for operation in args.ops:
+            command = [sys.executable, os.path.abspath(__file__), 'child', path, operation]
+            entry = {'kind': kind, 'size': size_label, 'bytes': os.path.getsize(path), 'op': operation}
+            try:
+                completed = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout)
+                if completed.returncode != 0:
+                    entry['error'] = completed.stderr.strip()[-300:]
+                else:
+                    entry.update(json.loads(completed.stdout.strip().splitlines()[-1]))
+            except subprocess.TimeoutExpired:
+                entry['error'] = f'超过 {args.timeout} 秒'
+            results.append(entry)
+            name = f"{kind}-{size_label}"
+            if 'error' in entry:
+                print(f"{name:<24}{operation:<14}  失败: {entry['error'].splitlines()[-1]}")
+            elif 'skipped' in entry:
+                print(f"{name:<24}{operation:<14}  跳过: {entry['skipped']}")
+            else:
+                print(f"{name:<24}{operation:<14}{entry['wall_s']:>10}{entry['peak_rss_mb']:>14}")
+    return results
+
+
+def result_key(entry: dict) -> tuple:
+    return entry['kind'], entry['size'], entry['op']
+
+
+def compare_runs(baseline: dict, current: dict, threshold: float) -> int:
+    """逐项对比耗时与峰值内存，返回退化的项数"""
+    baseline_results = {result_key(entry): entry for entry in baseline['results']}
+    regressions = 0
+    print(f"{'语料':<24}{'操作':<14}{'耗时(s)':>18}{'峰值内存(MB)':>20}")
+    for entry in current['results']:
+        base = baseline_results.get(result_key(entry))
+        name = f"{entry['kind']}-{entry['size']}"
+        if base is None or 'wall_s' not in base or 'wall_s' not in entry:
+            status = entry.get('error') or entry.get('skipped') or '无基准'
+            print(f"{name:<24}{entry['op']:<14}  {status.splitlines()[-1] if status else ''}")
+            continue
+        flags = []
+        if (entry['wall_s'] > base['wall_s'] * (1 + threshold)
+                and entry['wall_s'] - base['wall_s'] > MIN_COMPARABLE_SECONDS):
+            flags.append('耗时')
+        if entry['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+            flags.append('内存')
+        regressions += bool(flags)
+        time_text = f"{base['wall_s']}→{entry['wall_s']}"
+        memory_text = f"{base['peak_rss_mb']}→{entry['peak_rss_mb']}"
+        mark = f"  退化: {'、'.join(flags)}" if flags else ''
+        print(f"{name:<24}{entry['op']:<14}{time_text:>18}{memory_text:>20}{mark}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='OpenT 基准测试：加载、保存、查找与替换')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='运行基准测试')
+    run_parser.add_argument('--kinds', nargs='+', choices=sorted(CORPUS_KINDS), default=sorted(CORPUS_KINDS),
+                            help='语料类型')
+    run_parser.add_argument('--sizes', nargs='+', default=['1KB', '1MB', '16MB'], help='语料大小，例如 1KB 100MB 1GB')
+    run_parser.add_argument('--ops', nargs='+', choices=OPERATIONS, default=list(OPERATIONS), help='测量的操作')
+    run_parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), 'opent-bench-corpus'),
+                            help='语料目录，已存在的语料会直接复用')
+    run_parser.add_argument('--timeout', type=int, default=600, help='单项测量的超时时间（秒）')
+    run_parser.add_argument('--output', help='将结果保存为 JSON 文件')
+
+    compare_parser = subparsers.add_parser('compare', help='对比两次结果，有退化时以状态码 1 退出')
+    compare_parser.add_argument('baseline', help='基准结果 JSON')
+    compare_parser.add_argument('current', help='当前结果 JSON')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='超过基准的比例，默认 0.1（即 10%%）')
+
+    child_parser = subparsers.add_parser('child', help=argparse.SUPPRESS)
+    child_parser.add_argument('path')
+    child_parser.add_argument('operation', choices=OPERATIONS)
+    args = parser.parse_args()
+
+    if args.command == 'child':
+        print(json.dumps(run_child(args.path, args.operation), ensure_ascii=False))
+    elif args.command == 'run':
+        results = run_suite(args)
+        if args.output:
+            report = {
+                'meta': {
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                },
+                'results': results,
+            }
+            with open(args.output, 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+    else:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        with open(args.current, encoding='utf-8') as file:
+            current = json.load(file)
+        regressions = compare_runs(baseline, current, args.threshold)
+        print(f"共 {regressions} 项退化" if regressions else "没有发现退化")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import codecs
+import re
+from typing import List, NamedTuple, Optional
+
+# 打开的文档占用内存的默认预算（MB），可通过 --memory-budget 修改。
+# 定义在这里而不是 hibernation 中，转发给已运行实例的启动路径不需要导入 Qt
+DEFAULT_MEMORY_BUDGET_MB = 512
+# --measure-startup 时启动耗时（到窗口首次绘制）的预算（毫秒），超出时以状态码 1 退出
+STARTUP_BUDGET_MS = 800
+
+_LINE_ARGUMENT_RE = re.compile(r'^\+(\d+)$')
+
+
+class FileArgument(NamedTuple):
+    """命令行中的一个文件，line 为打开后跳转的行（从 0 开始），未指定时为 None"""
+    path: str
+    line: Optional[int]
+
+
+def _encoding(name: str) -> str:
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        raise argparse.ArgumentTypeError(f"未知的编码: {name}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='OpenT', description='OpenT 文本编辑器')
+    parser.add_argument('files', nargs='*', metavar='[+行号] 文件',
+                        help='要打开的文件；文件前的 +行号 表示打开后跳转到该行（从 1 开始）')
+    parser.add_argument('--readonly', action='store_true', help='以只读方式打开文件')
+    parser.add_argument('--encoding', type=_encoding, help='按指定编码打开文件，不自动探测')
+    parser.add_argument('--new-instance', action='store_true', help='启动新的实例，不把文件交给已运行的实例')
+    parser.add_argument('--memory-budget', type=int, default=DEFAULT_MEMORY_BUDGET_MB, metavar='MB',
+                        help=f'打开的文档占用内存的预算，超出时不活动的标签页休眠（默认 {DEFAULT_MEMORY_BUDGET_MB}）')
+    parser.add_argument('--measure-startup', action='store_true',
+                        help='输出从开始执行到窗口首次绘制的耗时后退出（不含解释器自身的启动时间）')
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET_MS, metavar='毫秒',
+                        help=f'配合 --measure-startup 使用，耗时超出预算时以状态码 1 退出（默认 {STARTUP_BUDGET_MS}）')
+    return parser
+
+
+def parse_arguments(argv: List[str]) -> argparse.Namespace:
+    """
+    解析命令行参数，files 转换为 FileArgument 列表。
+    参数无效时 argparse 输出用法并以 SystemExit 退出
+    """
+    parser = build_parser()
+    arguments = parser.parse_args(argv)
+    files: List[FileArgument] = []
+    line = None
+    for item in arguments.files:
+        match = _LINE_ARGUMENT_RE.match(item)
+        if match:
+            line = max(int(match.group(1)) - 1, 0)
+            continue
+        files.append(FileArgument(item, line))
+        line = None
+    if line is not None:
+        parser.error("+行号 之后缺少文件")
+    arguments.files = files
+    return arguments
@@ -0,0 +1,129 @@
+import os
+import time
+
+from PyQt5.QtCore import Qt, QStandardPaths, QTimer
+from PyQt5.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QCheckBox, QLabel, QTreeWidget,
+    QTreeWidgetItem, QPlainTextEdit, QSplitter, QMessageBox
+)
+
+import perf_trace
+
+# 面板可见时刷新事件列表的间隔（毫秒）
+REFRESH_INTERVAL = 1000
+# 耗时超过该值（毫秒）的事件以醒目颜色显示
+SLOW_EVENT_MS = 200
+LOG_FILE_NAME = 'perf.log'
+
+
+def default_log_path() -> str:
+    directory = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+    return os.path.join(directory, LOG_FILE_NAME)
+
+
+class DiagnosticsPanel(QDockWidget):
+    """性能诊断面板：显示最近的操作耗时，可写入日志文件或剖析下一次操作"""
+
+    def __init__(self, parent=None):
+        super().__init__('性能诊断', parent)
+        self.setObjectName('diagnostics_panel')
+        self.last_sequence = 0
+
+        widget = QWidget(self)
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        button_layout = QHBoxLayout()
+        self.log_checkbox = QCheckBox('写入日志文件', self)
+        self.log_checkbox.setChecked(perf_trace.log_path() is not None)
+        self.profile_button = QPushButton('剖析下一次操作', self)
+        self.clear_button = QPushButton('清空', self)
+        button_layout.addWidget(self.log_checkbox)
+        button_layout.addStretch()
+        button_layout.addWidget(self.profile_button)
+        button_layout.addWidget(self.clear_button)
+
+        self.status_label = QLabel(self)
+        self.events_tree = QTreeWidget(self)
+        self.events_tree.setHeaderLabels(['时间', '操作', '耗时(ms)', '线程', '详情'])
+        self.events_tree.setRootIsDecorated(False)
+        self.events_tree.setUniformRowHeights(True)
+        self.profile_view = QPlainTextEdit(self)
+        self.profile_view.setReadOnly(True)
+        self.profile_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.profile_view.setPlaceholderText('点击“剖析下一次操作”后执行一次操作，这里显示耗时最多的函数')
+        splitter = QSplitter(Qt.Vertical, self)
+        splitter.addWidget(self.events_tree)
+        splitter.addWidget(self.profile_view)
+
+        layout.addLayout(button_layout)
+        layout.addWidget(self.status_label)
+        layout.addWidget(splitter)
+        self.setWidget(widget)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(self.on_visibility_changed)
+        self.log_checkbox.toggled.connect(self.toggle_log)
+        self.profile_button.clicked.connect(self.request_profile)
+        self.clear_button.clicked.connect(self.clear_events)
+        self.shown_profile = None
+        self.refresh()
+
+    def on_visibility_changed(self, visible: bool) -> None:
+        """只在面板可见时定时刷新"""
+        if visible:
+            self.refresh()
+            self.refresh_timer.start()
+        else:
+            self.refresh_timer.stop()
+
+    def refresh(self) -> None:
+        """追加上次刷新之后记录的事件，列表长度与环形缓冲区一致"""
+        events = perf_trace.events_since(self.last_sequence)
+        if events:
+            self.last_sequence = events[-1].sequence
+            items = []
+            for event in events:
+                item = QTreeWidgetItem([
+                    time.strftime('%H:%M:%S', time.localtime(event.timestamp)), event.name,
+                    f"{event.duration_ms:.1f}", event.thread, event.detail
+                ])
+                item.setTextAlignment(2, Qt.AlignRight | Qt.AlignVCenter)
+                if event.duration_ms >= SLOW_EVENT_MS:
+                    item.setForeground(2, Qt.red)
+                items.append(item)
+            self.events_tree.addTopLevelItems(items)
+            excess = self.events_tree.topLevelItemCount() - perf_trace.RING_BUFFER_SIZE
+            for _ in range(max(excess, 0)):
+                self.events_tree.takeTopLevelItem(0)
+            self.events_tree.scrollToBottom()
+
+        profile = perf_trace.last_profile()
+        if profile is not None and profile is not self.shown_profile:
+            self.shown_profile = profile
+            name, file_path, summary = profile
+            self.profile_view.setPlainText(f"{name}  ({file_path})\n{summary}")
+        self.profile_button.setEnabled(not perf_trace.profile_pending())
+        log_path = perf_trace.log_path()
+        self.status_label.setText(f"日志文件: {log_path}" if log_path else "未写入日志文件")
+
+    def toggle_log(self, enabled: bool) -> None:
+        if not enabled:
+            perf_trace.disable_log()
+        elif perf_trace.log_path() is None:
+            try:
+                perf_trace.enable_log(default_log_path())
+            except OSError as e:
+                QMessageBox.critical(self, "错误", f"无法打开日志文件: {e}")
+                self.log_checkbox.setChecked(False)
+        self.refresh()
+
+    def request_profile(self) -> None:
+        perf_trace.profile_next()
+        self.profile_button.setEnabled(False)
+
+    def clear_events(self) -> None:
+        perf_trace.clear()
+        self.events_tree.clear()
@@ -1,10 +1,14 @@
 import os
 import re
-import io
 import sys
+from typing import Optional
 
-from PyQt5.QtGui import QTextDocument, QIcon
-from PyQt5.QtWidgets import QMessageBox, QWidget, QVBoxLayout
+from PyQt5.QtGui import QTextCursor, QIcon
+from PyQt5.QtWidgets import QMessageBox, QWidget, QVBoxLayout, QProgressBar
+
+from file_saver import FileSaveWorker
+from match_index import MatchIndex, compile_pattern, find_next_match, iter_block_matches
+from perf_trace import trace
 
 def get_resource_path(relative_path: str) -> str:
     """
@@ -26,110 +30,173 @@ def get_resource_url(relative_path: str) -> str:
     path = path.replace("\\", "/")  # 替换为正斜杠
     return path
 
-def save_file(text_edit, file_path: str) -> None:
+def is_text_file(file_path: str) -> bool:
+    """根据扩展名判断是否为文本文件，无法判断类型的文件视为文本文件"""
+    # mimetypes 首次使用时会读取系统的类型数据库，推迟到打开文件时再导入
+    import mimetypes
+    mime_type, _ = mimetypes.guess_type(file_path)
+    return not mime_type or mime_type.startswith('text')
+
+def save_file(text_edit, file_path: str) -> Optional[FileSaveWorker]:
     """
-    将 text_edit 的内容保存到指定文件路径（覆盖写入）
+    在后台线程中按 text_edit 的编码、BOM 与换行符保存内容：分块编码并流式写入同目录的临时文件，
+    fsync 后原子替换目标文件。保存完成后调用 text_edit.on_file_saved(路径, 文档版本)，
+    返回保存线程，无法开始保存时返回 None
     """
     try:
-        if file_path:
-            with io.open(file_path, 'w', encoding='utf-8') as file:
-                file.write(text_edit.toPlainText())
-        else:
+        if not file_path:
             raise ValueError("无法获取文件路径！")
+        document = text_edit.document()
+        with trace('save.snapshot', file_path):
+            text = document.toRawText()
+        worker = FileSaveWorker(text, file_path, document.revision(),
+                                text_edit.encoding, text_edit.bom, text_edit.newline)
+        worker.saved.connect(text_edit.on_file_saved)
+        window = text_edit.window()
+        worker.failed.connect(lambda message: QMessageBox.critical(window, "错误", f"保存文件时出错: {message}"))
+        worker.start()
+        return worker
     except Exception as e:
         QMessageBox.critical(text_edit, "错误", f"保存文件时出错: {e}")
+        return None
+
+def get_match_index(text_edit, query: str, match_case: bool = False, use_regex: bool = False,
+                    whole_word: bool = False) -> MatchIndex:
+    """
+    返回 text_edit 当前查询的匹配索引，查询或查找选项变化时才同步重新建立
+    """
+    key = (query, match_case, use_regex, whole_word)
+    match_index = text_edit.match_index
+    if match_index is None or match_index.key != key:
+        pattern = compile_pattern(query, match_case, use_regex, whole_word)
+        match_index = MatchIndex(text_edit.document(), key, pattern)
+        text_edit.set_match_index(match_index)
+    return match_index
 
-def find_text(query: str, text_edit, match_case: bool = False):
+def find_text(query: str, text_edit, match_case: bool = False, backward: bool = False,
+              use_regex: bool = False, whole_word: bool = False):
     """
-    在 text_edit 中查找 query，从当前位置开始查找，未找到则从头开始
+    在 text_edit 中查找 query，从当前位置向后（backward 时向前）查找，到达末尾后从头开始。
+    通过匹配索引二分查找，不会重新扫描文档
     """
     try:
-        cursor = text_edit.textCursor()
-        options = QTextDocument.FindFlags()
-        if match_case:
-            options |= QTextDocument.FindCaseSensitively
-
-        if cursor.isNull():
-            cursor.setPosition(0)
-
-        while True:
-            cursor = text_edit.document().find(query, cursor, options)
-            if cursor.isNull():
-                cursor.setPosition(0)
-                cursor = text_edit.document().find(query, cursor, options)
-                if cursor.isNull():
-                    QMessageBox.information(text_edit, "提示", "未找到指定文本！")
-                    return None
-
-            text_edit.setTextCursor(cursor)
-            text_edit.ensureCursorVisible()
-            text_edit.setFocus()
-            return cursor
+        if not query:
+            QMessageBox.information(text_edit, "提示", "未找到指定文本！")
+            return None
+        with trace('find', query):
+            match_index = get_match_index(text_edit, query, match_case, use_regex, whole_word)
+            cursor = text_edit.textCursor()
+            position = cursor.selectionStart() if backward else cursor.selectionEnd()
+            index = match_index.next_match(position, backward)
+        if index is None:
+            QMessageBox.information(text_edit, "提示", "未找到指定文本！")
+            return None
+
+        cursor.setPosition(match_index.starts[index])
+        cursor.setPosition(match_index.ends[index], QTextCursor.KeepAnchor)
+        text_edit.setTextCursor(cursor)
+        text_edit.ensureCursorVisible()
+        text_edit.setFocus()
+        return cursor
+    except re.error as e:
+        QMessageBox.warning(text_edit, "警告", f"正则表达式无效: {e}")
+        return None
     except Exception as e:
         QMessageBox.critical(text_edit, "错误", f"发生错误: {e}")
         return None
 
-def replace_text(find_query: str, replace_query: str, text_edit, match_case: bool = False) -> None:
+def replace_text(find_query: str, replace_query: str, text_edit, match_case: bool = False,
+                 use_regex: bool = False, whole_word: bool = False) -> None:
     """
-    在 text_edit 中替换第一个匹配项
+    在 text_edit 中替换光标处或其后的第一个匹配项，正则模式下支持分组引用
     """
     try:
         if not find_query.strip():
             QMessageBox.warning(text_edit, "警告", "查找文本不能为空")
             return
 
+        pattern = compile_pattern(find_query, match_case, use_regex, whole_word)
         cursor = text_edit.textCursor()
-        options = QTextDocument.FindFlags()
-        if match_case:
-            options |= QTextDocument.FindCaseSensitively
-
-        while True:
-            cursor = text_edit.document().find(find_query, cursor, options)
-            if cursor.isNull():
-                cursor.setPosition(0)
-                cursor = text_edit.document().find(find_query, cursor, options)
-                if cursor.isNull():
-                    QMessageBox.information(text_edit, "提示", "没有更多的文本可以替换！")
-                    return
-            cursor.insertText(replace_query)
-            text_edit.setTextCursor(cursor)
-            text_edit.ensureCursorVisible()
+        # 当前选中的正好是一个匹配项时替换它，否则替换光标之后的下一个匹配项
+        found = find_next_match(text_edit.document(), pattern, cursor.selectionStart())
+        if found is None:
+            QMessageBox.information(text_edit, "提示", "没有更多的文本可以替换！")
             return
+        start, end, match = found
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.insertText(match.expand(replace_query) if use_regex else replace_query)
+        # 空匹配（例如 ^、$）替换后光标处仍然匹配，移过一个字符，下次替换下一处（到达末尾后从头开始）
+        if start == end and not cursor.movePosition(QTextCursor.NextCharacter):
+            cursor.movePosition(QTextCursor.Start)
+        text_edit.setTextCursor(cursor)
+        text_edit.ensureCursorVisible()
+    except re.error as e:
+        QMessageBox.warning(text_edit, "警告", f"正则表达式无效: {e}")
     except Exception as e:
         QMessageBox.critical(text_edit, "错误", f"替换时出现问题: {e}")
 
-def replace_all_text(find_query: str, replace_query: str, text_edit, match_case: bool = False) -> None:
+def replace_all_text(find_query: str, replace_query: str, text_edit, match_case: bool = False,
+                     use_regex: bool = False, whole_word: bool = False) -> int:
     """
-    在 text_edit 中替换所有匹配项（支持撤销操作）
+    在 text_edit 中替换所有匹配项并返回替换数量。
+    默认按字面文本查找，use_regex 为 True 时按正则表达式查找并支持 \\1 等分组引用
     """
     try:
         if not find_query.strip():
             QMessageBox.warning(text_edit, "警告", "查找文本不能为空")
-            return
+            return 0
 
-        cursor = text_edit.textCursor()
-        document = text_edit.document()
-
-        cursor.beginEditBlock()
-        full_text = document.toPlainText()
-        flags = 0 if match_case else re.IGNORECASE
-        new_text, count = re.subn(find_query, replace_query, full_text, flags=flags)
-
-        if count > 0:
-            cursor.select(cursor.Document)
-            cursor.insertText(new_text)
+        pattern = compile_pattern(find_query, match_case, use_regex, whole_word)
+        match_index = text_edit.match_index
+        if not use_regex and match_index is not None and \
+                match_index.key == (find_query, match_case, use_regex, whole_word):
+            # 查找栏已经为同一查询建立了索引，直接使用，无需再扫描文档
+            spans = [(start, end, replace_query) for start, end in zip(match_index.starts, match_index.ends)]
         else:
-            QMessageBox.information(text_edit, "结果", "未找到匹配项。")
-        cursor.endEditBlock()
-        text_edit.setFocus()
+            spans = [(start, end, match.expand(replace_query) if use_regex else replace_query)
+                     for start, end, match in iter_block_matches(text_edit.document(), pattern)]
+        return apply_replacements(text_edit, spans)
+    except re.error as e:
+        QMessageBox.warning(text_edit, "警告", f"正则表达式无效: {e}")
+        return 0
     except Exception as e:
         QMessageBox.critical(text_edit, "错误", f"替换时出现问题: {e}")
+        return 0
+
+def apply_replacements(text_edit, spans) -> int:
+    """
+    把 (起点, 终点, 替换文本) 列表应用到 text_edit 并返回替换数量。
+    只修改匹配到的片段：从后往前在同一个编辑块中替换（一次撤销即可恢复），
+    光标与滚动位置保持不变，内存占用只与匹配数量有关
+    """
+    if not spans:
+        QMessageBox.information(text_edit, "结果", "未找到匹配项。")
+        return 0
+
+    vertical_value = text_edit.verticalScrollBar().value()
+    horizontal_value = text_edit.horizontalScrollBar().value()
+    cursor = QTextCursor(text_edit.document())
+    with trace('replace_all', f"{len(spans)} 处"):
+        cursor.beginEditBlock()
+        for start, end, replacement in reversed(spans):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(replacement)
+        cursor.endEditBlock()
+    text_edit.verticalScrollBar().setValue(vertical_value)
+    text_edit.horizontalScrollBar().setValue(horizontal_value)
+    text_edit.setFocus()
+    return len(spans)
 
 def update_tab_title(parent, text_edit) -> None:
     """
     根据文件名和保存状态更新标签标题，
     parent 为包含 tabs 的主窗口对象
     """
+    # 批量打开的文件在加载完成前还没有放入标签页
+    if not hasattr(parent, 'tabs'):
+        return
     index = parent.tabs.indexOf(text_edit.parent())
     if index != -1:
         file_name = os.path.basename(text_edit.file_path) if text_edit.file_path else "未命名"
@@ -147,29 +214,42 @@ def new_file_e(parent, text_edit) -> None:
     """
     在新的标签页中创建一个新文件
     """
-    tab_widget = QWidget()
-    tab_layout = QVBoxLayout(tab_widget)
-    tab_layout.setContentsMargins(0, 0, 0, 0)
-    tab_layout.addWidget(text_edit)
+    with trace('tab.create', "未命名"):
+        tab_widget = QWidget()
+        tab_layout = QVBoxLayout(tab_widget)
+        tab_layout.setContentsMargins(0, 0, 0, 0)
+        tab_layout.addWidget(text_edit)
 
-    tab_index = parent.tabs.addTab(tab_widget, "未命名")
-    parent.tabs.setCurrentIndex(tab_index)
-    update_tab_title(parent, text_edit)
+        tab_index = parent.tabs.addTab(tab_widget, "未命名")
+        parent.tabs.setCurrentIndex(tab_index)
+        update_tab_title(parent, text_edit)
 
-def add_new_tab_e(parent, text_edit, file_path: str, file_name: str) -> None:
+def add_new_tab_e(parent, text_edit, file_path: str, file_name: str, load: bool = True) -> None:
     """
-    添加一个新标签页，并加载指定文件的内容
+    添加一个新标签页并立即显示，文件内容在后台加载，
+    标签页底部的进度条显示加载进度。
+    load 为 False 时只添加标签页（不切换到该页），由调用方稍后加载
     """
-    tab_widget = QWidget()
-    tab_layout = QVBoxLayout(tab_widget)
-    tab_layout.setContentsMargins(0, 0, 0, 0)
-    tab_layout.addWidget(text_edit)
+    with trace('tab.create', file_name):
+        tab_widget = QWidget()
+        tab_layout = QVBoxLayout(tab_widget)
+        tab_layout.setContentsMargins(0, 0, 0, 0)
+        tab_layout.setSpacing(0)
+        tab_layout.addWidget(text_edit)
+        progress_bar = QProgressBar(tab_widget)
+        progress_bar.setRange(0, 100)
+        progress_bar.setMaximumHeight(4)
+        progress_bar.setTextVisible(False)
+        tab_layout.addWidget(progress_bar)
 
-    tab_index = parent.tabs.addTab(tab_widget, file_name)
-    parent.tabs.setCurrentIndex(tab_index)
-    text_edit.load_file_content(file_path)
-    update_tab_title(parent, text_edit)
-    parent.tabs.setTabToolTip(tab_index, file_path)
+        tab_index = parent.tabs.addTab(tab_widget, file_name)
+        if load:
+            parent.tabs.setCurrentIndex(tab_index)
+            text_edit.load_file_async(file_path, progress_bar)
+        else:
+            progress_bar.hide()
+        update_tab_title(parent, text_edit)
+        parent.tabs.setTabToolTip(tab_index, file_path)
 
 def close_tab(widget, tabs) -> None:
     """
@@ -0,0 +1,241 @@
+import codecs
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from perf_trace import trace
+
+# BOM 与编码对应表（UTF-32 的 BOM 以 UTF-16 的 BOM 开头，必须先判断）
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# 带 BOM 保存时，写入 BOM 后使用的不带 BOM 的编码
+BOM_CODECS = {
+    codecs.BOM_UTF32_LE: 'utf-32-le',
+    codecs.BOM_UTF32_BE: 'utf-32-be',
+    codecs.BOM_UTF8: 'utf-8',
+    codecs.BOM_UTF16_LE: 'utf-16-le',
+    codecs.BOM_UTF16_BE: 'utf-16-be',
+}
+# 不带 BOM 保存时，会自动写入 BOM 的编码改用的编码
+PLAIN_CODECS = {
+    'utf-8-sig': 'utf-8',
+    'utf-16': 'utf-16-le',
+    'utf-32': 'utf-32-le',
+}
+
+# 状态栏中可以选择的编码：(显示名称, 编码, BOM)。GBK 文本按超集 GB18030 保存，字节不变
+ENCODING_CHOICES = (
+    ('UTF-8', 'utf-8', b''),
+    ('UTF-8 BOM', 'utf-8-sig', codecs.BOM_UTF8),
+    ('UTF-16 LE', 'utf-16', codecs.BOM_UTF16_LE),
+    ('UTF-16 BE', 'utf-16', codecs.BOM_UTF16_BE),
+    ('GB18030', 'gb18030', b''),
+    ('Big5', 'big5', b''),
+    ('Shift_JIS', 'shift_jis', b''),
+    ('EUC-KR', 'euc_kr', b''),
+    ('Latin-1', 'latin-1', b''),
+)
+
+# 换行符及其显示名称，NEWLINE_NAMES 的顺序也是数量相同时优先选择的顺序
+NEWLINE_NAMES = {'\n': 'LF', '\r\n': 'CRLF', '\r': 'CR'}
+_CR_PATTERN = re.compile(r'\r\n?')
+
+# chardet 最多分析的样本字节数，以及每次喂给探测器的块大小
+DETECT_SAMPLE_SIZE = 1024 * 1024
+DETECT_CHUNK_SIZE = 64 * 1024
+
+# chardet 常把 GBK 文本识别为 GB2312，统一按超集 GB18030 解码以免丢字
+ENCODING_ALIASES = {
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030',
+    'ascii': 'utf-8',
+}
+
+# 编码探测结果缓存：(绝对路径, 修改时间, 文件大小) -> 编码
+_encoding_cache: Dict[Tuple[str, int, int], str] = {}
+
+
+def detect_bom(raw_data: bytes) -> Optional[str]:
+    """根据文件开头的 BOM 返回编码，没有 BOM 时返回 None"""
+    for bom, encoding in BOM_ENCODINGS:
+        if raw_data.startswith(bom):
+            return encoding
+    return None
+
+
+def file_bom(raw_data: bytes, encoding: str) -> bytes:
+    """返回按 encoding 解码时被去掉的 BOM（只有自动处理 BOM 的编码会去掉），没有时返回 b''"""
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return b''
+    for bom, bom_encoding in BOM_ENCODINGS:
+        if raw_data.startswith(bom):
+            return bom if bom_encoding == name else b''
+    return b''
+
+
+def stream_encoding(encoding: str, bom: bytes = b'') -> str:
+    """返回写入 BOM（如果有）之后编码正文使用的编码，保证不会再写入一个 BOM"""
+    if bom:
+        return BOM_CODECS[bom]
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return 'utf-8'
+    return PLAIN_CODECS.get(name, encoding)
+
+
+def encoding_label(encoding: str, bom: bytes = b'') -> str:
+    """编码在状态栏中显示的名称"""
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        name = encoding
+    for label, choice, choice_bom in ENCODING_CHOICES:
+        if codecs.lookup(choice).name == name and choice_bom == bom:
+            return label
+    return f"{encoding.upper()} BOM" if bom else encoding.upper()
+
+
+class NewlineNormalizer:
+    """
+    把分块到达的文本中的 CRLF 与 CR 统一为 LF，并统计原来各种换行符的数量。
+    不含 CR 的块（最常见的情况）只检查一次就原样返回；含 CR 的块用一次正则替换完成统一。
+    CRLF 可能被块边界拆开，末尾的 CR 留到下一块再处理
+    """
+
+    def __init__(self):
+        self.crlf_count = 0
+        self.cr_count = 0
+        self._pending_cr = ''
+
+    def feed(self, text: str, final: bool = False) -> str:
+        if self._pending_cr:
+            text = self._pending_cr + text
+            self._pending_cr = ''
+        if '\r' not in text:
+            return text
+        if text.endswith('\r') and not final:
+            self._pending_cr = '\r'
+            text = text[:-1]
+        crlf_count = text.count('\r\n')
+        self.crlf_count += crlf_count
+        self.cr_count += text.count('\r') - crlf_count
+        return _CR_PATTERN.sub('\n', text)
+
+    def newline(self, line_breaks: int, default: str = '\n') -> str:
+        """
+        返回出现最多的换行符。line_breaks 为统一后文本中的换行符总数（文档的块数减一），
+        由此得到 LF 的数量，不需要再扫描一次文本；没有换行符时返回 default
+        """
+        counts = {'\n': line_breaks - self.crlf_count - self.cr_count,
+                  '\r\n': self.crlf_count, '\r': self.cr_count}
+        if not any(count > 0 for count in counts.values()):
+            return default
+        return max(NEWLINE_NAMES, key=lambda newline: counts[newline])
+
+
+def normalize_newlines(text: str) -> str:
+    """把文本中的 CRLF 与 CR 统一为 LF"""
+    return NewlineNormalizer().feed(text, final=True)
+
+
+def _feed_detector(detector, raw_data: bytes, start: int, limit: int) -> None:
+    """从 start 开始分块喂给探测器，最多 limit 字节，探测器确定后立即停止"""
+    end = min(len(raw_data), start + limit)
+    for offset in range(start, end, DETECT_CHUNK_SIZE):
+        detector.feed(raw_data[offset:min(offset + DETECT_CHUNK_SIZE, end)])
+        if detector.done:
+            break
+
+
+def guess_encoding(raw_data: bytes, error_offset: int = 0) -> str:
+    """
+    用 chardet 的增量探测器分析有限的样本并返回编码。
+    error_offset 为 UTF-8 解码失败的位置，之前的数据都是合法 UTF-8（多为 ASCII），
+    对探测没有帮助，因此从该位置所在行的行首开始取样。
+    """
+    # chardet 导入较慢，只有遇到非 UTF-8 文件时才需要
+    import chardet
+
+    start = raw_data.rfind(b'\n', max(error_offset - DETECT_CHUNK_SIZE, 0), error_offset) + 1
+    if start == 0:
+        start = error_offset
+    with trace('load.detect'):
+        detector = chardet.UniversalDetector()
+        _feed_detector(detector, raw_data, start, DETECT_SAMPLE_SIZE)
+        result = detector.close() or {}
+    encoding = (result.get('encoding') or 'utf-8').lower()
+    return ENCODING_ALIASES.get(encoding, encoding)
+
+
+def decode_bytes(raw_data: bytes, encoding: Optional[str] = None) -> Tuple[str, str]:
+    """
+    将字节解码为文本，返回 (文本, 编码)。
+    未指定编码时依次尝试：BOM、严格 UTF-8 解码、chardet 采样探测。
+    """
+    if encoding is None:
+        encoding = detect_bom(raw_data)
+    if encoding is None:
+        try:
+            return raw_data.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError as e:
+            encoding = guess_encoding(raw_data, e.start)
+    try:
+        return raw_data.decode(encoding, errors='ignore'), encoding
+    except LookupError:
+        return raw_data.decode('utf-8', errors='ignore'), 'utf-8'
+
+
+def detect_sample_encoding(raw_data) -> str:
+    """
+    只根据开头的样本判断编码，用于不整体读入内存的大文件（raw_data 可以是 mmap）
+    """
+    sample = raw_data[:DETECT_SAMPLE_SIZE]
+    encoding = detect_bom(sample)
+    if encoding is not None:
+        return encoding
+    try:
+        # 样本末尾可能截断在多字节字符中间，使用增量解码器容忍这种情况
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        return guess_encoding(sample, e.start)
+
+
+def file_cache_key(file_path: str) -> Tuple[str, int, int]:
+    """返回文件的缓存键 (绝对路径, 修改时间, 文件大小)"""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+
+def cached_encoding(key: Tuple[str, int, int]) -> Optional[str]:
+    """返回缓存中该文件的编码，没有缓存时返回 None"""
+    return _encoding_cache.get(key)
+
+
+def remember_encoding(key: Tuple[str, int, int], encoding: str) -> None:
+    """记录文件的编码，下次打开未变化的文件时跳过探测"""
+    _encoding_cache[key] = encoding
+
+
+def read_text_file(file_path: str, encoding: Optional[str] = None) -> Tuple[str, str, bytes]:
+    """
+    只读取一次文件并在内存中解码，返回 (文本, 编码, BOM)。
+    未指定编码时，同一文件未变化则直接使用缓存的编码，跳过探测。
+    """
+    key = file_cache_key(file_path)
+    with trace('load.read', file_path):
+        with open(file_path, 'rb') as file:
+            raw_data = file.read()
+    with trace('load.decode'):
+        text, encoding = decode_bytes(raw_data, encoding or cached_encoding(key))
+    remember_encoding(key, encoding)
+    return text, encoding, file_bom(raw_data, encoding)
@@ -0,0 +1,220 @@
+import codecs
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from encoding_utils import (
+    NewlineNormalizer, detect_bom, file_bom, guess_encoding, file_cache_key, cached_encoding, remember_encoding
+)
+from perf_trace import record, trace
+from worker_thread import WorkerThread
+
+# 每次读取与解码的块大小
+LOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class LoadCancelled(Exception):
+    """加载被取消"""
+
+
+class FileLoadWorker(WorkerThread):
+    """
+    在后台线程中读取、探测编码并解码文件，
+    解码后的文本按块通过 chunk_ready 发送给界面线程
+    """
+    progress = pyqtSignal(int)
+    # 先按 UTF-8 解码并发送，失败后发出 reset，界面清空已收到的内容后重新接收
+    reset = pyqtSignal()
+    chunk_ready = pyqtSignal(object)
+    loaded = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path: str, encoding: Optional[str] = None):
+        super().__init__()
+        self.file_path = file_path
+        self.encoding = encoding
+        # 开始读取时的文件状态 (修改时间, 大小) 与实际读取的字节数，用于检测之后的外部修改
+        self.disk_state = (None, None)
+        self.bytes_read = 0
+        # 文件开头的 BOM，以及统计了原换行符的换行符统一器，保存时按原格式写回
+        self.bom = b''
+        self.newlines = NewlineNormalizer()
+
+    def _check_cancelled(self) -> None:
+        if self.isInterruptionRequested():
+            raise LoadCancelled()
+
+    def run(self) -> None:
+        try:
+            with trace('load', self.file_path):
+                self._load()
+        except LoadCancelled:
+            pass
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def _load(self) -> None:
+        """读取、探测并解码，各阶段的耗时记录到性能跟踪中"""
+        key = file_cache_key(self.file_path)
+        self.disk_state = key[1:]
+        start = time.perf_counter()
+        raw_data = self._read(key[2])
+        self.bytes_read = len(raw_data)
+        record('load.read', time.perf_counter() - start, self.file_path)
+        encoding = self.encoding or cached_encoding(key) or detect_bom(raw_data)
+        if encoding is None:
+            try:
+                self._decode(raw_data, 'utf-8', 'strict')
+                encoding = 'utf-8'
+            except UnicodeDecodeError as e:
+                self.reset.emit()
+                encoding = guess_encoding(raw_data, e.start)
+                self._decode(raw_data, encoding, 'ignore')
+        else:
+            self._decode(raw_data, encoding, 'ignore')
+        remember_encoding(key, encoding)
+        self.bom = file_bom(raw_data, encoding)
+        self.loaded.emit(encoding)
+
+    def _read(self, size: int) -> bytearray:
+        """分块读取整个文件，读取阶段占总进度的前一半"""
+        raw_data = bytearray()
+        with open(self.file_path, 'rb') as file:
+            while True:
+                self._check_cancelled()
+                chunk = file.read(LOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                raw_data += chunk
+                if size:
+                    self.progress.emit(min(50, len(raw_data) * 50 // size))
+        return raw_data
+
+    def _decode(self, raw_data: bytearray, encoding: str, errors: str) -> None:
+        """
+        按块增量解码并统一换行符后发送，解码阶段占总进度的后一半。
+        严格模式下解码失败时抛出的 UnicodeDecodeError.start 为整个文件中的偏移。
+        """
+        try:
+            decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+        except LookupError:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        view = memoryview(raw_data)
+        size = len(raw_data)
+        self.newlines = NewlineNormalizer()
+        # 解码与换行符统一交替进行，分别累计耗时
+        decode_time = newline_time = 0.0
+        for offset in range(0, size or 1, LOAD_CHUNK_SIZE):
+            self._check_cancelled()
+            end = min(offset + LOAD_CHUNK_SIZE, size)
+            start = time.perf_counter()
+            try:
+                text = decoder.decode(view[offset:end], final=end >= size)
+            except UnicodeDecodeError as e:
+                e.start += offset
+                raise
+            decode_time += time.perf_counter() - start
+            start = time.perf_counter()
+            text = self.newlines.feed(text, final=end >= size)
+            newline_time += time.perf_counter() - start
+            if text:
+                self.chunk_ready.emit(text)
+            if size:
+                self.progress.emit(50 + end * 50 // size)
+        record('load.decode', decode_time, encoding)
+        record('load.newline', newline_time)
+
+
+class BatchLoader(QObject):
+    """
+    批量打开文件：同时最多后台加载 max_parallel 个编辑器，其余排队。
+    编辑器需提供 load_file_async、cancel_loading 以及 load_progress、loaded、load_failed 信号；
+    每个文件加载完成后立即发出 file_loaded，全部完成后发出 all_done
+    """
+    file_loaded = pyqtSignal(object)
+    file_failed = pyqtSignal(object, str)
+    # (已完成的文件数, 文件总数, 总进度百分比)
+    progress = pyqtSignal(int, int, int)
+    all_done = pyqtSignal()
+
+    def __init__(self, max_parallel: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self.max_parallel = max_parallel or max(2, QThread.idealThreadCount())
+        self._queue: Deque = deque()
+        # 正在加载的编辑器及其加载进度
+        self._running: Dict[object, int] = {}
+        self.total = 0
+        self.completed = 0
+
+    def is_busy(self) -> bool:
+        return bool(self._queue or self._running)
+
+    def add(self, text_edit) -> None:
+        """加入加载队列，text_edit.file_path 为要加载的文件"""
+        self._queue.append(text_edit)
+        self.total += 1
+        self._start_next()
+        self._emit_progress()
+
+    def cancel(self) -> None:
+        """取消排队与正在加载的文件（例如退出程序时）"""
+        self._queue.clear()
+        for text_edit in list(self._running):
+            self._disconnect(text_edit)
+            text_edit.cancel_loading()
+        self._running.clear()
+        self.total = self.completed = 0
+
+    def _start_next(self) -> None:
+        while self._queue and len(self._running) < self.max_parallel:
+            text_edit = self._queue.popleft()
+            self._running[text_edit] = 0
+            text_edit.load_progress.connect(self._on_progress)
+            text_edit.loaded.connect(self._on_loaded)
+            text_edit.load_failed.connect(self._on_failed)
+            text_edit.load_file_async(text_edit.file_path, report_errors=False)
+
+    def _disconnect(self, text_edit) -> None:
+        text_edit.load_progress.disconnect(self._on_progress)
+        text_edit.loaded.disconnect(self._on_loaded)
+        text_edit.load_failed.disconnect(self._on_failed)
+
+    def _on_progress(self, value: int) -> None:
+        text_edit = self.sender()
+        if text_edit in self._running:
+            self._running[text_edit] = value
+            self._emit_progress()
+
+    def _on_loaded(self) -> None:
+        text_edit = self._finish(self.sender())
+        if text_edit is not None:
+            self.file_loaded.emit(text_edit)
+            self._after_finish()
+
+    def _on_failed(self, message: str) -> None:
+        text_edit = self._finish(self.sender())
+        if text_edit is not None:
+            self.file_failed.emit(text_edit, message)
+            self._after_finish()
+
+    def _finish(self, text_edit):
+        if text_edit not in self._running:
+            return None
+        del self._running[text_edit]
+        self._disconnect(text_edit)
+        self.completed += 1
+        return text_edit
+
+    def _after_finish(self) -> None:
+        self._start_next()
+        self._emit_progress()
+        if not self.is_busy():
+            self.total = self.completed = 0
+            self.all_done.emit()
+
+    def _emit_progress(self) -> None:
+        if self.total:
+            percent = (self.completed * 100 + sum(self._running.values())) // self.total
+            self.progress.emit(self.completed, self.total, percent)
@@ -0,0 +1,121 @@
+import codecs
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator
+
+from PyQt5.QtCore import pyqtSignal
+
+from encoding_utils import file_cache_key, remember_encoding, stream_encoding
+from perf_trace import trace
+from worker_thread import WorkerThread
+
+# 每次编码写入的文本量（字符数）
+SAVE_CHUNK_SIZE = 1024 * 1024
+
+# 新建文件时按当前 umask 设置权限（mkstemp 创建的临时文件权限为 0600）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def iter_text_chunks(text: str, newline: str = '\n') -> Iterator[str]:
+    """
+    把 QTextDocument.toRawText() 的文本按 SAVE_CHUNK_SIZE 切成小块，逐块把段落分隔符 U+2029
+    （文本块之间的分隔）转换为换行符并编码写入，避免整体转换或编码出一份完整的副本。
+    文本中的不换行空格与行分隔符 U+2028 原样保存
+    """
+    for offset in range(0, len(text), SAVE_CHUNK_SIZE):
+        yield text[offset:offset + SAVE_CHUNK_SIZE].replace('\u2029', newline)
+
+
+def _fsync_directory(directory: str) -> None:
+    """同步目录项，保证重命名在断电后依然有效（不支持的平台忽略）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_text_atomic(file_path: str, chunks: Iterable[str], encoding: str = 'utf-8', bom: bytes = b'') -> None:
+    """
+    将 BOM（如果有）与编码后的文本块写入同目录下的临时文件，fsync 后原子地重命名为目标文件。
+    写入过程中出错时目标文件保持不变。
+    """
+    # 目标是符号链接时替换链接指向的文件，而不是链接本身
+    file_path = os.path.realpath(file_path)
+    directory = os.path.dirname(file_path)
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(file_path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(bom)
+            encoder = codecs.getincrementalencoder(stream_encoding(encoding, bom))()
+            for chunk in chunks:
+                file.write(encoder.encode(chunk))
+            file.write(encoder.encode('', final=True))
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+        else:
+            os.chmod(temp_path, 0o666 & ~_UMASK)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
+
+
+class FileSaveWorker(WorkerThread):
+    """
+    在后台线程中把文档的文本快照按指定的编码、BOM 与换行符写入文件。
+    快照在界面线程中通过 toRawText() 获取（QTextDocument.clone() 对大文档慢得多；
+    toPlainText() 会把不换行空格替换为空格）
+    """
+    saved = pyqtSignal(str, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, text: str, file_path: str, revision: int, encoding: str = 'utf-8',
+                 bom: bytes = b'', newline: str = '\n'):
+        super().__init__()
+        self.text = text
+        self.file_path = file_path
+        self.revision = revision
+        self.encoding = encoding
+        self.bom = bom
+        self.newline = newline
+        self.succeeded = False
+
+    def _on_finished(self) -> None:
+        super()._on_finished()
+        self.text = None
+
+    def run(self) -> None:
+        try:
+            with trace('save', f"{self.file_path} {self.encoding}"):
+                write_text_atomic(self.file_path, iter_text_chunks(self.text, self.newline),
+                                  self.encoding, self.bom)
+            # 再次打开时直接使用保存时的编码，不再探测
+            remember_encoding(file_cache_key(self.file_path), self.encoding)
+            self.succeeded = True
+            self.saved.emit(self.file_path, self.revision)
+        except UnicodeEncodeError as e:
+            self.failed.emit(f"内容中的字符 {e.object[e.start:e.end]!r} 无法用 {self.encoding} 编码，"
+                             f"请转换为其他编码（例如 UTF-8）后再保存")
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+def wait_for_pending_saves() -> None:
+    """等待所有正在进行的保存完成（例如退出程序前）"""
+    for worker in FileSaveWorker.active_workers():
+        worker.wait()
@@ -0,0 +1,98 @@
+# 在文件中查找：遍历目录并搜索文件内容。
+# 本模块不依赖 Qt，搜索函数在进程池的子进程中运行
+import codecs
+import fnmatch
+import mmap
+import os
+from typing import Iterator, List, Optional, Pattern, Sequence, Tuple
+
+from encoding_utils import detect_bom, detect_sample_encoding, read_text_file
+
+# 超过该大小的文件通过 mmap 分块解码搜索，不整体读入内存
+MMAP_SEARCH_THRESHOLD = 16 * 1024 * 1024
+# mmap 搜索时每块的大致字节数（在换行符处切分）
+SEARCH_CHUNK_SIZE = 4 * 1024 * 1024
+# 单个文件最多返回的匹配数量
+MAX_RESULTS_PER_FILE = 1000
+# 预览文本的最大长度
+PREVIEW_LENGTH = 200
+# 判断二进制文件时检查的字节数
+BINARY_SNIFF_SIZE = 8192
+
+# 单个匹配项：(行号（从 0 开始）, 列号, 该行的预览文本)
+SearchResult = Tuple[int, int, str]
+
+
+def iter_files(root: str, include: Sequence[str] = ()) -> Iterator[str]:
+    """遍历 root 下的文件（跳过隐藏目录），include 为文件名通配符列表，为空时不过滤"""
+    for directory, dir_names, file_names in os.walk(root):
+        dir_names[:] = sorted(name for name in dir_names if not name.startswith('.'))
+        for file_name in sorted(file_names):
+            if include and not any(fnmatch.fnmatch(file_name, pattern) for pattern in include):
+                continue
+            yield os.path.join(directory, file_name)
+
+
+def is_binary(head: bytes) -> bool:
+    """开头包含 NUL 字节且不是 UTF-16/UTF-32 文本时视为二进制文件"""
+    return b'\x00' in head and detect_bom(head) not in ('utf-16', 'utf-32')
+
+
+def _search_text(text: str, pattern: Pattern, first_line: int, results: List[SearchResult],
+                 final: bool = True) -> int:
+    """
+    在一段文本中查找，结果追加到 results，返回这段文本包含的换行符数量。
+    final 为 False 表示文本以换行符结束且后面还有内容
+    """
+    line = first_line
+    line_start = 0
+    scanned = 0
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        if '\n' in match.group():
+            continue
+        # 末尾（换行符之后）的空匹配实际位于下一块的开头，由下一块查找
+        if start == len(text) and not final:
+            continue
+        line += text.count('\n', scanned, start)
+        scanned = start
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        preview = text[line_start:line_end if line_end != -1 else len(text)]
+        results.append((line, start - line_start, preview[:PREVIEW_LENGTH].strip()))
+        if len(results) >= MAX_RESULTS_PER_FILE:
+            break
+    return text.count('\n')
+
+
+def search_file(file_path: str, pattern: Pattern) -> Tuple[str, List[SearchResult], Optional[str]]:
+    """
+    在单个文件中查找 pattern，返回 (文件路径, 匹配项列表, 错误信息)。
+    小文件复用编辑器的编码探测一次读入；大文件通过 mmap 按块解码，内存占用与文件大小无关
+    """
+    results: List[SearchResult] = []
+    try:
+        with open(file_path, 'rb') as file:
+            head = file.read(BINARY_SNIFF_SIZE)
+            if is_binary(head):
+                return file_path, results, None
+            size = os.fstat(file.fileno()).st_size
+            # UTF-16/UTF-32 文本不能按字节中的换行符切块，整体解码
+            if size < MMAP_SEARCH_THRESHOLD or detect_bom(head) in ('utf-16', 'utf-32'):
+                text, _, _ = read_text_file(file_path)
+                _search_text(text, pattern, 0, results)
+                return file_path, results, None
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                encoding = detect_sample_encoding(data)
+                decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+                line = 0
+                offset = 0
+                while offset < size and len(results) < MAX_RESULTS_PER_FILE:
+                    end = data.find(b'\n', offset + SEARCH_CHUNK_SIZE)
+                    end = size if end == -1 else end + 1
+                    chunk = decoder.decode(data[offset:end], final=end >= size)
+                    line += _search_text(chunk, pattern, line, results, final=end >= size)
+                    offset = end
+        return file_path, results, None
+    except Exception as e:
+        return file_path, results, str(e)
@@ -0,0 +1,91 @@
+import os
+from typing import Dict, Set
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+# 同一文件的连续变化合并处理的延迟（毫秒），写入日志等操作会连续触发多次通知
+CHANGE_DELAY = 200
+# 其他程序以“写临时文件再重命名”的方式保存时，文件会短暂不存在，每隔该时间重试一次
+MISSING_RETRY_DELAY = 500
+MISSING_RETRIES = 10
+
+
+class FileWatcher(QObject):
+    """
+    监视编辑器打开的文件，文件被其他程序修改时发出 file_changed(编辑器)。
+    文件被替换（原子保存、日志轮转）后 QFileSystemWatcher 会丢失监视，这里重新添加；
+    是否为本程序自己的保存由接收方比较文件状态判断
+    """
+    file_changed = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_file_changed)
+        # 编辑器 -> 监视的路径，路径 -> 打开该路径的编辑器
+        self._path_of: Dict[object, str] = {}
+        self._editors: Dict[str, Set[object]] = {}
+        self._changed: Set[str] = set()
+        self._retries: Dict[str, int] = {}
+        self.change_timer = QTimer(self)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.setInterval(CHANGE_DELAY)
+        self.change_timer.timeout.connect(self._emit_changes)
+
+    def add(self, text_edit) -> None:
+        """开始监视 text_edit 打开的文件（只读的大文件视图不需要监视）"""
+        if not hasattr(text_edit, 'file_path_changed') or text_edit in self._path_of:
+            return
+        self._path_of[text_edit] = ''
+        text_edit.file_path_changed.connect(self._on_file_path_changed)
+        self._set_path(text_edit, text_edit.file_path)
+
+    def remove(self, text_edit) -> None:
+        if text_edit not in self._path_of:
+            return
+        self._set_path(text_edit, None)
+        del self._path_of[text_edit]
+        text_edit.file_path_changed.disconnect(self._on_file_path_changed)
+
+    def _set_path(self, text_edit, file_path) -> None:
+        old_path = self._path_of[text_edit]
+        if old_path:
+            editors = self._editors[old_path]
+            editors.discard(text_edit)
+            if not editors:
+                del self._editors[old_path]
+                self.watcher.removePath(old_path)
+        file_path = os.path.abspath(file_path) if file_path else ''
+        self._path_of[text_edit] = file_path
+        if file_path:
+            self._editors.setdefault(file_path, set()).add(text_edit)
+            if file_path not in self.watcher.files() and os.path.exists(file_path):
+                self.watcher.addPath(file_path)
+
+    def _on_file_path_changed(self, file_path: str) -> None:
+        text_edit = self.sender()
+        if text_edit in self._path_of:
+            self._set_path(text_edit, file_path)
+
+    def _on_file_changed(self, file_path: str) -> None:
+        self._changed.add(file_path)
+        self.change_timer.start()
+
+    def _emit_changes(self) -> None:
+        changed, self._changed = self._changed, set()
+        for file_path in changed:
+            editors = self._editors.get(file_path)
+            if not editors:
+                continue
+            if not os.path.exists(file_path):
+                # 文件可能正在被替换，稍后再检查；一直不存在时停止重试
+                retries = self._retries.get(file_path, 0)
+                if retries < MISSING_RETRIES:
+                    self._retries[file_path] = retries + 1
+                    QTimer.singleShot(MISSING_RETRY_DELAY, lambda path=file_path: self._on_file_changed(path))
+                continue
+            self._retries.pop(file_path, None)
+            if file_path not in self.watcher.files():
+                self.watcher.addPath(file_path)
+            for text_edit in list(editors):
+                self.file_changed.emit(text_edit)
@@ -0,0 +1,241 @@
+import multiprocessing
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List, Optional, Pattern
+
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QCheckBox, QLabel,
+    QTreeWidget, QTreeWidgetItem, QFileDialog, QMessageBox
+)
+
+from file_search import iter_files, search_file
+from match_index import compile_pattern
+from perf_trace import trace
+from worker_thread import WorkerThread
+
+# 同时提交给进程池的文件数，避免一次性遍历并提交整个目录树
+MAX_PENDING_FILES = 64
+# 等待搜索结果的间隔（秒），两次等待之间检查取消
+RESULT_POLL_INTERVAL = 0.1
+# 结果面板最多显示的匹配项数量
+MAX_DISPLAY_RESULTS = 10000
+
+
+class FindInFilesWorker(WorkerThread):
+    """
+    在后台线程中遍历目录，把文件分发给进程池搜索，
+    每个文件搜索完成后立即通过 file_searched 发送结果
+    """
+    file_searched = pyqtSignal(str, object)
+    progress = pyqtSignal(int, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, root: str, pattern: Pattern, include: List[str],
+                 max_workers: Optional[int] = None):
+        super().__init__()
+        self.root = root
+        self.pattern = pattern
+        self.include = include
+        self.max_workers = max_workers
+        # 无法读取的文件数量
+        self.error_count = 0
+
+    def run(self) -> None:
+        try:
+            with trace('find_in_files', self.root):
+                self._search()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def _search(self) -> None:
+        # 界面进程中已有多个线程，fork 出的子进程可能继承被锁住的锁，因此使用 spawn
+        context = multiprocessing.get_context('spawn')
+        executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        try:
+            files = iter_files(self.root, self.include)
+            pending = set()
+            exhausted = False
+            total = searched = 0
+            while not self.isInterruptionRequested():
+                while not exhausted and len(pending) < MAX_PENDING_FILES:
+                    file_path = next(files, None)
+                    if file_path is None:
+                        exhausted = True
+                        break
+                    pending.add(executor.submit(search_file, file_path, self.pattern))
+                    total += 1
+                if not pending:
+                    break
+                done, pending = wait(pending, timeout=RESULT_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, results, error = future.result()
+                    searched += 1
+                    if error is not None:
+                        self.error_count += 1
+                    if results:
+                        self.file_searched.emit(file_path, results)
+                if done:
+                    self.progress.emit(searched, total)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FindInFilesPanel(QDockWidget):
+    """在文件中查找面板：结果按文件分组，点击匹配项时发出 open_location(文件路径, 行号)"""
+    open_location = pyqtSignal(str, int)
+
+    def __init__(self, parent=None):
+        super().__init__('在文件中查找', parent)
+        self.setObjectName('find_in_files_panel')
+        self.worker: Optional[FindInFilesWorker] = None
+        self.result_count = 0
+
+        widget = QWidget(self)
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        directory_layout = QHBoxLayout()
+        self.directory_input = QLineEdit(self)
+        self.directory_input.setPlaceholderText('搜索目录')
+        self.browse_button = QPushButton('浏览...', self)
+        directory_layout.addWidget(QLabel('目录:', self))
+        directory_layout.addWidget(self.directory_input)
+        directory_layout.addWidget(self.browse_button)
+
+        query_layout = QHBoxLayout()
+        self.query_input = QLineEdit(self)
+        self.include_input = QLineEdit(self)
+        self.include_input.setPlaceholderText('*.log;*.conf（留空搜索全部文件）')
+        query_layout.addWidget(QLabel('查找:', self))
+        query_layout.addWidget(self.query_input)
+        query_layout.addWidget(QLabel('文件类型:', self))
+        query_layout.addWidget(self.include_input)
+
+        option_layout = QHBoxLayout()
+        self.match_case_checkbox = QCheckBox('匹配大小写', self)
+        self.whole_word_checkbox = QCheckBox('全字匹配', self)
+        self.regex_checkbox = QCheckBox('正则表达式', self)
+        self.search_button = QPushButton('搜索', self)
+        self.stop_button = QPushButton('停止', self)
+        self.stop_button.setEnabled(False)
+        option_layout.addWidget(self.match_case_checkbox)
+        option_layout.addWidget(self.whole_word_checkbox)
+        option_layout.addWidget(self.regex_checkbox)
+        option_layout.addStretch()
+        option_layout.addWidget(self.search_button)
+        option_layout.addWidget(self.stop_button)
+
+        self.status_label = QLabel(self)
+        self.results_tree = QTreeWidget(self)
+        self.results_tree.setHeaderHidden(True)
+        self.results_tree.setUniformRowHeights(True)
+
+        layout.addLayout(directory_layout)
+        layout.addLayout(query_layout)
+        layout.addLayout(option_layout)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.results_tree)
+        self.setWidget(widget)
+
+        self.browse_button.clicked.connect(self.browse_directory)
+        self.search_button.clicked.connect(self.start_search)
+        self.query_input.returnPressed.connect(self.start_search)
+        self.stop_button.clicked.connect(self.stop_search)
+        self.results_tree.itemClicked.connect(self.on_item_clicked)
+
+    def browse_directory(self) -> None:
+        directory = QFileDialog.getExistingDirectory(self, '选择搜索目录', self.directory_input.text())
+        if directory:
+            self.directory_input.setText(directory)
+
+    def start_search(self) -> None:
+        """用当前选项开始新的搜索，正在进行的搜索会被取消"""
+        root = self.directory_input.text().strip()
+        query = self.query_input.text()
+        if not query:
+            return
+        if not os.path.isdir(root):
+            QMessageBox.critical(self, "错误", "请选择一个有效的目录")
+            return
+        try:
+            pattern = compile_pattern(query, self.match_case_checkbox.isChecked(),
+                                      self.regex_checkbox.isChecked(),
+                                      self.whole_word_checkbox.isChecked())
+        except re.error as e:
+            QMessageBox.critical(self, "错误", f"正则表达式无效: {e}")
+            return
+        include = [item.strip() for item in self.include_input.text().split(';') if item.strip()]
+
+        self.stop_search()
+        self.results_tree.clear()
+        self.result_count = 0
+        self.status_label.setText('正在搜索...')
+        self.worker = FindInFilesWorker(root, pattern, include)
+        self.worker.file_searched.connect(self.add_file_results)
+        self.worker.progress.connect(self.update_progress)
+        self.worker.failed.connect(self.on_search_failed)
+        self.worker.finished.connect(self.on_search_finished)
+        self.search_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.worker.start()
+
+    def stop_search(self) -> None:
+        """取消正在进行的搜索，已显示的结果保留"""
+        if self.worker is not None:
+            # 断开连接，已排队的信号不会再影响之后的搜索
+            self.worker.file_searched.disconnect(self.add_file_results)
+            self.worker.progress.disconnect(self.update_progress)
+            self.worker.finished.disconnect(self.on_search_finished)
+            self.worker.requestInterruption()
+            self.worker.wait()
+            self.on_search_finished()
+
+    def add_file_results(self, file_path: str, results: list) -> None:
+        """把一个文件的搜索结果添加到结果树中"""
+        if self.result_count >= MAX_DISPLAY_RESULTS:
+            return
+        results = results[:MAX_DISPLAY_RESULTS - self.result_count]
+        self.result_count += len(results)
+        root = self.directory_input.text().strip()
+        file_item = QTreeWidgetItem([f"{os.path.relpath(file_path, root)} ({len(results)})"])
+        file_item.setToolTip(0, file_path)
+        file_item.setData(0, Qt.UserRole, (file_path, 0))
+        for line, column, preview in results:
+            item = QTreeWidgetItem([f"{line + 1}: {preview}"])
+            item.setData(0, Qt.UserRole, (file_path, line))
+            file_item.addChild(item)
+        self.results_tree.addTopLevelItem(file_item)
+        file_item.setExpanded(True)
+
+    def update_progress(self, searched: int, total: int) -> None:
+        self.status_label.setText(f"已搜索 {searched} 个文件，找到 {self.result_count} 处")
+
+    def on_search_failed(self, message: str) -> None:
+        QMessageBox.critical(self, "错误", f"搜索文件时出错: {message}")
+
+    def on_search_finished(self) -> None:
+        worker = self.worker
+        if worker is None:
+            return
+        self.worker = None
+        self.search_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        message = f"共找到 {self.result_count} 处"
+        if self.result_count >= MAX_DISPLAY_RESULTS:
+            message += f"（只显示前 {MAX_DISPLAY_RESULTS} 项）"
+        if worker.error_count:
+            message += f"，{worker.error_count} 个文件无法读取"
+        self.status_label.setText(message)
+
+    def on_item_clicked(self, item: QTreeWidgetItem) -> None:
+        """点击匹配项时打开文件并跳转到对应行"""
+        if item.parent() is None:
+            return
+        file_path, line = item.data(0, Qt.UserRole)
+        self.open_location.emit(file_path, line)
+
+    def closeEvent(self, event) -> None:
+        self.stop_search()
+        super().closeEvent(event)
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject
+
+from cli import DEFAULT_MEMORY_BUDGET_MB
+from perf_trace import trace
+
+# 估算文档占用的内存：每个字符 2 字节（UTF-16），每个文本块（行）的布局与格式约 360 字节
+DOCUMENT_BYTES_PER_CHAR = 2
+DOCUMENT_BYTES_PER_BLOCK = 360
+
+
+def estimate_memory(text_edit) -> int:
+    """估算编辑器当前占用的内存（字节），休眠的编辑器只计算压缩后的内容"""
+    if text_edit.hibernated_text is not None:
+        return len(text_edit.hibernated_text)
+    document = text_edit.document()
+    return document.characterCount() * DOCUMENT_BYTES_PER_CHAR + document.blockCount() * DOCUMENT_BYTES_PER_BLOCK
+
+
+class TabHibernator(QObject):
+    """
+    按最近使用顺序（LRU）让不活动的标签页休眠，使所有文档占用的内存不超过预算：
+    没有未保存修改的标签页释放文档，再次激活时重新加载文件；
+    有未保存修改的标签页把内容压缩后保存在内存中，再次激活时解压恢复。
+    休眠状态显示在标签页的提示中
+    """
+
+    def __init__(self, tabs, tab_registry, budget_mb: int = DEFAULT_MEMORY_BUDGET_MB, parent=None):
+        super().__init__(parent)
+        self.tabs = tabs
+        self.tab_registry = tab_registry
+        self.budget = budget_mb * 1024 * 1024
+        # 编辑器按最近使用的先后排列，最久未使用的在前
+        self._usage: OrderedDict = OrderedDict()
+        tabs.currentChanged.connect(self.on_current_changed)
+
+    def add(self, text_edit) -> None:
+        """开始管理 text_edit（只读的大文件视图直接映射文件，不需要休眠）"""
+        if not hasattr(text_edit, 'hibernate') or text_edit in self._usage:
+            return
+        # 新注册的（例如批量打开、会话恢复的）标签页尚未使用过，排在最前
+        self._usage[text_edit] = None
+        self._usage.move_to_end(text_edit, last=False)
+        text_edit.loaded.connect(self.enforce)
+
+    def remove(self, text_edit) -> None:
+        if text_edit in self._usage:
+            del self._usage[text_edit]
+            text_edit.loaded.disconnect(self.enforce)
+
+    def on_current_changed(self, index: int) -> None:
+        """激活的标签页成为最近使用的；休眠的标签页此时已由 materialize_tab 恢复"""
+        text_edit = self._editor_at(index)
+        if text_edit in self._usage:
+            self._usage.move_to_end(text_edit)
+            self.tabs.setTabToolTip(index, text_edit.file_path or "")
+        self.enforce()
+
+    def enforce(self) -> None:
+        """总占用超过预算时，从最久未使用的标签页开始休眠，直到回到预算以内"""
+        usage = {text_edit: estimate_memory(text_edit) for text_edit in self._usage}
+        total = sum(usage.values())
+        if total <= self.budget:
+            return
+        current = self._editor_at(self.tabs.currentIndex())
+        for text_edit in list(self._usage):
+            if total <= self.budget:
+                break
+            if text_edit is current or not self._can_hibernate(text_edit):
+                continue
+            with trace('hibernate', text_edit.file_path or "未命名"):
+                text_edit.hibernate()
+            total -= usage[text_edit] - estimate_memory(text_edit)
+            self._update_tooltip(text_edit, usage[text_edit])
+
+    @staticmethod
+    def _can_hibernate(text_edit) -> bool:
+        """
+        正在加载、粘贴、保存或跟踪文件末尾的标签页，已经休眠的标签页，
+        以及无法重新加载的（没有文件路径的）标签页不处理
+        """
+        return not (text_edit.is_loading or text_edit.is_pasting or text_edit.pending_saves or text_edit.follow_mode
+                    or text_edit.session_state is not None or text_edit.document().isEmpty()
+                    or (text_edit.is_saved and not text_edit.file_path))
+
+    def _editor_at(self, index: int):
+        tab_widget = self.tabs.widget(index)
+        return self.tab_registry.editor_for(tab_widget) if tab_widget is not None else None
+
+    def _update_tooltip(self, text_edit, released: int) -> None:
+        index = self.tabs.indexOf(text_edit.parent())
+        if index == -1:
+            return
+        if text_edit.hibernated_text is not None:
+            note = (f"已休眠：未保存的修改已压缩（{released / 1024 / 1024:.1f} MB → "
+                    f"{len(text_edit.hibernated_text) / 1024 / 1024:.1f} MB），激活时恢复")
+        else:
+            note = f"已休眠：释放约 {released / 1024 / 1024:.1f} MB，激活时重新加载"
+        file_name = text_edit.file_path or "未命名"
+        self.tabs.setTabToolTip(index, f"{file_name}\n{note}")
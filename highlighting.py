@@ -0,0 +1,186 @@
+import os
+import re
+from bisect import bisect_left
+from typing import Dict, NamedTuple, Optional, Pattern, Tuple
+
+from PyQt5.QtCore import QPoint
+from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextCharFormat
+
+from match_index import _ASTRAL_RE
+
+# 文档超过该长度（字符数）时不高亮：附加高亮器时 Qt 会为每个文本块调用一次 highlightBlock
+HIGHLIGHT_SIZE_LIMIT = 2 * 1024 * 1024
+# 可见范围上下额外高亮的文本块数，小幅滚动时不需要等待高亮
+HIGHLIGHT_MARGIN_BLOCKS = 20
+# 可见范围以外、尚未高亮的文本块的状态（Qt 的默认状态 -1 表示从未处理）
+UNHIGHLIGHTED = -2
+
+
+def _format(color: str, bold: bool = False, italic: bool = False) -> QTextCharFormat:
+    char_format = QTextCharFormat()
+    char_format.setForeground(QColor(color))
+    if bold:
+        char_format.setFontWeight(QFont.Bold)
+    char_format.setFontItalic(italic)
+    return char_format
+
+
+class RuleSet(NamedTuple):
+    """
+    一种文件类型的高亮规则，模式在导入时预先编译。
+    rules 中的 (模式, 格式) 依次应用，后面的规则覆盖前面的规则；
+    levels 为日志级别 (模式, 整行格式)，匹配的行及其后的续行（continuation，例如异常堆栈）
+    整行使用该格式，续行通过文本块状态继承上一行的级别
+    """
+    name: str
+    extensions: Tuple[str, ...]
+    rules: Tuple[Tuple[Pattern, QTextCharFormat], ...]
+    levels: Tuple[Tuple[Pattern, QTextCharFormat], ...] = ()
+    continuation: Optional[Pattern] = None
+
+
+LOG_RULES = RuleSet(
+    '日志', ('.log', '.out', '.err'),
+    rules=(
+        (re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b'),
+         _format('#808080')),
+        (re.compile(r'\b(?:DEBUG|TRACE)\b'), _format('#808080', bold=True)),
+        (re.compile(r'\bINFO\b'), _format('#1565c0', bold=True)),
+        (re.compile(r'\b(?:WARN|WARNING)\b'), _format('#e65100', bold=True)),
+        (re.compile(r'\b(?:ERROR|FATAL|CRITICAL|SEVERE)\b'), _format('#c62828', bold=True)),
+    ),
+    levels=(
+        (re.compile(r'\b(?:ERROR|FATAL|CRITICAL|SEVERE)\b'), _format('#c62828')),
+        (re.compile(r'\b(?:WARN|WARNING)\b'), _format('#e65100')),
+    ),
+    continuation=re.compile(r'\s|Traceback \(|Caused by:|\w+(?:\.\w+)*(?:Error|Exception)\b'),
+)
+
+INI_RULES = RuleSet(
+    '配置文件', ('.ini', '.cfg', '.conf', '.properties', '.toml'),
+    rules=(
+        (re.compile(r'^\s*[^\s=:;#\[][^=:]*?(?=\s*[=:])'), _format('#1565c0')),
+        (re.compile(r'(?<=[=:])\s*(?:true|false|yes|no|on|off|-?\d+(?:\.\d+)?)\s*$', re.IGNORECASE),
+         _format('#6a1b9a')),
+        (re.compile(r'"(?:[^"\\]|\\.)*"|\'[^\']*\''), _format('#2e7d32')),
+        (re.compile(r'^\s*\[[^\]]*\]'), _format('#ad1457', bold=True)),
+        (re.compile(r'^\s*[;#].*'), _format('#808080', italic=True)),
+    ),
+)
+
+JSON_RULES = RuleSet(
+    'JSON', ('.json', '.jsonl', '.geojson'),
+    rules=(
+        (re.compile(r'-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b'), _format('#6a1b9a')),
+        (re.compile(r'\b(?:true|false|null)\b'), _format('#6a1b9a', bold=True)),
+        (re.compile(r'"(?:[^"\\]|\\.)*"'), _format('#2e7d32')),
+        (re.compile(r'"(?:[^"\\]|\\.)*"(?=\s*:)'), _format('#1565c0')),
+    ),
+)
+
+YAML_RULES = RuleSet(
+    'YAML', ('.yaml', '.yml'),
+    rules=(
+        (re.compile(r'^\s*(?:-\s+)?[^\s#:\'"][^#:]*?(?=:(?:\s|$))'), _format('#1565c0')),
+        (re.compile(r'(?<=:\s)\s*(?:true|false|yes|no|null|~|-?\d+(?:\.\d+)?)\s*$', re.IGNORECASE),
+         _format('#6a1b9a')),
+        (re.compile(r'"(?:[^"\\]|\\.)*"|\'[^\']*\''), _format('#2e7d32')),
+        (re.compile(r'[&*][\w-]+|!!?[\w-]+'), _format('#ad1457')),
+        (re.compile(r'^(?:---|\.\.\.)\s*$'), _format('#ad1457', bold=True)),
+        (re.compile(r'(?:^|(?<=\s))#.*'), _format('#808080', italic=True)),
+    ),
+)
+
+RULE_SETS = (LOG_RULES, INI_RULES, JSON_RULES, YAML_RULES)
+# 扩展名（小写，含点）-> 高亮规则
+_RULES_BY_EXTENSION: Dict[str, RuleSet] = {
+    extension: rule_set for rule_set in RULE_SETS for extension in rule_set.extensions
+}
+
+
+def rule_set_for(file_path: Optional[str]) -> Optional[RuleSet]:
+    """根据扩展名返回高亮规则，没有对应规则时返回 None"""
+    if not file_path:
+        return None
+    return _RULES_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower())
+
+
+class SyntaxHighlighter(QSyntaxHighlighter):
+    """
+    只高亮可见范围（上下各留 HIGHLIGHT_MARGIN_BLOCKS 块）内的文本块，范围外的文本块
+    只标记为 UNHIGHLIGHTED，滚动到可见范围时再高亮。
+    编辑后 QSyntaxHighlighter 从修改的文本块开始重新高亮，直到某个文本块的状态不变为止，
+    其余文本块使用缓存的格式与状态
+    """
+
+    def __init__(self, text_edit, rule_set: RuleSet):
+        super().__init__(text_edit)
+        self.text_edit = text_edit
+        self.rule_set = rule_set
+        self.first_block, self.last_block = self.visible_range()
+        text_edit.updateRequest.connect(self.update_visible_range)
+        # 附加到文档后，Qt 在下一次事件循环中为每个文本块调用一次 highlightBlock
+        self.setDocument(text_edit.document())
+
+    def detach(self) -> None:
+        """停止高亮并清除已设置的格式"""
+        self.text_edit.updateRequest.disconnect(self.update_visible_range)
+        self.setDocument(None)
+        self.deleteLater()
+
+    def visible_range(self) -> Tuple[int, int]:
+        """返回需要高亮的文本块编号范围（包含两端）"""
+        viewport = self.text_edit.viewport()
+        first = self.text_edit.firstVisibleBlock().blockNumber()
+        last = self.text_edit.cursorForPosition(QPoint(0, viewport.height())).blockNumber()
+        return max(0, first - HIGHLIGHT_MARGIN_BLOCKS), last + HIGHLIGHT_MARGIN_BLOCKS
+
+    def update_visible_range(self, *_) -> None:
+        """滚动或改变大小后，高亮新进入可见范围且尚未高亮的文本块"""
+        visible_range = self.visible_range()
+        if visible_range == (self.first_block, self.last_block):
+            return
+        self.first_block, self.last_block = visible_range
+        document = self.document()
+        # 撤销被禁用时（跟踪模式）rehighlightBlock 的编辑块会把文档标记为已修改
+        modified = document.isModified()
+        block = document.findBlockByNumber(self.first_block)
+        while block.isValid() and block.blockNumber() <= self.last_block:
+            if block.userState() < 0:
+                # 从该块开始重新高亮，状态变化会带动范围内其后尚未高亮的文本块
+                self.rehighlightBlock(block)
+            block = block.next()
+        if not modified and document.isModified():
+            document.setModified(False)
+
+    def highlightBlock(self, text: str) -> None:
+        number = self.currentBlock().blockNumber()
+        if not self.first_block <= number <= self.last_block:
+            self.setCurrentBlockState(UNHIGHLIGHTED)
+            return
+        rule_set = self.rule_set
+        astral = [match.start() for match in _ASTRAL_RE.finditer(text)]
+        state = 0
+        if rule_set.levels:
+            for level, (pattern, _) in enumerate(rule_set.levels, 1):
+                if pattern.search(text):
+                    state = level
+                    break
+            else:
+                previous = self.previousBlockState()
+                if previous > 0 and text and rule_set.continuation.match(text):
+                    state = previous
+            if state:
+                self._set_format(astral, 0, len(text), rule_set.levels[state - 1][1])
+        for pattern, char_format in rule_set.rules:
+            for match in pattern.finditer(text):
+                self._set_format(astral, match.start(), match.end(), char_format)
+        self.setCurrentBlockState(state)
+
+    def _set_format(self, astral, start: int, end: int, char_format: QTextCharFormat) -> None:
+        """按 Python 字符串下标设置格式，换算为 Qt 使用的 UTF-16 偏移"""
+        if astral:
+            start += bisect_left(astral, start)
+            end += bisect_left(astral, end)
+        if end > start:
+            self.setFormat(start, end - start, char_format)
@@ -0,0 +1,459 @@
+import mmap
+import os
+import re
+import time
+from bisect import bisect_left
+from typing import List, Optional, Pattern, Tuple
+
+from PyQt5.QtCore import Qt, QTimer, QElapsedTimer, QEvent, pyqtSignal
+from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtWidgets import QAbstractScrollArea, QMessageBox
+
+from encoding_utils import detect_bom, detect_sample_encoding
+from match_index import SCAN_TIMEOUT
+from perf_trace import trace
+from worker_thread import WorkerThread
+
+# 超过该大小的文件使用只读的大文件视图打开
+LARGE_FILE_THRESHOLD = 64 * 1024 * 1024
+# 行索引按固定字节块统计换行符数量
+INDEX_CHUNK_SIZE = 64 * 1024
+# 每次构建索引占用界面线程的最长时间（毫秒）
+INDEX_TIME_SLICE_MS = 30
+# 单行最多解码显示的字节数，避免超长行拖慢绘制
+MAX_DISPLAY_LINE_BYTES = 4096
+# 后台查找每段的大致字节数（在换行符处切分），两段之间检查取消与超时
+SEARCH_SEGMENT_SIZE = 1024 * 1024
+
+
+def is_large_file(file_path: str, threshold: int = LARGE_FILE_THRESHOLD) -> bool:
+    """
+    判断文件是否应该使用大文件视图打开：
+    文件大小超过阈值，且不是 UTF-16/UTF-32 这类换行符不是单字节的编码
+    """
+    if os.path.getsize(file_path) < threshold:
+        return False
+    with open(file_path, 'rb') as file:
+        return detect_bom(file.read(4)) not in ('utf-16', 'utf-32')
+
+
+class LineIndex:
+    """
+    建立在 mmap 之上的稀疏行索引：
+    只记录每个固定大小字节块结束时累计的换行符数量，
+    定位某一行时先二分查找所在块，再在块内顺序查找换行符。
+    """
+
+    def __init__(self, data: mmap.mmap):
+        self.data = data
+        self.size = len(data)
+        # _counts[k] 为 [0, (k + 1) * INDEX_CHUNK_SIZE) 范围内的换行符数量
+        self._counts: List[int] = []
+        self.indexed_bytes = 0
+
+    @property
+    def done(self) -> bool:
+        return self.indexed_bytes >= self.size
+
+    @property
+    def line_count(self) -> int:
+        """已建立索引部分的行数（最后一个换行符之后还有一行）"""
+        return (self._counts[-1] if self._counts else 0) + 1
+
+    def build_step(self, max_chunks: int) -> None:
+        """继续统计最多 max_chunks 个字节块"""
+        total = self._counts[-1] if self._counts else 0
+        for _ in range(max_chunks):
+            if self.done:
+                break
+            start = self.indexed_bytes
+            end = min(start + INDEX_CHUNK_SIZE, self.size)
+            total += self.data[start:end].count(b'\n')
+            self._counts.append(total)
+            self.indexed_bytes = end
+
+    def line_offset(self, line: int) -> Optional[int]:
+        """返回第 line 行（从 0 开始）起始的字节偏移，超出已索引范围时返回 None"""
+        if line <= 0:
+            return 0
+        if line >= self.line_count:
+            return None
+        # 第 line 行从第 line 个换行符之后开始
+        chunk = bisect_left(self._counts, line)
+        remaining = line - (self._counts[chunk - 1] if chunk else 0)
+        pos = chunk * INDEX_CHUNK_SIZE
+        for _ in range(remaining):
+            pos = self.data.find(b'\n', pos) + 1
+        return pos
+
+    def line_at_offset(self, offset: int) -> int:
+        """返回字节偏移 offset 所在的行号，调用前需保证该位置已建立索引"""
+        chunk = offset // INDEX_CHUNK_SIZE
+        before = self._counts[chunk - 1] if chunk else 0
+        return before + self.data[chunk * INDEX_CHUNK_SIZE:offset].count(b'\n')
+
+
+class MappedSearchWorker(WorkerThread):
+    """
+    在后台线程中从 start 开始查找映射的文件，到达末尾后从头查找到 start 所在的行。
+    按换行符分段查找，两段之间检查取消与超时；与编辑器一致，匹配项不跨行
+    """
+    found = pyqtSignal(int, int)
+    not_found = pyqtSignal()
+    timed_out = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, data: mmap.mmap, pattern: Pattern, start: int, timeout: float = SCAN_TIMEOUT):
+        super().__init__()
+        self.data = data
+        self.pattern = pattern
+        self.start_offset = start
+        self.timeout = timeout
+
+    def run(self) -> None:
+        try:
+            with trace('find.large', repr(self.pattern.pattern)):
+                self._search()
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.data = None
+
+    def _search(self) -> None:
+        deadline = time.monotonic() + self.timeout
+        data = self.data
+        size = len(data)
+        start = min(self.start_offset, size)
+        ranges = [(start, size)]
+        if start > 0:
+            line_end = data.find(b'\n', start)
+            ranges.append((0, size if line_end == -1 else line_end + 1))
+        for offset, range_end in ranges:
+            while offset < range_end:
+                if self.isInterruptionRequested():
+                    return
+                if time.monotonic() > deadline:
+                    self.timed_out.emit()
+                    return
+                end = data.find(b'\n', offset + SEARCH_SEGMENT_SIZE, range_end)
+                end = range_end if end == -1 else end + 1
+                for match in self.pattern.finditer(data, offset, end):
+                    # 段末尾（换行符之后）的空匹配实际位于下一行的开头，由下一段查找
+                    if match.start() == end and end < size:
+                        continue
+                    self.found.emit(match.start(), match.end())
+                    return
+                offset = end
+        self.not_found.emit()
+
+
+class LargeFileView(QAbstractScrollArea):
+    """
+    只读的大文件视图：通过 mmap 访问文件，只解码并绘制可见范围内的行，
+    滚动、跳转和查找都基于行索引完成，不会构建完整的文档
+    """
+    # 一次查找结束（参数为是否找到）
+    search_finished = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.is_saved = True
+        self.is_new_file = False
+        self.file_path: Optional[str] = None
+        self.encoding = 'utf-8'
+        self._file = None
+        self._data: Optional[mmap.mmap] = None
+        self._index: Optional[LineIndex] = None
+        # 当前高亮的查找结果：(行号, 起始列, 长度)
+        self._match: Optional[Tuple[int, int, int]] = None
+        self._search_offset = 0
+        self._search_worker: Optional[MappedSearchWorker] = None
+        # 目标尚未建立索引的跳转：要跳转的行号，或查找结果的字节范围 (起始, 结束)，
+        # 后台建立索引到达目标后再跳转，不在界面线程中同步扫描文件
+        self._pending_line: Optional[int] = None
+        self._pending_match: Optional[Tuple[int, int]] = None
+        self._max_line_width = 0
+        self._progress_bar = None
+        # 会话恢复的标签页在首次激活前不映射文件，这里记录上次关闭时的视图状态
+        self.session_state: Optional[dict] = None
+        # 命令行指定的编码（--encoding），为 None 时根据开头的样本探测
+        self.forced_encoding: Optional[str] = None
+
+        self._index_timer = QTimer(self)
+        self._index_timer.timeout.connect(self._build_index_step)
+
+        self.verticalScrollBar().setSingleStep(1)
+        self.viewport().setCursor(Qt.IBeamCursor)
+
+    def isReadOnly(self) -> bool:
+        return True
+
+    def load_file_content(self, file_path: str) -> None:
+        """映射文件并在后台分段建立行索引"""
+        try:
+            with trace('load', file_path):
+                self.release_file()
+                self._file = open(file_path, 'rb')
+                self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.encoding = self.forced_encoding or detect_sample_encoding(self._data)
+                self._index = LineIndex(self._data)
+                self.file_path = file_path
+                self.is_saved = True
+                self._build_index_step()
+            self._index_timer.start(0)
+        except Exception as e:
+            self.release_file()
+            QMessageBox.critical(self, "错误", f"加载文件时出错: {e}")
+
+    def load_file_async(self, file_path: str, progress_bar=None) -> None:
+        """映射文件后立即返回，progress_bar 显示行索引的建立进度"""
+        self._progress_bar = progress_bar
+        self.load_file_content(file_path)
+
+    def release_file(self) -> None:
+        """停止建立索引与查找并释放文件映射"""
+        self.cancel_search()
+        self._index_timer.stop()
+        self._index = None
+        self._match = None
+        self._pending_line = self._pending_match = None
+        if self._progress_bar is not None:
+            self._progress_bar.hide()
+            self._progress_bar = None
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _build_index_step(self) -> None:
+        """在一个时间片内尽量多地建立索引，然后刷新滚动条"""
+        if self._index is None:
+            self._index_timer.stop()
+            return
+        timer = QElapsedTimer()
+        timer.start()
+        while not self._index.done and timer.elapsed() < INDEX_TIME_SLICE_MS:
+            self._index.build_step(16)
+        if self._progress_bar is not None:
+            self._progress_bar.setValue(self._index.indexed_bytes * 100 // max(self._index.size, 1))
+        if self._index.done:
+            self._index_timer.stop()
+            if self._progress_bar is not None:
+                self._progress_bar.hide()
+                self._progress_bar = None
+        self._update_scrollbars()
+        self._apply_pending_jump()
+        self.viewport().update()
+
+    def _apply_pending_jump(self) -> None:
+        """索引已经覆盖等待中的跳转目标时执行跳转"""
+        if self._pending_match is not None:
+            start, end = self._pending_match
+            if self._index.done or self._index.indexed_bytes > start:
+                self._pending_match = None
+                self._show_match(start, end)
+        elif self._pending_line is not None:
+            line = self._pending_line
+            if self._index.done or line < self._index.line_count:
+                self._pending_line = None
+                self.goto_line(line)
+
+    def _visible_line_count(self) -> int:
+        return max(1, self.viewport().height() // self.fontMetrics().lineSpacing())
+
+    def _update_scrollbars(self) -> None:
+        line_count = self._index.line_count if self._index else 0
+        visible = self._visible_line_count()
+        vbar = self.verticalScrollBar()
+        vbar.setRange(0, max(0, line_count - visible))
+        vbar.setPageStep(visible)
+        hbar = self.horizontalScrollBar()
+        hbar.setRange(0, max(0, self._max_line_width - self.viewport().width()))
+        hbar.setPageStep(self.viewport().width())
+
+    def _read_line(self, offset: int) -> Tuple[str, Optional[int]]:
+        """解码从 offset 开始的一行，返回 (文本, 下一行偏移)，没有下一行时偏移为 None"""
+        end = self._data.find(b'\n', offset)
+        next_offset = end + 1 if end != -1 else None
+        if end == -1:
+            end = len(self._data)
+        raw = self._data[offset:min(end, offset + MAX_DISPLAY_LINE_BYTES)]
+        if raw.endswith(b'\r'):
+            raw = raw[:-1]
+        return raw.decode(self.encoding, errors='replace'), next_offset
+
+    def paintEvent(self, event) -> None:
+        """只绘制可见范围内的行"""
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.palette().base())
+        if self._index is None:
+            return
+        metrics = self.fontMetrics()
+        line_height = metrics.lineSpacing()
+        first_line = self.verticalScrollBar().value()
+        x = 4 - self.horizontalScrollBar().value()
+        offset = self._index.line_offset(first_line)
+        max_width = self._max_line_width
+        for row in range(self._visible_line_count() + 1):
+            if offset is None:
+                break
+            text, offset = self._read_line(offset)
+            text = text.expandtabs(4)
+            top = row * line_height
+            if self._match and self._match[0] == first_line + row:
+                _, column, length = self._match
+                left = x + metrics.horizontalAdvance(text[:column])
+                width = metrics.horizontalAdvance(text[column:column + length])
+                painter.fillRect(left, top, width, line_height, QColor('#ffd54f'))
+            painter.drawText(x, top + metrics.ascent(), text)
+            max_width = max(max_width, metrics.horizontalAdvance(text) + 8)
+        if max_width != self._max_line_width:
+            self._max_line_width = max_width
+            self._update_scrollbars()
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def changeEvent(self, event) -> None:
+        """字体变化后重新计算滚动范围"""
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self._max_line_width = 0
+            self._update_scrollbars()
+            self.viewport().update()
+
+    def wheelEvent(self, event) -> None:
+        """Ctrl+滚轮交给主窗口调节字体大小"""
+        if event.modifiers() == Qt.ControlModifier:
+            event.ignore()
+            return
+        super().wheelEvent(event)
+
+    def line_count(self) -> Tuple[int, bool]:
+        """返回已建立索引的行数，以及索引是否已经完整（后台建立索引期间行数还会增加）"""
+        if self._index is None:
+            return 0, True
+        return self._index.line_count, self._index.done
+
+    def goto_line(self, line: int) -> None:
+        """
+        跳转到第 line 行（从 0 开始），并尽量让其位于视图中间。
+        该行尚未建立索引时，等后台建立索引到达该行后再跳转
+        """
+        if self._index is None:
+            return
+        self._pending_line = self._pending_match = None
+        if not self._index.done and line >= self._index.line_count:
+            self._pending_line = line
+            return
+        line = max(0, min(line, self._index.line_count - 1))
+        self.verticalScrollBar().setValue(line - self._visible_line_count() // 2)
+        self.viewport().update()
+
+    def view_state(self) -> dict:
+        """返回保存会话所需的状态，大文件视图没有光标，只记录首个可见行"""
+        if self.session_state is not None:
+            return dict(self.session_state)
+        return {
+            'path': self.file_path,
+            'cursor': 0,
+            'scroll': self.verticalScrollBar().value(),
+            'font_size': self.font().pointSize(),
+        }
+
+    def restore_view_state(self, cursor: int, scroll: int) -> None:
+        """把第 scroll 行滚动到视图顶部（忽略 cursor）"""
+        self.goto_line(scroll + self._visible_line_count() // 2)
+
+    def find_text(self, query: str, match_case: bool = False, use_regex: bool = False,
+                  whole_word: bool = False) -> bool:
+        """
+        从首个可见行开始查找 query（上次的查找结果仍然可见时从它之后继续），到达末尾后从头开始。
+        直接在映射的字节上查找，不区分大小写与全字匹配仅对 ASCII 字符生效。
+        查找在后台线程中进行，完成后定位到结果并发出 search_finished；返回是否开始了查找
+        """
+        if self._index is None or not query:
+            return False
+        needle = query.encode(self.encoding, errors='ignore')
+        if not needle:
+            return False
+        source = needle if use_regex else re.escape(needle)
+        if whole_word:
+            source = rb'(?<!\w)(?:' + source + rb')(?!\w)'
+        try:
+            pattern = re.compile(source, re.MULTILINE | (0 if match_case else re.IGNORECASE))
+        except re.error as e:
+            QMessageBox.warning(self, "警告", f"正则表达式无效: {e}")
+            return False
+        self.cancel_search()
+        worker = MappedSearchWorker(self._data, pattern, self._search_start())
+
+        def on_found(start: int, end: int) -> None:
+            if self._search_worker is worker:
+                self._search_worker = None
+                self._show_match(start, end)
+                self.search_finished.emit(True)
+
+        def on_not_found() -> None:
+            if self._search_worker is worker:
+                self._search_worker = None
+                QMessageBox.information(self, "提示", "未找到指定文本！")
+                self.search_finished.emit(False)
+
+        def on_timed_out() -> None:
+            if self._search_worker is worker:
+                self._search_worker = None
+                QMessageBox.warning(self, "警告", "查找超时，请尝试更简单的表达式。")
+                self.search_finished.emit(False)
+
+        def on_failed(message: str) -> None:
+            if self._search_worker is worker:
+                self._search_worker = None
+                QMessageBox.critical(self, "错误", f"发生错误: {message}")
+                self.search_finished.emit(False)
+
+        worker.found.connect(on_found)
+        worker.not_found.connect(on_not_found)
+        worker.timed_out.connect(on_timed_out)
+        worker.failed.connect(on_failed)
+        self._search_worker = worker
+        worker.start()
+        return True
+
+    def cancel_search(self) -> None:
+        """取消正在进行的查找，并等待线程结束（线程仍在读取映射的文件）"""
+        if self._search_worker is not None:
+            self._search_worker.requestInterruption()
+            self._search_worker.wait()
+            self._search_worker = None
+
+    def _search_start(self) -> int:
+        """查找的起始字节偏移：上次的查找结果仍在视图中时从它之后开始，否则从首个可见行开始"""
+        first_line = self.verticalScrollBar().value()
+        if self._match is not None and first_line <= self._match[0] <= first_line + self._visible_line_count():
+            return self._search_offset
+        offset = self._index.line_offset(first_line)
+        return offset if offset is not None else 0
+
+    def _show_match(self, start: int, end: int) -> None:
+        """
+        高亮字节范围 [start, end) 的查找结果并跳转到所在行，
+        结果所在位置尚未建立索引时，等后台建立索引到达后再跳转
+        """
+        if not self._index.done and self._index.indexed_bytes <= start:
+            self._pending_line = None
+            self._pending_match = (start, end)
+            return
+        line = self._index.line_at_offset(start)
+        line_start = self._index.line_offset(line)
+        prefix = self._data[line_start:start].decode(self.encoding, errors='replace')
+        matched = self._data[start:end].decode(self.encoding, errors='replace')
+        column = len(prefix.expandtabs(4))
+        self._match = (line, column, len(matched))
+        # 空匹配（例如 ^）之后从下一个字节继续，否则会一直停在同一位置
+        self._search_offset = end + (end == start)
+        self._update_scrollbars()
+        self.goto_line(line)
@@ -0,0 +1,257 @@
+import re
+import time
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Iterator, List, Match, Optional, Pattern, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+
+from perf_trace import trace
+from worker_thread import WorkerThread
+
+# 匹配 BMP 以外的字符：它们在 Qt 中占两个 UTF-16 单元，在 Python 字符串中只占一个字符
+_ASTRAL_RE = re.compile('[\U00010000-\U0010FFFF]')
+
+# 后台扫描每段的大致字符数（在行边界处切分），两段之间检查超时与取消
+SCAN_SEGMENT_SIZE = 16 * 1024
+# 后台扫描的最长时间（秒）
+SCAN_TIMEOUT = 10
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(pattern: str, flags: int) -> Pattern:
+    return re.compile(pattern, flags)
+
+
+def compile_pattern(query: str, match_case: bool = False, use_regex: bool = False,
+                    whole_word: bool = False) -> Pattern:
+    """
+    根据查找选项编译查询，已编译的模式按 (模式, 标志) 缓存。
+    正则表达式无效时抛出 re.error
+    """
+    pattern = query if use_regex else re.escape(query)
+    if whole_word:
+        pattern = rf'(?<!\w)(?:{pattern})(?!\w)'
+    flags = re.MULTILINE | (0 if match_case else re.IGNORECASE)
+    return _compile_cached(pattern, flags)
+
+
+def qt_positions(text: str, pattern: Pattern) -> Tuple[List[int], List[int]]:
+    """
+    在 text 中查找所有匹配项，返回按 Qt 文档位置（UTF-16 单元）计算的起止位置列表。
+    包括正则表达式的空匹配（例如 ^、$），其起点与终点相同
+    """
+    starts = []
+    ends = []
+    astral = [m.start() for m in _ASTRAL_RE.finditer(text)]
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        # 与逐块查找保持一致：匹配项不能跨行
+        if '\n' in match.group():
+            continue
+        if astral:
+            start += bisect_left(astral, start)
+            end += bisect_left(astral, end)
+        starts.append(start)
+        ends.append(end)
+    return starts, ends
+
+
+def _python_index(astral: List[int], offset: int) -> int:
+    """把块内的 UTF-16 偏移转换为 Python 字符串下标，astral 为块内非 BMP 字符的下标"""
+    return offset - sum(1 for count, index in enumerate(astral) if index + count + 2 <= offset)
+
+
+def find_next_match(document, pattern: Pattern, position: int) -> Optional[Tuple[int, int, Match]]:
+    """
+    从 position 开始逐块查找下一个匹配项，到达末尾后从头继续，
+    返回 (起点, 终点, 匹配对象)，没有匹配项时返回 None
+    """
+    block = document.findBlock(position)
+    offset = position - block.position()
+    for _ in range(document.blockCount() + 1):
+        text = block.text()
+        astral = [m.start() for m in _ASTRAL_RE.finditer(text)]
+        for match in pattern.finditer(text, _python_index(astral, offset)):
+            start, end = match.span()
+            return (block.position() + start + bisect_left(astral, start),
+                    block.position() + end + bisect_left(astral, end), match)
+        block = block.next()
+        if not block.isValid():
+            block = document.begin()
+        offset = 0
+    return None
+
+
+def iter_block_matches(document, pattern: Pattern) -> Iterator[Tuple[int, int, Match]]:
+    """
+    逐个文本块查找匹配项，产出 (起点, 终点, 匹配对象)，位置为 Qt 文档位置。
+    不会生成整个文档的文本副本
+    """
+    block = document.begin()
+    while block.isValid():
+        text = block.text()
+        position = block.position()
+        astral = None
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if astral is None:
+                astral = [m.start() for m in _ASTRAL_RE.finditer(text)]
+            if astral:
+                start += bisect_left(astral, start)
+                end += bisect_left(astral, end)
+            yield position + start, position + end, match
+        block = block.next()
+
+
+class MatchIndex(QObject):
+    """
+    文档中某个查询的全部匹配位置（按起点排序）。
+    每个查询与大小写设置只完整扫描一次，之后根据 contentsChange
+    只重新扫描被修改的文本块并平移后续匹配的位置
+    """
+    changed = pyqtSignal()
+
+    def __init__(self, document, key: tuple, pattern: Pattern,
+                 starts: Optional[List[int]] = None, ends: Optional[List[int]] = None):
+        """
+        key 为 (查询, 匹配大小写, 正则表达式, 全字匹配)；
+        传入后台扫描得到的 starts 与 ends 时不再同步扫描文档
+        """
+        super().__init__()
+        self.document = document
+        self.key = key
+        self.pattern = pattern
+        self.starts: List[int] = starts if starts is not None else []
+        self.ends: List[int] = ends if ends is not None else []
+        if starts is None:
+            self.rebuild()
+        document.contentsChange.connect(self._on_contents_change)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def detach(self) -> None:
+        """停止跟踪文档变化"""
+        if self.document is not None:
+            self.document.contentsChange.disconnect(self._on_contents_change)
+            self.document = None
+
+    def rebuild(self) -> None:
+        """完整扫描一次文档"""
+        self.starts, self.ends = qt_positions(self.document.toPlainText(), self.pattern)
+        self.changed.emit()
+
+    def _on_contents_change(self, position: int, removed: int, added: int) -> None:
+        """只重新扫描受影响的文本块，其后的匹配按长度变化平移"""
+        document = self.document
+        end_of_document = document.characterCount() - 1
+        first_block = document.findBlock(min(position, end_of_document))
+        last_block = document.findBlock(min(position + added, end_of_document))
+        region_start = first_block.position()
+        region_end = last_block.position() + last_block.length() - 1
+        delta = added - removed
+
+        cursor = QTextCursor(document)
+        cursor.setPosition(region_start)
+        cursor.setPosition(region_end, QTextCursor.KeepAnchor)
+        # selectedText() 用 U+2029 表示段落分隔
+        text = cursor.selectedText().replace('\u2029', '\n')
+        starts, ends = qt_positions(text, self.pattern)
+
+        low = bisect_left(self.starts, region_start)
+        high = bisect_right(self.starts, region_end - delta)
+        tail_starts = [start + delta for start in self.starts[high:]]
+        tail_ends = [end + delta for end in self.ends[high:]]
+        self.starts[low:] = [start + region_start for start in starts] + tail_starts
+        self.ends[low:] = [end + region_start for end in ends] + tail_ends
+        self.changed.emit()
+
+    def next_match(self, position: int, backward: bool = False) -> Optional[int]:
+        """
+        返回 position 之后（backward 时为之前）第一个匹配项的序号，
+        到达末尾（开头）后回到开头（末尾），没有匹配项时返回 None
+        """
+        if not self.starts:
+            return None
+        index = bisect_left(self.starts, position)
+        if backward:
+            return (index - 1) % len(self.starts)
+        # 跳过光标处的空匹配，否则向后查找会一直停在同一位置
+        while index < len(self.starts) and self.ends[index] == position:
+            index += 1
+        return index % len(self.starts)
+
+    def match_at(self, start: int, end: int) -> Optional[int]:
+        """如果 [start, end) 恰好是一个匹配项，返回其序号"""
+        index = bisect_left(self.starts, start)
+        if index < len(self.starts) and self.starts[index] == start and self.ends[index] == end:
+            return index
+        return None
+
+    def matches_between(self, start: int, end: int) -> range:
+        """返回起点位于 [start, end] 范围内的匹配项序号"""
+        return range(bisect_left(self.starts, start), bisect_right(self.starts, end))
+
+
+class PatternScanWorker(WorkerThread):
+    """
+    在后台线程中扫描文本快照，按行边界分段查找，两段之间检查取消与超时。
+    提供 replacement 时同时展开每个匹配项的替换文本（支持分组引用）
+    """
+    scanned = pyqtSignal(object, object, object)
+    timed_out = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, text: str, pattern: Pattern, replacement: Optional[str] = None,
+                 timeout: float = SCAN_TIMEOUT):
+        super().__init__()
+        self.text = text
+        self.pattern = pattern
+        self.replacement = replacement
+        self.timeout = timeout
+
+    def run(self) -> None:
+        try:
+            with trace('scan', self.pattern.pattern):
+                self._scan()
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.text = None
+
+    def _scan(self) -> None:
+        deadline = time.monotonic() + self.timeout
+        text = self.text
+        size = len(text)
+        starts: List[int] = []
+        ends: List[int] = []
+        replacements: Optional[List[str]] = [] if self.replacement is not None else None
+        offset = 0
+        # 当前段起点的 UTF-16 位置
+        qt_offset = 0
+        while offset < size:
+            if self.isInterruptionRequested():
+                return
+            if time.monotonic() > deadline:
+                self.timed_out.emit()
+                return
+            end = text.find('\n', offset + SCAN_SEGMENT_SIZE)
+            end = size if end == -1 else end + 1
+            segment = text[offset:end]
+            astral = [m.start() for m in _ASTRAL_RE.finditer(segment)]
+            for match in self.pattern.finditer(segment):
+                start, stop = match.span()
+                if '\n' in match.group():
+                    continue
+                # 段末尾（换行符之后）的空匹配实际位于下一行的开头，由下一段查找
+                if start == len(segment) and end < size:
+                    continue
+                starts.append(qt_offset + start + bisect_left(astral, start))
+                ends.append(qt_offset + stop + bisect_left(astral, stop))
+                if replacements is not None:
+                    replacements.append(match.expand(self.replacement))
+            qt_offset += len(segment) + len(astral)
+            offset = end
+        self.scanned.emit(starts, ends, replacements)
@@ -0,0 +1,163 @@
+import itertools
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+# 环形缓冲区保留的最近事件数，超出后自动丢弃最旧的事件
+RING_BUFFER_SIZE = 2000
+# 设置该环境变量为日志文件路径时，启动后即把事件写入日志
+LOG_ENV_VAR = 'OPENT_TRACE_LOG'
+# 剖析结果中显示的函数数量
+PROFILE_TOP_FUNCTIONS = 30
+
+
+class TraceEvent(NamedTuple):
+    """一次计时：序号、结束时间（time.time()）、名称、耗时（毫秒）、附加信息、线程名"""
+    sequence: int
+    timestamp: float
+    name: str
+    duration_ms: float
+    detail: str
+    thread: str
+
+
+# deque.append 与 next(count) 在 CPython 中是原子操作，后台线程记录事件无需加锁
+_events: Deque[TraceEvent] = deque(maxlen=RING_BUFFER_SIZE)
+_sequence = itertools.count(1)
+_local = threading.local()
+
+_log_lock = threading.Lock()
+_log_file: Optional[TextIO] = None
+_log_path: Optional[str] = None
+
+_profile_lock = threading.Lock()
+_profile_armed = False
+# 最近一次剖析：(操作名称, .prof 文件路径, 耗时最多的函数摘要)
+_last_profile: Optional[Tuple[str, str, str]] = None
+
+
+def record(name: str, seconds: float, detail: str = '') -> None:
+    """记录一次耗时为 seconds 秒的操作（用于累计多次分段计时的阶段）"""
+    event = TraceEvent(next(_sequence), time.time(), name, seconds * 1000, detail,
+                       threading.current_thread().name)
+    _events.append(event)
+    if _log_file is not None:
+        _write_log(event)
+
+
+@contextmanager
+def trace(name: str, detail: str = '') -> Iterator[None]:
+    """
+    为 with 语句中的操作计时并记录。
+    已通过 profile_next() 请求剖析时，下一次最外层的计时会在 cProfile 下运行
+    """
+    depth = getattr(_local, 'depth', 0)
+    profiler = _take_profiler() if depth == 0 else None
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        _local.depth = depth
+        if profiler is not None:
+            profiler.disable()
+            detail = f"{detail} 剖析: {_save_profile(profiler, name)}".strip()
+        record(name, duration, detail)
+
+
+def events_since(sequence: int = 0) -> List[TraceEvent]:
+    """返回缓冲区中序号大于 sequence 的事件"""
+    return [event for event in list(_events) if event.sequence > sequence]
+
+
+def clear() -> None:
+    _events.clear()
+
+
+def enable_log(file_path: str) -> None:
+    """把之后的事件追加写入 file_path（制表符分隔），默认不写日志"""
+    global _log_file, _log_path
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    file = open(file_path, 'a', encoding='utf-8')
+    with _log_lock:
+        previous, _log_file, _log_path = _log_file, file, file_path
+    if previous is not None:
+        previous.close()
+
+
+def disable_log() -> None:
+    global _log_file, _log_path
+    with _log_lock:
+        previous, _log_file, _log_path = _log_file, None, None
+    if previous is not None:
+        previous.close()
+
+
+def log_path() -> Optional[str]:
+    return _log_path
+
+
+def _write_log(event: TraceEvent) -> None:
+    line = (f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.timestamp))}\t{event.name}\t"
+            f"{event.duration_ms:.2f}\t{event.thread}\t{event.detail}\n")
+    with _log_lock:
+        if _log_file is not None:
+            _log_file.write(line)
+            _log_file.flush()
+
+
+def profile_next() -> None:
+    """请求用 cProfile 剖析下一次操作（任意线程中下一个最外层的计时）"""
+    global _profile_armed
+    with _profile_lock:
+        _profile_armed = True
+
+
+def profile_pending() -> bool:
+    return _profile_armed
+
+
+def last_profile() -> Optional[Tuple[str, str, str]]:
+    return _last_profile
+
+
+def _take_profiler():
+    global _profile_armed
+    if not _profile_armed:
+        return None
+    with _profile_lock:
+        if not _profile_armed:
+            return None
+        _profile_armed = False
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _save_profile(profiler, name: str) -> str:
+    """保存剖析结果并生成摘要，返回 .prof 文件路径（可用 snakeviz 等工具查看）"""
+    global _last_profile
+    import io
+    import pstats
+    file_path = os.path.join(tempfile.gettempdir(),
+                             f"opent-{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+    profiler.dump_stats(file_path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    _last_profile = (name, file_path, summary.getvalue())
+    return file_path
+
+
+if os.environ.get(LOG_ENV_VAR):
+    try:
+        enable_log(os.environ[LOG_ENV_VAR])
+    except OSError:
+        pass
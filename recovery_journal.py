@@ -0,0 +1,395 @@
+import json
+import os
+import queue
+import shutil
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PyQt5.QtCore import QLockFile, QObject, QStandardPaths, QThread, QTimer
+from PyQt5.QtGui import QTextCursor
+
+from encoding_utils import decode_bytes, normalize_newlines
+from file_saver import write_text_atomic
+
+RECOVERY_DIR_NAME = 'recovery'
+JOURNAL_VERSION = 1
+# 修改记录在内存中合并后写入的间隔（毫秒）
+JOURNAL_FLUSH_DELAY = 1000
+# 一个日志追加的记录超过该大小（字节）后压缩为相对磁盘文件的单条修改
+COMPACT_THRESHOLD = 4 * 1024 * 1024
+
+# 日志中的一条修改：(起点, 删除长度, 插入文本)，位置与长度按 Qt 文档位置（UTF-16 单元）计算，
+# 删除长度为 -1 表示删除到文档末尾
+JournalRecord = Tuple[int, int, str]
+
+_APPEND, _COMPACT, _REMOVE, _STOP = range(4)
+
+
+def recovery_directory() -> str:
+    directory = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+    return os.path.join(directory, RECOVERY_DIR_NAME)
+
+
+def utf16_length(text: str) -> int:
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _common_prefix(a: str, b: str, limit: int) -> int:
+    """返回 a 与 b 相同前缀的长度（不超过 limit），先按大块比较再逐字符比较"""
+    step = 64 * 1024
+    index = 0
+    while index < limit:
+        end = min(index + step, limit)
+        if a[index:end] != b[index:end]:
+            while a[index] == b[index]:
+                index += 1
+            return index
+        index = end
+    return limit
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    step = 64 * 1024
+    length = 0
+    while length < limit:
+        end = min(length + step, limit)
+        if a[len(a) - end:len(a) - length] != b[len(b) - end:len(b) - length]:
+            while a[len(a) - length - 1] == b[len(b) - length - 1]:
+                length += 1
+            return length
+        length = end
+    return limit
+
+
+def diff_record(base: str, text: str) -> JournalRecord:
+    """返回把 base 变为 text 的单条修改：去掉相同的前缀与后缀，替换中间部分"""
+    prefix = _common_prefix(base, text, min(len(base), len(text)))
+    suffix = _common_suffix(base, text, min(len(base), len(text)) - prefix)
+    removed = base[prefix:len(base) - suffix]
+    return utf16_length(base[:prefix]), utf16_length(removed), text[prefix:len(text) - suffix]
+
+
+def replay_journal(document, records: List[JournalRecord]) -> None:
+    """在一个编辑块中把修改记录应用到 document，一次撤销即可回到磁盘上的内容"""
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    for position, removed, text in records:
+        # 与 contentsChange 一致，记录的范围可能包含文档末尾隐含的段落分隔符
+        last = document.characterCount() - 1
+        position = min(position, last)
+        end = last if removed < 0 else min(position + removed, last)
+        cursor.setPosition(position)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.insertText(text)
+    cursor.endEditBlock()
+
+
+def file_state(file_path: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """返回文件的 (修改时间, 大小)，用于判断文件在记录日志之后是否被修改"""
+    if not file_path:
+        return None, None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None, None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_journal(journal_path: str) -> Optional[Tuple[dict, List[JournalRecord]]]:
+    """读取日志，返回 (头部, 修改记录)；异常退出时最后一行可能不完整，忽略无法解析的行"""
+    try:
+        with open(journal_path, encoding='utf-8') as file:
+            # 只按换行符分行：splitlines() 还会在文本中的 U+2028、U+0085 等字符处分行
+            lines = file.read().split('\n')
+    except (OSError, UnicodeDecodeError):
+        return None
+    try:
+        header = json.loads(lines[0])
+    except (IndexError, ValueError):
+        return None
+    if not isinstance(header, dict) or header.get('version') != JOURNAL_VERSION:
+        return None
+    records = []
+    for line in lines[1:]:
+        try:
+            position, removed, text = json.loads(line)
+            records.append((int(position), int(removed), str(text)))
+        except (ValueError, TypeError):
+            break
+    return header, records
+
+
+def find_recoverable_journals(exclude: Optional[str] = None) -> Tuple[List[Tuple[str, QLockFile]],
+                                                                     List[Tuple[str, dict, List[JournalRecord]]]]:
+    """
+    查找异常退出的实例留下的日志（exclude 为本实例的日志目录）。每个实例在自己的目录中持有锁文件，
+    能够获得锁的目录属于已经不在运行的实例。返回 ([(目录, 已获得的锁)], [(日志路径, 头部, 修改记录)])，
+    处理完成后把锁交给 discard_journals 删除这些目录
+    """
+    root = recovery_directory()
+    locks = []
+    journals = []
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return locks, journals
+    for name in names:
+        directory = os.path.join(root, name)
+        if directory == exclude or not os.path.isdir(directory):
+            continue
+        lock = QLockFile(os.path.join(directory, 'lock'))
+        lock.setStaleLockTime(0)
+        if not lock.tryLock(0):
+            continue
+        locks.append((directory, lock))
+        for journal_name in sorted(os.listdir(directory)):
+            if journal_name.endswith('.journal'):
+                journal_path = os.path.join(directory, journal_name)
+                journal = read_journal(journal_path)
+                if journal is not None and journal[1]:
+                    journals.append((journal_path,) + journal)
+    return locks, journals
+
+
+def discard_journals(locks: List[Tuple[str, QLockFile]], keep: Iterable[str] = ()) -> None:
+    """
+    删除已处理（恢复或放弃）的日志目录。keep 中的日志（例如文件已被移动或删除而无法恢复）保留，
+    只释放所在目录的锁，下次启动时再次询问
+    """
+    keep = set(keep)
+    for directory, lock in locks:
+        lock.unlock()
+        if not any(os.path.dirname(journal_path) == directory for journal_path in keep):
+            shutil.rmtree(directory, ignore_errors=True)
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if path not in keep:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+class JournalWriter(QThread):
+    """
+    在后台线程中按顺序执行日志的写入、压缩与删除，界面线程只需把任务放入队列。
+    日志只用于异常退出后的恢复，写入失败时忽略
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tasks: queue.Queue = queue.Queue()
+
+    def stop(self) -> None:
+        """处理完队列中剩余的任务后结束线程"""
+        self.tasks.put((_STOP,))
+        self.wait()
+
+    def run(self) -> None:
+        while True:
+            task = self.tasks.get()
+            if task[0] == _STOP:
+                return
+            try:
+                if task[0] == _APPEND:
+                    self._append(*task[1:])
+                elif task[0] == _COMPACT:
+                    self._compact(*task[1:])
+                elif task[0] == _REMOVE and os.path.exists(task[1]):
+                    os.unlink(task[1])
+            except (OSError, ValueError):
+                pass
+
+    @staticmethod
+    def _append(journal_path: str, header: Optional[dict], lines: List[str]) -> None:
+        with open(journal_path, 'a', encoding='utf-8') as file:
+            if header is not None:
+                file.write(json.dumps(header, ensure_ascii=False) + '\n')
+            file.write(''.join(lines))
+            file.flush()
+            os.fsync(file.fileno())
+
+    @staticmethod
+    def _compact(journal_path: str, header: dict, text: str) -> None:
+        """把日志改写为头部加一条相对磁盘文件的修改，磁盘文件已变化时记录完整文本"""
+        base = None
+        file_path = header['path']
+        if file_path is None:
+            base = ''
+        elif file_state(file_path) == (header['mtime'], header['size']):
+            with open(file_path, 'rb') as file:
+                base, _ = decode_bytes(file.read(), header['encoding'])
+            base = normalize_newlines(base)
+        record = diff_record(base, text) if base is not None else (0, -1, text)
+        lines = [json.dumps(header, ensure_ascii=False) + '\n', json.dumps(record, ensure_ascii=False) + '\n']
+        write_text_atomic(journal_path, lines)
+
+
+class RecoveryJournal:
+    """一个编辑器的恢复日志：记录自上次与磁盘一致（加载或保存）以来的修改"""
+
+    def __init__(self, text_edit, journal_path: str):
+        self.text_edit = text_edit
+        self.journal_path = journal_path
+        self.header: dict = {}
+        # 尚未交给写入线程的记录：[起点, 删除长度, 插入文本]
+        self.pending: List[list] = []
+        self.written = False
+        self.appended_bytes = 0
+        self.revision = text_edit.document().revision()
+
+    def reset_header(self) -> None:
+        """记录当前与文档内容一致的磁盘文件状态，恢复时在该文件上重放修改"""
+        file_path = None if self.text_edit.is_new_file else self.text_edit.file_path
+        mtime, size = file_state(file_path)
+        self.header = {
+            'version': JOURNAL_VERSION, 'path': file_path, 'mtime': mtime, 'size': size,
+            'encoding': self.text_edit.encoding,
+        }
+
+    def add(self, position: int, removed: int, text: str) -> None:
+        """添加一条修改，连续输入或连续退格时与上一条合并"""
+        if self.pending:
+            last = self.pending[-1]
+            last_end = last[0] + utf16_length(last[2])
+            if removed == 0 and position == last_end:
+                last[2] += text
+                return
+            if (not text and removed == 1 and position + 1 == last_end and last[2]
+                    and utf16_length(last[2][-1]) == 1):
+                last[2] = last[2][:-1]
+                return
+        self.pending.append([position, removed, text])
+
+
+class RecoveryManager(QObject):
+    """
+    为所有编辑器维护恢复日志：根据 QTextDocument.contentsChange 记录修改（只记录增量，
+    不反复写入整个文档），合并后由后台线程追加写入，追加的内容过多时压缩。
+    文件保存或撤销回保存时的状态后删除对应日志，正常退出时删除整个日志目录
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.directory = os.path.join(recovery_directory(), uuid.uuid4().hex)
+        self.lock: Optional[QLockFile] = None
+        self.journals: Dict[object, RecoveryJournal] = {}
+        # 文档 -> 日志，contentsChange 的发送者是文档
+        self._by_document: Dict[object, RecoveryJournal] = {}
+        self._next_id = 0
+        self.writer = JournalWriter()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(JOURNAL_FLUSH_DELAY)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def start(self) -> bool:
+        """创建本实例的日志目录并持有锁，目录不可写时返回 False（不记录日志）"""
+        if self.lock is not None:
+            return True
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError:
+            return False
+        self.lock = QLockFile(os.path.join(self.directory, 'lock'))
+        self.lock.setStaleLockTime(0)
+        if not self.lock.tryLock(0):
+            self.lock = None
+            return False
+        self.writer.start()
+        return True
+
+    def close(self) -> None:
+        """正常退出：停止写入线程并删除日志目录"""
+        if self.lock is None:
+            return
+        self.flush_timer.stop()
+        self.writer.stop()
+        self.lock.unlock()
+        self.lock = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def attach(self, text_edit) -> None:
+        """开始为 text_edit 记录修改（只读的大文件视图没有文档，不需要记录）"""
+        if self.lock is None or not hasattr(text_edit, 'saved_changed') or text_edit in self.journals:
+            return
+        self._next_id += 1
+        journal = RecoveryJournal(text_edit, os.path.join(self.directory, f"{self._next_id}.journal"))
+        journal.reset_header()
+        self.journals[text_edit] = journal
+        self._by_document[text_edit.document()] = journal
+        text_edit.document().contentsChange.connect(self._on_contents_change)
+        text_edit.saved_changed.connect(self._on_saved_changed)
+        text_edit.loaded.connect(self._on_loaded)
+
+    def detach(self, text_edit) -> None:
+        """停止记录并删除日志（关闭标签页时，用户已决定保存或放弃修改）"""
+        journal = self.journals.pop(text_edit, None)
+        if journal is None:
+            return
+        del self._by_document[text_edit.document()]
+        text_edit.document().contentsChange.disconnect(self._on_contents_change)
+        text_edit.saved_changed.disconnect(self._on_saved_changed)
+        text_edit.loaded.disconnect(self._on_loaded)
+        if journal.written:
+            self.writer.tasks.put((_REMOVE, journal.journal_path))
+
+    def _on_contents_change(self, position: int, removed: int, added: int) -> None:
+        document = self.sender()
+        journal = self._by_document.get(document)
+        if journal is None or journal.text_edit.is_loading:
+            return
+        # 只改变格式（例如语法高亮）时文档版本不变，不需要记录
+        revision = document.revision()
+        if revision == journal.revision:
+            return
+        journal.revision = revision
+        text = ''
+        if added:
+            cursor = QTextCursor(document)
+            cursor.setPosition(position)
+            cursor.setPosition(min(position + added, document.characterCount() - 1), QTextCursor.KeepAnchor)
+            text = cursor.selectedText().replace('\u2029', '\n')
+        journal.add(position, removed, text)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def _on_saved_changed(self, saved: bool) -> None:
+        """文档与磁盘一致时丢弃日志，之后的修改相对新的磁盘文件记录"""
+        journal = self.journals.get(self.sender())
+        if journal is None or not saved:
+            return
+        journal.pending.clear()
+        journal.appended_bytes = 0
+        if journal.written:
+            journal.written = False
+            self.writer.tasks.put((_REMOVE, journal.journal_path))
+        journal.reset_header()
+
+    def _on_loaded(self) -> None:
+        """
+        加载或重新加载（包括外部修改后的静默重新加载）完成：文档来自新的磁盘文件，
+        保存状态不一定变化，这里更新头部记录的磁盘文件状态与编码
+        """
+        journal = self.journals.get(self.sender())
+        if journal is not None:
+            journal.reset_header()
+
+    def flush(self) -> None:
+        """把合并后的修改交给写入线程，追加过多时改为压缩"""
+        for journal in self.journals.values():
+            if not journal.pending:
+                continue
+            lines = [json.dumps(record, ensure_ascii=False) + '\n' for record in journal.pending]
+            journal.pending = []
+            journal.appended_bytes += sum(len(line) for line in lines)
+            if journal.appended_bytes > COMPACT_THRESHOLD:
+                journal.appended_bytes = 0
+                # 与修改记录一致，保留不换行空格与 U+2028，只把文本块之间的分隔转换为换行符
+                text = journal.text_edit.document().toRawText().replace('\u2029', '\n')
+                self.writer.tasks.put((_COMPACT, journal.journal_path, journal.header, text))
+            else:
+                self.writer.tasks.put((_APPEND, journal.journal_path,
+                                       None if journal.written else journal.header, lines))
+            journal.written = True
@@ -0,0 +1,48 @@
+import json
+import os
+from typing import Optional
+
+from PyQt5.QtCore import QStandardPaths
+
+from file_saver import write_text_atomic
+
+SESSION_FILE_NAME = 'session.json'
+# 会话文件格式版本，格式不兼容时忽略旧文件
+SESSION_VERSION = 1
+
+
+def session_file_path() -> str:
+    """返回会话文件的路径（位于系统的应用配置目录中）"""
+    directory = QStandardPaths.writableLocation(QStandardPaths.AppConfigLocation)
+    return os.path.join(directory, SESSION_FILE_NAME)
+
+
+def load_session(file_path: Optional[str] = None) -> dict:
+    """
+    读取上次关闭时保存的会话，返回 {"current": 当前标签页序号, "tabs": [标签页状态, ...]}。
+    文件不存在或已损坏时返回空会话
+    """
+    file_path = file_path or session_file_path()
+    try:
+        with open(file_path, encoding='utf-8') as file:
+            session = json.load(file)
+    except (OSError, ValueError):
+        return {'current': 0, 'tabs': []}
+    if not isinstance(session, dict) or session.get('version') != SESSION_VERSION:
+        return {'current': 0, 'tabs': []}
+    tabs = [tab for tab in session.get('tabs', []) if isinstance(tab, dict) and tab.get('path')]
+    return {'current': session.get('current', 0), 'tabs': tabs}
+
+
+def save_session(tabs: list, current: int, file_path: Optional[str] = None) -> None:
+    """
+    保存会话，tabs 中每一项为 {"path", "cursor", "scroll", "font_size"}。
+    写入失败（例如配置目录不可写）时忽略，不影响程序退出
+    """
+    file_path = file_path or session_file_path()
+    session = {'version': SESSION_VERSION, 'current': current, 'tabs': tabs}
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        write_text_atomic(file_path, [json.dumps(session, ensure_ascii=False, indent=2)])
+    except OSError:
+        pass
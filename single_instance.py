@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+from typing import List
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+# 连接已运行实例、发送参数的超时时间（毫秒）
+CONNECT_TIMEOUT_MS = 200
+WRITE_TIMEOUT_MS = 1000
+
+
+def server_name() -> str:
+    """本地套接字名称，按用户主目录区分，不同用户各自运行一个实例"""
+    digest = hashlib.md5(os.path.expanduser('~').encode('utf-8')).hexdigest()[:12]
+    return f"OpenT-{digest}"
+
+
+def forward_to_running_instance(args: List[str]) -> bool:
+    """
+    如果已有实例在运行，把命令行参数与当前工作目录发送给它并返回 True；
+    没有运行中的实例时返回 False。只依赖 QtCore 与 QtNetwork，不需要创建 QApplication
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        return False
+    message = json.dumps({'cwd': os.getcwd(), 'args': args}, ensure_ascii=False)
+    socket.write(message.encode('utf-8'))
+    socket.waitForBytesWritten(WRITE_TIMEOUT_MS)
+    socket.disconnectFromServer()
+    if socket.state() != QLocalSocket.UnconnectedState:
+        socket.waitForDisconnected(WRITE_TIMEOUT_MS)
+    return True
+
+
+class InstanceServer(QObject):
+    """
+    运行中的实例监听本地套接字，后续启动的实例连接后发送参数并立即退出，
+    收到的参数通过 arguments_received(参数列表, 工作目录) 发出
+    """
+    arguments_received = pyqtSignal(list, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+        # 每个连接已收到的数据
+        self._buffers = {}
+
+    def listen(self) -> bool:
+        """开始监听，返回是否成功（另一个实例抢先启动时返回 False）"""
+        name = server_name()
+        if self.server.listen(name):
+            return True
+        # 上次异常退出可能留下无人监听的套接字文件，确认无法连接后再清理
+        socket = QLocalSocket()
+        socket.connectToServer(name)
+        if socket.waitForConnected(CONNECT_TIMEOUT_MS):
+            socket.disconnectFromServer()
+            return False
+        QLocalServer.removeServer(name)
+        return self.server.listen(name)
+
+    def close(self) -> None:
+        self.server.close()
+
+    def _on_new_connection(self) -> None:
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._buffers[socket] = bytearray()
+            socket.readyRead.connect(self._on_ready_read)
+            socket.disconnected.connect(self._on_disconnected)
+
+    def _on_ready_read(self) -> None:
+        socket = self.sender()
+        self._buffers[socket] += bytes(socket.readAll())
+
+    def _on_disconnected(self) -> None:
+        """连接断开时数据已全部收到，解析后发出参数"""
+        socket = self.sender()
+        data = self._buffers.pop(socket, bytearray()) + bytes(socket.readAll())
+        socket.deleteLater()
+        try:
+            message = json.loads(data.decode('utf-8'))
+            args = [str(arg) for arg in message['args']]
+            cwd = str(message['cwd'])
+        except (ValueError, KeyError, TypeError):
+            return
+        self.arguments_received.emit(args, cwd)
@@ -0,0 +1,141 @@
+import os
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# 文件标识：(设备号, inode)，用于识别通过硬链接等不同路径打开的同一文件
+FileIdentity = Tuple[int, int]
+
+
+def normalize_path(file_path: str) -> str:
+    """返回规范化的真实路径：解析符号链接，在不区分大小写的平台上统一大小写"""
+    return os.path.normcase(os.path.realpath(file_path))
+
+
+def file_identity(file_path: str) -> Optional[FileIdentity]:
+    """返回文件的 (设备号, inode)，文件不存在或文件系统不提供 inode 时返回 None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if not stat.st_ino:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class TabRegistry(QObject):
+    """
+    标签页注册表：记录所有编辑器、所在的标签页以及打开的文件，
+    按规范化路径或文件标识查找已打开的文件，并维护未保存编辑器的集合，
+    各项操作均为常数时间，不需要遍历标签页
+    """
+    # 编辑器首次注册与注销时发出（例如恢复日志据此开始或停止记录）
+    editor_registered = pyqtSignal(object)
+    editor_unregistered = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 标签页 -> 编辑器，以及反向映射
+        self._by_widget: Dict[object, object] = {}
+        self._widget_of: Dict[object, object] = {}
+        self._by_path: Dict[str, object] = {}
+        self._by_identity: Dict[FileIdentity, object] = {}
+        # 编辑器 -> (规范化路径, 文件标识)
+        self._keys: Dict[object, Tuple[Optional[str], Optional[FileIdentity]]] = {}
+        self._unsaved: Set[object] = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, text_edit) -> bool:
+        return text_edit in self._keys
+
+    def editors(self) -> Iterator:
+        """按注册顺序返回所有编辑器（包括尚未放入标签页的）"""
+        return iter(list(self._keys))
+
+    def register(self, text_edit) -> None:
+        """
+        注册编辑器，所在的标签页为 text_edit.parent()。
+        编辑器放入标签页后需要再次调用以记录标签页
+        """
+        if text_edit not in self._keys:
+            self._keys[text_edit] = (None, None)
+            self._set_keys(text_edit, text_edit.file_path)
+            if hasattr(text_edit, 'saved_changed'):
+                text_edit.saved_changed.connect(self._on_saved_changed)
+                text_edit.file_path_changed.connect(self._on_file_path_changed)
+            if not text_edit.is_saved:
+                self._unsaved.add(text_edit)
+            registered = True
+        else:
+            registered = False
+        tab_widget = text_edit.parent()
+        if tab_widget is not None:
+            self._by_widget.pop(self._widget_of.get(text_edit), None)
+            self._by_widget[tab_widget] = text_edit
+            self._widget_of[text_edit] = tab_widget
+        if registered:
+            self.editor_registered.emit(text_edit)
+
+    def unregister(self, text_edit) -> None:
+        """注销编辑器（关闭标签页或批量打开失败时）"""
+        if text_edit not in self._keys:
+            return
+        self._set_keys(text_edit, None)
+        del self._keys[text_edit]
+        self._unsaved.discard(text_edit)
+        self._by_widget.pop(self._widget_of.pop(text_edit, None), None)
+        if hasattr(text_edit, 'saved_changed'):
+            text_edit.saved_changed.disconnect(self._on_saved_changed)
+            text_edit.file_path_changed.disconnect(self._on_file_path_changed)
+        self.editor_unregistered.emit(text_edit)
+
+    def editor_for(self, tab_widget):
+        """返回标签页中的编辑器"""
+        return self._by_widget.get(tab_widget)
+
+    def find(self, file_path: str):
+        """返回已打开 file_path 的编辑器：先按规范化路径查找，再按文件标识查找"""
+        text_edit = self._by_path.get(normalize_path(file_path))
+        if text_edit is None:
+            identity = file_identity(file_path)
+            if identity is not None:
+                text_edit = self._by_identity.get(identity)
+        return text_edit
+
+    def has_unsaved(self) -> bool:
+        return bool(self._unsaved)
+
+    def unsaved_editors(self) -> Set:
+        return set(self._unsaved)
+
+    def _set_keys(self, text_edit, file_path: Optional[str]) -> None:
+        """把编辑器的路径与文件标识更新为 file_path 对应的值，None 表示移除"""
+        path, identity = self._keys[text_edit]
+        if path is not None and self._by_path.get(path) is text_edit:
+            del self._by_path[path]
+        if identity is not None and self._by_identity.get(identity) is text_edit:
+            del self._by_identity[identity]
+        if file_path:
+            path, identity = normalize_path(file_path), file_identity(file_path)
+            self._by_path[path] = text_edit
+            if identity is not None:
+                self._by_identity[identity] = text_edit
+        else:
+            path = identity = None
+        self._keys[text_edit] = (path, identity)
+
+    def _on_saved_changed(self, saved: bool) -> None:
+        text_edit = self.sender()
+        if text_edit not in self._keys:
+            return
+        if saved:
+            self._unsaved.discard(text_edit)
+        else:
+            self._unsaved.add(text_edit)
+
+    def _on_file_path_changed(self, file_path: str) -> None:
+        text_edit = self.sender()
+        if text_edit in self._keys:
+            self._set_keys(text_edit, file_path)
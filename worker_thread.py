@@ -0,0 +1,29 @@
+from typing import List, Set
+
+from PyQt5.QtCore import QThread
+
+# 正在运行的后台线程，线程结束前保持引用，避免对象被提前回收
+_active_workers: Set['WorkerThread'] = set()
+
+
+class WorkerThread(QThread):
+    """
+    后台线程的基类：从 start() 到线程结束期间由模块保持引用，
+    调用方只需连接信号，不需要自己保存线程对象
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.finished.connect(self._on_finished)
+
+    def start(self, *args) -> None:
+        _active_workers.add(self)
+        super().start(*args)
+
+    def _on_finished(self) -> None:
+        _active_workers.discard(self)
+
+    @classmethod
+    def active_workers(cls) -> List['WorkerThread']:
+        """返回正在运行的该类（包括子类）的线程"""
+        return [worker for worker in _active_workers if isinstance(worker, cls)]
@@ -0,0 +1,99 @@
+from typing import Optional
+
+from PyQt5.QtCore import QObject, Qt, QTimer
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtWidgets import QLabel
+
+from perf_trace import trace
+
+# 最后一次缩放操作之后多久才真正改变字体（毫秒），期间的连续缩放合并为一次
+ZOOM_QUIET_PERIOD = 250
+
+
+class ZoomController(QObject):
+    """
+    合并连续的缩放操作（Ctrl+滚轮、快捷键）：改变字体会让整个文档重新布局，
+    这里只在操作停止 ZOOM_QUIET_PERIOD 毫秒后对编辑器调用一次 setFont。
+    等待期间在视口上显示按目标字号缩放的截图作为预览。
+    字号保存在各个编辑器的字体中，因此每个标签页有各自的缩放级别
+    """
+
+    def __init__(self, min_size: int, max_size: int, parent=None):
+        super().__init__(parent)
+        self.min_size = min_size
+        self.max_size = max_size
+        # 正在等待应用的编辑器与目标字号
+        self.text_edit = None
+        self.target = 0
+        self._snapshot: Optional[QPixmap] = None
+        self._preview: Optional[QLabel] = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(ZOOM_QUIET_PERIOD)
+        self.timer.timeout.connect(self.apply)
+
+    def font_size(self, text_edit) -> int:
+        """编辑器的字号，包括尚未应用的缩放"""
+        if text_edit is self.text_edit:
+            return self.target
+        return text_edit.font().pointSize()
+
+    def zoom_by(self, text_edit, steps: int) -> None:
+        self.zoom_to(text_edit, self.font_size(text_edit) + steps)
+
+    def zoom_to(self, text_edit, size: int) -> None:
+        """把 text_edit 的字号设置为 size（限制在允许范围内），在安静期结束后应用"""
+        if text_edit is not self.text_edit:
+            # 切换到其他编辑器时，先应用上一个编辑器的缩放
+            self.apply()
+        size = max(self.min_size, min(self.max_size, size))
+        if size == self.font_size(text_edit):
+            return
+        self.text_edit = text_edit
+        self.target = size
+        self._show_preview()
+        self.timer.start()
+
+    def apply(self) -> None:
+        """立即应用等待中的缩放（例如切换标签页或保存会话前）"""
+        self.timer.stop()
+        text_edit = self.text_edit
+        if text_edit is None:
+            return
+        self.text_edit = None
+        font = text_edit.font()
+        if font.pointSize() != self.target:
+            with trace('zoom', f"{font.pointSize()} -> {self.target}"):
+                font.setPointSize(self.target)
+                text_edit.setFont(font)
+        self._hide_preview()
+
+    def remove(self, text_edit) -> None:
+        """编辑器即将关闭：放弃它等待中的缩放"""
+        if text_edit is self.text_edit:
+            self.timer.stop()
+            self.text_edit = None
+            self._hide_preview()
+
+    def _show_preview(self) -> None:
+        """在视口上显示缩放后的截图，只缩放图像，不重新布局文档"""
+        viewport = self.text_edit.viewport()
+        if self._preview is None:
+            # 同一次连续缩放始终从最初的截图缩放，避免图像越缩放越模糊
+            self._snapshot = viewport.grab()
+            self._preview = QLabel(viewport)
+            self._preview.setAttribute(Qt.WA_TransparentForMouseEvents)
+            self._preview.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+            self._preview.setAutoFillBackground(True)
+            self._preview.setBackgroundRole(viewport.backgroundRole())
+            self._preview.setGeometry(viewport.rect())
+            self._preview.show()
+        scale = self.target / self.text_edit.font().pointSizeF()
+        self._preview.setPixmap(self._snapshot.scaled(
+            self._snapshot.size() * scale, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+
+    def _hide_preview(self) -> None:
+        if self._preview is not None:
+            self._preview.deleteLater()
+            self._preview = None
+            self._snapshot = None